@@ -8,3 +8,4 @@ def register_routers(app: FastAPI):
     app.include_router(project.router)
     app.include_router(document.proj_router)
     app.include_router(document.doc_router)
+    app.include_router(document.upload_router)
@@ -1,28 +1,70 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, File, HTTPException, Path, Query, UploadFile
+from typing import Literal
+
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    File,
+    Header,
+    HTTPException,
+    Path,
+    Query,
+    Request,
+    UploadFile,
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import RedirectResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from starlette import status
 
+from app.core.config import settings
 from app.core.deps import get_current_user
 from app.core.storage_s3 import ping_bucket
 from app.db.models import User
 from app.db.session import get_db
 from app.schemas.document import (
+    BatchUploadOut,
+    DocumentBatchIn,
+    DocumentBatchOut,
     DocumentDownloadLinkOut,
     DocumentListOut,
     DocumentOut,
+    DocumentTransferIn,
+    DocumentTransferOut,
+    DocumentVersionListOut,
+    SyncManifestIn,
+    SyncManifestOut,
+    UploadSessionIn,
+    UploadSessionOut,
 )
 from app.services.document import (
+    abort_upload,
+    complete_upload,
+    copy_documents,
+    create_upload_session,
     delete_document_by_id,
+    delete_document_version,
+    export_documents,
     get_document_download_link_by_id,
+    get_documents_with_links,
+    get_thumbnail_link,
+    get_upload_progress,
+    list_document_versions,
     list_documents,
+    move_documents,
+    put_upload_chunk,
     replace_document,
+    restore_document_version,
+    sync_manifest,
     upload_document,
+    upload_documents,
 )
 
 proj_router = APIRouter(prefix="/projects", tags=["documents"])
 doc_router = APIRouter(prefix="/document", tags=["documents"])
+upload_router = APIRouter(prefix="/uploads", tags=["uploads"])
 
 
 # proj_router
@@ -33,6 +75,7 @@ doc_router = APIRouter(prefix="/document", tags=["documents"])
 )
 def upload_project_document(
     project_id: int,
+    background: BackgroundTasks,
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
@@ -44,6 +87,63 @@ def upload_project_document(
         user_id=current_user.id,
         project_id=project_id,
         file=file,
+        background=background,
+    )
+
+
+@proj_router.post(
+    "/{project_id}/documents/batch",
+    response_model=BatchUploadOut,
+    summary="Upload many documents in one request",
+    description="One quota reservation and one commit; success or failure is reported per file.",
+)
+def upload_project_documents(
+    project_id: int,
+    background: BackgroundTasks,
+    files: list[UploadFile] = File(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    return upload_documents(
+        db,
+        user_id=current_user.id,
+        project_id=project_id,
+        files=files,
+        background=background,
+    )
+
+
+@proj_router.post(
+    "/{project_id}/documents/copy",
+    response_model=DocumentTransferOut,
+    summary="Copy documents into this project",
+    description="Server-side S3 copy; the bytes never pass through the API.",
+)
+def copy_into_project(
+    project_id: int,
+    data: DocumentTransferIn,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    return copy_documents(
+        db, user_id=current_user.id, target_project_id=project_id, doc_ids=data.document_ids
+    )
+
+
+@proj_router.post(
+    "/{project_id}/documents/move",
+    response_model=DocumentTransferOut,
+    summary="Move documents into this project",
+    description="Requires ownership of the source projects. Documents keep their ids.",
+)
+def move_into_project(
+    project_id: int,
+    data: DocumentTransferIn,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    return move_documents(
+        db, user_id=current_user.id, target_project_id=project_id, doc_ids=data.document_ids
     )
 
 
@@ -70,7 +170,71 @@ def list_project_documents(
     )
 
 
+@proj_router.post(
+    "/{project_id}/documents/manifest",
+    response_model=SyncManifestOut,
+    summary="Delta sync manifest",
+    description="Only the documents added, changed or deleted relative to the client's copy, "
+    "given as known (id, sha256) pairs and/or the version of its last manifest.",
+)
+def project_sync_manifest(
+    project_id: int,
+    data: SyncManifestIn,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    known = None if data.known is None else {e.id: e.sha256 for e in data.known}
+    return sync_manifest(
+        db, user_id=current_user.id, project_id=project_id, known=known, since=data.since
+    )
+
+
+@proj_router.get(
+    "/{project_id}/documents/archive",
+    response_class=StreamingResponse,
+    summary="Download project documents as a ZIP",
+    description="Streamed while it is built; objects that cannot be read are listed in "
+    "_errors.txt inside the archive.",
+)
+def download_project_archive(
+    project_id: int,
+    q: str | None = Query(None, description="Filter by filename (ILIKE)"),
+    ids: list[int] | None = Query(None, description="Only these document ids"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    stream = export_documents(
+        db,
+        user_id=current_user.id,
+        project_id=project_id,
+        q=q,
+        doc_ids=ids,
+    )
+    return StreamingResponse(
+        stream,
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="project-{project_id}.zip"'},
+    )
+
+
 # doc_router
+@doc_router.post(
+    "/batch",
+    response_model=DocumentBatchOut,
+    summary="Get metadata and presigned download links for many documents",
+    description="One lookup and one access check for all ids; ids that are missing or not "
+    "accessible are reported per item.",
+)
+def get_documents_batch(
+    data: DocumentBatchIn,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    return get_documents_with_links(
+        db, user_id=current_user.id, doc_ids=data.document_ids, ttl=data.ttl
+    )
+
+
 @doc_router.get(
     "/{doc_id}",
     response_model=DocumentDownloadLinkOut,
@@ -91,14 +255,39 @@ def get_document_link_by_id(
     )
 
 
+@doc_router.get(
+    "/{doc_id}/thumbnail",
+    status_code=status.HTTP_307_TEMPORARY_REDIRECT,
+    summary="Redirect to a document's thumbnail or preview",
+    description="404 until the renditions of an image upload have been generated.",
+)
+def get_document_thumbnail(
+    doc_id: int = Path(..., ge=1),
+    size: Literal["thumb", "preview"] = Query("thumb"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    ttl = 600
+    url = get_thumbnail_link(db=db, user_id=current_user.id, doc_id=doc_id, size=size, ttl=ttl)
+    return RedirectResponse(
+        url,
+        status_code=status.HTTP_307_TEMPORARY_REDIRECT,
+        headers={"Cache-Control": f"private, max-age={ttl // 2}"},
+    )
+
+
 @doc_router.put(
     "/{doc_id}",
     response_model=DocumentOut,
     status_code=status.HTTP_200_OK,
     summary="Replace a document file and metadata",
-    description="Uploads a new file, swaps metadata, updates project total size; old file deleted.",
+    description=(
+        "Uploads a new file and swaps metadata. The previous content is kept as a version "
+        "(see /document/{doc_id}/versions) unless DOCUMENT_VERSIONS_KEEP is 0."
+    ),
 )
 def replace_document_endpoint(
+    background: BackgroundTasks,
     doc_id: int = Path(..., ge=1),
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
@@ -109,6 +298,7 @@ def replace_document_endpoint(
         user_id=current_user.id,
         doc_id=doc_id,
         file=file,
+        background=background,
     )
 
 
@@ -131,6 +321,155 @@ def delete_document_by_id_endpoint(
     return
 
 
+@doc_router.get(
+    "/{doc_id}/versions",
+    response_model=DocumentVersionListOut,
+    summary="List earlier versions of a document",
+)
+def list_document_versions_endpoint(
+    doc_id: int = Path(..., ge=1),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    return list_document_versions(
+        db, user_id=current_user.id, doc_id=doc_id, page=page, page_size=page_size
+    )
+
+
+@doc_router.post(
+    "/{doc_id}/versions/{version}/restore",
+    response_model=DocumentOut,
+    summary="Make an earlier version current again",
+    description="Swaps pointers only; no data is copied. The replaced content becomes a version.",
+)
+def restore_document_version_endpoint(
+    background: BackgroundTasks,
+    doc_id: int = Path(..., ge=1),
+    version: int = Path(..., ge=1),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    return restore_document_version(
+        db, user_id=current_user.id, doc_id=doc_id, version=version, background=background
+    )
+
+
+@doc_router.delete(
+    "/{doc_id}/versions/{version}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Delete an earlier version",
+    description="Owner-only; frees its bytes from the project total.",
+)
+def delete_document_version_endpoint(
+    doc_id: int = Path(..., ge=1),
+    version: int = Path(..., ge=1),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    delete_document_version(db, user_id=current_user.id, doc_id=doc_id, version=version)
+
+
+# upload_router (resumable uploads)
+@proj_router.post(
+    "/{project_id}/uploads",
+    response_model=UploadSessionOut,
+    status_code=status.HTTP_201_CREATED,
+    summary="Start a resumable upload",
+    description="Then PATCH /uploads/{id} chunk by chunk and POST /uploads/{id}/complete.",
+)
+def create_project_upload(
+    project_id: int,
+    data: UploadSessionIn,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    return create_upload_session(
+        db,
+        user_id=current_user.id,
+        project_id=project_id,
+        filename=data.filename,
+        size_bytes=data.size_bytes,
+        content_type=data.content_type,
+    )
+
+
+@upload_router.get(
+    "/{upload_id}",
+    response_model=UploadSessionOut,
+    summary="Upload progress",
+    description="missing_offsets lists the chunks still to send.",
+)
+def get_upload(
+    upload_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    return get_upload_progress(db, user_id=current_user.id, upload_id=upload_id)
+
+
+@upload_router.patch(
+    "/{upload_id}",
+    response_model=UploadSessionOut,
+    summary="Send one chunk",
+    description="Raw bytes (application/octet-stream) of the chunk starting at Upload-Offset.",
+)
+async def put_upload_chunk_endpoint(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset", ge=0),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    data = await _read_body(request, settings.UPLOAD_CHUNK_BYTES)
+    return await run_in_threadpool(
+        put_upload_chunk,
+        db,
+        user_id=current_user.id,
+        upload_id=upload_id,
+        offset=upload_offset,
+        data=data,
+    )
+
+
+@upload_router.post(
+    "/{upload_id}/complete",
+    response_model=DocumentOut,
+    status_code=status.HTTP_201_CREATED,
+    summary="Finish a resumable upload",
+)
+def complete_upload_endpoint(
+    upload_id: str,
+    background: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    return complete_upload(db, user_id=current_user.id, upload_id=upload_id, background=background)
+
+
+@upload_router.delete(
+    "/{upload_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Abandon a resumable upload",
+)
+def abort_upload_endpoint(
+    upload_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    abort_upload(db, user_id=current_user.id, upload_id=upload_id)
+
+
+async def _read_body(request: Request, max_bytes: int) -> bytes:
+    buf = bytearray()
+    async for chunk in request.stream():
+        buf += chunk
+        if len(buf) > max_bytes:
+            raise ValueError("DOC_TOO_LARGE")
+    return bytes(buf)
+
+
 # Dev ping
 @doc_router.get("/ping")
 def s3_ping(current_user: User = Depends(get_current_user)):
@@ -1,9 +1,20 @@
-from fastapi import APIRouter, Depends, Path, Query, Response, status
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, Path, Query, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.core.deps import get_current_user, get_db
 from app.db.models import User
-from app.schemas import ProjectIn, ProjectOut, ProjectUpdate
+from app.schemas import (
+    BulkInviteIn,
+    BulkInviteOut,
+    ChangeListOut,
+    ProjectIn,
+    ProjectOut,
+    ProjectUpdate,
+)
+from app.services import changes as changes_svc
 from app.services import project as project_svc
 
 router = APIRouter(tags=["projects"])
@@ -87,3 +98,64 @@ def invite_user_endpoint(
     current_user: User = Depends(get_current_user),
 ):
     return project_svc.invite_user(db, current_user, project_id, target_login)
+
+
+@router.post(
+    "/project/{project_id}/invite/bulk",
+    response_model=BulkInviteOut,
+    summary="Invite many users by login",
+)
+def invite_users_endpoint(
+    data: BulkInviteIn,
+    project_id: int = Path(..., ge=1),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    return project_svc.invite_users(db, current_user, project_id, data.logins)
+
+
+@router.get(
+    "/projects/{project_id}/changes",
+    response_model=ChangeListOut,
+    summary="Project change log",
+    description="Entries after `since`, oldest first. Entries written by one request share "
+    "their `seq` and are never split across pages.",
+)
+def list_changes_endpoint(
+    project_id: int = Path(..., ge=1),
+    since: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    return changes_svc.list_changes(
+        db, user_id=current_user.id, project_id=project_id, since=since, limit=limit
+    )
+
+
+@router.get(
+    "/projects/{project_id}/changes/stream",
+    summary="Follow the project change log (SSE)",
+    description="Server-sent events for entries after `since` (or the `Last-Event-ID` header "
+    "of a reconnecting client), then for new entries as they are committed.",
+    response_class=StreamingResponse,
+)
+async def stream_changes_endpoint(
+    project_id: int = Path(..., ge=1),
+    since: int = Query(0, ge=0),
+    last_event_id: Optional[int] = Header(None, ge=0),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    user_id = current_user.id
+    db.close()  # the stream may stay open for hours; do not hold a pooled connection
+    events = await changes_svc.change_stream(
+        user_id=user_id,
+        project_id=project_id,
+        since=since if last_event_id is None else last_event_id,
+    )
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,166 @@
+"""Fan-out of project change notifications to the SSE subscribers of this process.
+
+Writers only append to ``project_changes``. On PostgreSQL a statement trigger NOTIFYs the
+project id when the transaction commits, and one LISTEN connection per worker process wakes
+the broker; elsewhere the session's after-commit hook does it in-process. On a wake-up the
+broker reads the new entries of that project once and hands the same batch to every
+subscriber, so a change costs one query however many clients are connected.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager
+from typing import Callable
+
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "project_changes"
+RESYNC = object()  # queued instead of a batch when a subscriber fell behind or events were lost
+
+
+class ChangeBroker:
+    """Per-process hub between change notifications and subscriber queues.
+
+    ``fetch(db, project_id, after_seq)`` returns the new entries in ``seq`` order and
+    ``latest(db, project_id)`` the current sequence; both run in the threadpool.
+    """
+
+    def __init__(self, fetch: Callable, latest: Callable, *, queue_size: int = 64):
+        self._fetch = fetch
+        self._latest = latest
+        self.queue_size = queue_size
+        self._factory = None
+        self._subs: dict[int, set[asyncio.Queue]] = {}
+        self._last: dict[int, int] = {}
+        self._dirty: set[int] = set()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wake: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._listener: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    @property
+    def listening(self) -> bool:
+        """True while a LISTEN connection delivers notifications (writers need not)."""
+        return self._listener is not None and self._listener.is_alive()
+
+    @asynccontextmanager
+    async def subscribe(self, project_id: int, session_factory):
+        """Queue of entry batches for ``project_id`` committed after the subscription began."""
+        self._start(session_factory)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        first = project_id not in self._subs
+        self._subs.setdefault(project_id, set()).add(queue)
+        try:
+            if first:
+                self._last[project_id] = await run_in_threadpool(
+                    self._query, self._latest, project_id
+                )
+                self._mark(project_id)  # a commit may have slipped in while we asked
+            yield queue
+        finally:
+            subs = self._subs.get(project_id, set())
+            subs.discard(queue)
+            if not subs:
+                self._subs.pop(project_id, None)
+                self._last.pop(project_id, None)
+
+    def notify(self, project_id: int) -> None:
+        """Thread-safe: project ``project_id`` has new committed entries."""
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._mark, project_id)
+
+    def listen(self, dsn: str) -> None:
+        """Start the LISTEN thread (PostgreSQL); later calls are no-ops."""
+        if self._listener is None:
+            self._stop.clear()
+            self._listener = threading.Thread(
+                target=self._listen, args=(dsn,), name="changefeed-listener", daemon=True
+            )
+            self._listener.start()
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+        self._task = self._listener = None
+
+    # internals
+    def _start(self, session_factory) -> None:
+        self._factory = self._factory or session_factory
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._wake = asyncio.Event()
+            self._task = self._loop.create_task(self._run())
+
+    def _query(self, fn, *args):
+        with self._factory() as db:
+            return fn(db, *args)
+
+    def _mark(self, project_id: int) -> None:
+        if project_id in self._subs and self._wake is not None:
+            self._dirty.add(project_id)
+            self._wake.set()
+
+    def _mark_all(self) -> None:
+        for project_id in list(self._subs):
+            self._mark(project_id)
+
+    async def _run(self) -> None:
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            dirty, self._dirty = self._dirty, set()
+            for project_id in dirty:
+                if project_id not in self._last:  # baseline still pending; it marks again
+                    continue
+                try:
+                    batch = await run_in_threadpool(
+                        self._query, self._fetch, project_id, self._last[project_id]
+                    )
+                except Exception:
+                    logger.warning(
+                        "Change feed fetch failed (project=%s)", project_id, exc_info=True
+                    )
+                    self._broadcast(project_id, RESYNC)
+                    continue
+                if batch and project_id in self._last:
+                    self._last[project_id] = batch[-1].seq
+                    self._broadcast(project_id, batch)
+
+    def _broadcast(self, project_id: int, item) -> None:
+        for queue in list(self._subs.get(project_id, ())):
+            try:
+                queue.put_nowait(item)
+            except asyncio.QueueFull:  # a slow client re-reads the log instead
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC)
+
+    def _listen(self, dsn: str) -> None:
+        import psycopg
+
+        while not self._stop.is_set():
+            try:
+                with psycopg.connect(dsn, autocommit=True) as conn:
+                    conn.execute(f"LISTEN {CHANNEL}")
+                    # anything committed while we were not listening
+                    self._call(self._mark_all)
+                    while not self._stop.is_set():
+                        for note in conn.notifies(timeout=1.0):
+                            self.notify(int(note.payload))
+            except Exception:
+                logger.warning("Change feed listener disconnected", exc_info=True)
+                self._stop.wait(1.0)
+
+    def _call(self, fn) -> None:
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(fn)
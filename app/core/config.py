@@ -25,9 +25,44 @@ class Settings(BaseSettings):
     # AWS
     AWS_REGION: str = "us-east-1"
     S3_BUCKET: str = "dummy-bucket"
+    S3_BACKEND: str = "aws"  # aws | local (filesystem stand-in for dev, benchmarks, tools)
+    S3_LOCAL_ROOT: str = ".local-s3"
+    S3_COPY_MULTIPART_THRESHOLD_BYTES: int = 256 * 1024 * 1024  # CopyObject caps at 5 GiB
+    S3_COPY_PART_BYTES: int = 128 * 1024 * 1024
 
     # Others
     PROJECT_SIZE_LIMIT_BYTES: int = 10 * 1024 * 1024  # default 10 MB
+    UPLOAD_BATCH_MAX_FILES: int = 500
+    UPLOAD_CONCURRENCY: int = 8  # S3 uploads in flight per batch request
+    UPLOAD_CHUNK_BYTES: int = 8 * 1024 * 1024  # resumable uploads; S3 parts must be >= 5 MiB
+    UPLOAD_SESSION_TTL_SECONDS: int = 24 * 3600
+    IDEMPOTENCY_TTL_SECONDS: int = 24 * 3600  # how long a stored response is replayed
+    IDEMPOTENCY_LOCK_SECONDS: int = 300  # renewed while a request runs; taken over once it lapses
+    DOCUMENT_VERSIONS_KEEP: int = 10  # previous versions kept per document; 0 keeps none
+    DOCUMENT_VERSION_MAX_AGE_DAYS: int = 0  # prune older versions too; 0 = no age limit
+    DOCUMENT_BATCH_MAX_IDS: int = 500  # ids per batch metadata/link request
+    SYNC_MANIFEST_MAX_KNOWN: int = 100_000  # (id, sha256) pairs a client may post at once
+    CHANGES_PAGE_SIZE: int = 500  # change log entries per page / per catch-up read
+    CHANGES_HEARTBEAT_SECONDS: int = 15  # SSE comment sent on idle streams
+    CHANGES_QUEUE_SIZE: int = 64  # batches buffered per stream before it must resync
+    EXPORT_READ_AHEAD: int = 4  # objects fetched ahead of the ZIP writer
+    EXPORT_CHUNK_BYTES: int = 256 * 1024
+
+    # Thumbnails
+    THUMBNAIL_WORKERS: int = 2  # render processes; 0 renders in the calling thread
+    THUMBNAIL_SIZE: int = 256  # bounding box, px
+    PREVIEW_SIZE: int = 1280
+    THUMBNAIL_TIMEOUT_SECONDS: int = 60
+
+    # Instrumentation
+    SQL_REPEAT_THRESHOLD: int = 10  # same statement shape N times per request -> N+1 warning
+    SQL_REPEAT_RAISE: bool = False  # raise instead of warn (enabled in tests)
+
+    # Tracing
+    TRACING_ENABLED: bool = False
+    TRACING_SAMPLE_RATIO: float = 1.0  # applies to root spans; children follow the parent
+    TRACING_EXPORTER: str = "console"  # console | file
+    TRACING_FILE: str = "traces.jsonl"
 
     model_config = SettingsConfigDict(
         env_file=".env",
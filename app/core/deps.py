@@ -2,10 +2,10 @@ from typing import Annotated
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from jose import ExpiredSignatureError, JWTError, jwt
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
+from app.core.security import user_id_from_token
 from app.db.models.user import User
 from app.db.session import get_db
 
@@ -29,19 +29,8 @@ def get_current_user(
     if creds is None or creds.scheme.lower() != "bearer":
         raise _unauthorized()
 
-    token = creds.credentials
-    try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALG])
-    except (ExpiredSignatureError, JWTError):
-        raise _unauthorized()
-
-    sub = payload.get("sub")
-    if sub is None:
-        raise _unauthorized()
-
-    try:
-        user_id = int(sub)
-    except (TypeError, ValueError):
+    user_id = user_id_from_token(creds.credentials, JWT_SECRET, JWT_ALG)
+    if user_id is None:
         raise _unauthorized()
 
     user = db.get(User, user_id)
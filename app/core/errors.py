@@ -57,6 +57,24 @@ def value_error_handler(request: Request, exc: ValueError):
             status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
             content={"detail": "Project size limit exceeded"},
         )
+    if msg == "DOC_BATCH_TOO_LARGE":
+        return JSONResponse(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            content={"detail": "Too many files in one request"},
+        )
+    if msg == "DOC_NO_THUMBNAIL":
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND, content={"detail": "Thumbnail not available"}
+        )
+    if msg == "DOC_VERSION_NOT_FOUND":
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND, content={"detail": "Version not found"}
+        )
+    if msg == "SYNC_BAD_VERSION":
+        return JSONResponse(
+            status_code=status.HTTP_409_CONFLICT,
+            content={"detail": "Unknown sync version; sync again from the known set"},
+        )
     if msg == "DOC_NOT_FOUND":
         return JSONResponse(
             status_code=status.HTTP_404_NOT_FOUND, content={"detail": "Document not found"}
@@ -66,6 +84,53 @@ def value_error_handler(request: Request, exc: ValueError):
             status_code=status.HTTP_502_BAD_GATEWAY, content={"detail": "Upstream S3 error"}
         )
 
+    # resumable uploads
+    if msg == "UPLOAD_NOT_FOUND":
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND, content={"detail": "Upload session not found"}
+        )
+    if msg == "UPLOAD_EXPIRED":
+        return JSONResponse(
+            status_code=status.HTTP_410_GONE, content={"detail": "Upload session expired"}
+        )
+    if msg == "UPLOAD_BAD_OFFSET":
+        return JSONResponse(
+            status_code=status.HTTP_409_CONFLICT,
+            content={"detail": "Offset must be a chunk boundary inside the file"},
+        )
+    if msg == "UPLOAD_BAD_CHUNK":
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"detail": "Chunk length does not match the chunk size"},
+        )
+    if msg == "UPLOAD_INCOMPLETE":
+        return JSONResponse(
+            status_code=status.HTTP_409_CONFLICT, content={"detail": "Upload has missing chunks"}
+        )
+    if msg == "UPLOAD_LOST":
+        return JSONResponse(
+            status_code=status.HTTP_410_GONE,
+            content={"detail": "Upload could not be completed; start a new upload"},
+        )
+
+    # idempotency keys
+    if msg == "IDEMPOTENCY_KEY_INVALID":
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"detail": "Idempotency-Key must be 1-255 printable characters"},
+        )
+    if msg == "IDEMPOTENCY_IN_PROGRESS":
+        return JSONResponse(
+            status_code=status.HTTP_409_CONFLICT,
+            content={"detail": "A request with this Idempotency-Key is still in progress"},
+            headers={"Retry-After": "1"},
+        )
+    if msg == "IDEMPOTENCY_KEY_REUSED":
+        return JSONResponse(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            content={"detail": "Idempotency-Key was already used for a different request"},
+        )
+
     # fallback
     return JSONResponse(
         status_code=status.HTTP_400_BAD_REQUEST, content={"detail": msg or "Bad Request"}
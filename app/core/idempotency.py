@@ -0,0 +1,117 @@
+"""``Idempotency-Key`` support for mutating requests.
+
+The first request with a given key (per user) runs normally and its response is stored.
+A retry with the same key gets that response back before the endpoint is reached, so the
+upload body is never read again and S3 and the database are left alone. A duplicate that
+arrives while the first is still running gets ``409`` with ``Retry-After``; its lock is
+extended while it runs, so a slow request is never taken over. Responses with a 5xx status
+are not stored, so those can be retried for real.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+from uuid import uuid4
+
+from fastapi import Request, Response
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.errors import value_error_handler
+from app.core.security import user_id_from_token
+from app.services import idempotency as idem_svc
+
+logger = logging.getLogger(__name__)
+
+HEADER = "Idempotency-Key"
+METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+_KEY_RE = re.compile(r"[\x21-\x7e]{1,255}")
+_UNSTORED_HEADERS = {"content-length", "content-type"}  # recomputed / stored on their own
+
+
+def register_idempotency(app, session_factory=None) -> None:
+    @app.middleware("http")
+    async def _idempotency(request: Request, call_next):
+        key = request.headers.get(HEADER)
+        if key is None or request.method not in METHODS:
+            return await call_next(request)
+        user_id = _user_id(request)
+        if user_id is None:
+            return await call_next(request)  # unauthenticated; the endpoint answers 401
+        if not _KEY_RE.fullmatch(key):
+            return value_error_handler(request, ValueError("IDEMPOTENCY_KEY_INVALID"))
+
+        factory = session_factory
+        if factory is None:
+            from app.db.session import SessionLocal as factory
+
+        owner = uuid4().hex
+
+        def run(fn, **kwargs):
+            def call():
+                with factory() as db:
+                    return fn(db, user_id=user_id, key=key, owner=owner, **kwargs)
+
+            return run_in_threadpool(call)
+
+        try:
+            stored = await run(idem_svc.claim_key, method=request.method, path=request.url.path)
+        except ValueError as exc:
+            return value_error_handler(request, exc)
+        if stored is not None:
+            replay = Response(
+                content=stored.response_body,
+                status_code=stored.status_code,
+                media_type=stored.content_type,
+            )
+            for name, value in stored.response_headers or []:
+                replay.headers.append(name, value)
+            replay.headers["Idempotent-Replayed"] = "true"
+            return replay
+
+        heartbeat = asyncio.create_task(_keep_locked(run))
+        try:
+            response = await call_next(request)
+            if response.status_code >= 500:
+                heartbeat.cancel()
+                await run(idem_svc.release_key)
+                return response
+            body = b"".join([chunk async for chunk in response.body_iterator])
+        except BaseException:
+            heartbeat.cancel()
+            await run(idem_svc.release_key)
+            raise
+        heartbeat.cancel()
+        saved = await run(
+            idem_svc.save_response,
+            status_code=response.status_code,
+            content_type=response.headers.get("content-type"),
+            headers=[
+                (k, v) for k, v in response.headers.items() if k.lower() not in _UNSTORED_HEADERS
+            ],
+            body=body,
+        )
+        if not saved:
+            logger.warning("Idempotency-Key lock was lost before the response was stored")
+        return Response(content=body, status_code=response.status_code, headers=response.headers)
+
+
+async def _keep_locked(run) -> None:
+    """Extend the key's lock until cancelled, or until it turns out to be lost."""
+    while True:
+        await asyncio.sleep(settings.IDEMPOTENCY_LOCK_SECONDS / 3)
+        try:
+            if not await run(idem_svc.extend_lock):
+                return
+        except Exception:
+            logger.warning("Could not extend an Idempotency-Key lock", exc_info=True)
+
+
+def _user_id(request: Request) -> int | None:
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return user_id_from_token(token.strip(), settings.JWT_SECRET, settings.JWT_ALG)
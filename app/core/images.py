@@ -0,0 +1,44 @@
+"""Downscaled JPEG renditions of uploaded images.
+
+``render_renditions`` is a plain function of bytes so it can run in a worker process.
+"""
+
+from __future__ import annotations
+
+import io
+
+from PIL import Image, ImageOps
+
+
+def render_renditions(data: bytes, boxes: dict[str, int], quality: int = 82) -> dict[str, bytes]:
+    """Return ``{name: jpeg_bytes}``, each fitting inside a ``box x box`` square.
+
+    Renditions are made largest first and each one is scaled down from the previous,
+    so a big original is only decoded once (at reduced scale for JPEG sources).
+    """
+    order = sorted(boxes.items(), key=lambda kv: kv[1], reverse=True)
+    with Image.open(io.BytesIO(data)) as src:
+        largest = order[0][1]
+        src.draft("RGB", (largest, largest))
+        img = ImageOps.exif_transpose(src)
+        img = _flatten(img)
+
+        out = {}
+        for name, box in order:
+            img.thumbnail((box, box), Image.Resampling.LANCZOS)
+            buf = io.BytesIO()
+            img.save(buf, "JPEG", quality=quality, optimize=True, progressive=box >= 512)
+            out[name] = buf.getvalue()
+    return out
+
+
+def _flatten(img: Image.Image) -> Image.Image:
+    """RGB on a white background (JPEG has no alpha)."""
+    if img.mode in ("RGB", "L"):
+        return img
+    if img.mode in ("RGBA", "LA") or "transparency" in img.info:
+        rgba = img.convert("RGBA")
+        background = Image.new("RGB", rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    return img.convert("RGB")
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core import metrics
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RepeatedQueryError(RuntimeError):
+    pass
+
+
+@dataclass
+class RequestStats:
+    db_count: int = 0
+    db_ms: float = 0.0
+    s3_count: int = 0
+    s3_ms: float = 0.0
+    shapes: Counter = field(default_factory=Counter)
+    repeated: list[str] = field(default_factory=list)
+
+    def server_timing(self, total_ms: float) -> str:
+        return ", ".join(
+            [
+                f'db;dur={self.db_ms:.1f};desc="{self.db_count} queries"',
+                f's3;dur={self.s3_ms:.1f};desc="{self.s3_count} calls"',
+                f"total;dur={total_ms:.1f}",
+            ]
+        )
+
+
+_current: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def current_stats() -> RequestStats | None:
+    return _current.get()
+
+
+@contextmanager
+def track_request():
+    """Collect DB / S3 counters for everything executed inside the block."""
+    stats = RequestStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+# SQL
+_IN_LIST_RE = re.compile(r"\bIN\s*\((?:[^()]|\([^()]*\))*\)", re.IGNORECASE)
+_NUMBER_RE = re.compile(r"\b\d+\b")
+_SPACE_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def statement_shape(statement: str) -> str:
+    shape = _IN_LIST_RE.sub("IN (...)", statement)
+    shape = _NUMBER_RE.sub("?", shape)
+    return _SPACE_RE.sub(" ", shape).strip()
+
+
+def install_sql_hooks(engine: Engine) -> None:
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # on the per-statement context: after_cursor_execute never runs for a failed statement,
+    # so a stack on the (pooled) connection would keep stale entries
+    if context is not None:
+        context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_query_start", None)
+    if start is None:
+        return
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    stats = _current.get()
+    if stats is None:
+        return
+    stats.db_count += 1
+    stats.db_ms += elapsed_ms
+    _check_repeats(stats, statement)
+
+
+def _check_repeats(stats: RequestStats, statement: str) -> None:
+    threshold = settings.SQL_REPEAT_THRESHOLD
+    if threshold <= 0:
+        return
+    shape = statement_shape(statement)
+    stats.shapes[shape] += 1
+    if stats.shapes[shape] != threshold:
+        return
+
+    stats.repeated.append(shape)
+    if settings.SQL_REPEAT_RAISE:
+        raise RepeatedQueryError(f"Statement repeated {threshold} times in one request: {shape}")
+    logger.warning("Possible N+1: statement repeated %d times in one request: %s", threshold, shape)
+
+
+# S3
+@contextmanager
+def record_s3(op: str):
+    start = time.perf_counter()
+    failed = True
+    try:
+        yield
+        failed = False
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.observe_s3(op, elapsed, failed)
+        stats = _current.get()
+        if stats is not None:
+            stats.s3_count += 1
+            stats.s3_ms += elapsed * 1000
+
+
+# HTTP
+def _route_template(request) -> str | None:
+    route = request.scope.get("route")
+    return getattr(route, "path", None)
+
+
+def register_request_instrumentation(app) -> None:
+    @app.middleware("http")
+    async def _instrument_request(request, call_next):
+        start = time.perf_counter()
+        metrics.REQUESTS_IN_FLIGHT.inc()
+        try:
+            with track_request() as stats:
+                response = await call_next(request)
+        finally:
+            metrics.REQUESTS_IN_FLIGHT.dec()
+        elapsed = time.perf_counter() - start
+        total_ms = elapsed * 1000
+        route = _route_template(request)
+
+        metrics.observe_request(request.method, route, response.status_code, elapsed)
+        response.headers["Server-Timing"] = stats.server_timing(total_ms)
+        logger.info(
+            json.dumps(
+                {
+                    "event": "request",
+                    "method": request.method,
+                    "route": route or request.url.path,
+                    "status": response.status_code,
+                    "duration_ms": round(total_ms, 2),
+                    "db_queries": stats.db_count,
+                    "db_ms": round(stats.db_ms, 2),
+                    "s3_calls": stats.s3_count,
+                    "s3_ms": round(stats.s3_ms, 2),
+                    "repeated_statements": stats.repeated,
+                }
+            )
+        )
+        return response
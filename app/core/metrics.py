@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# With PROMETHEUS_MULTIPROC_DIR set (one shared directory per deployment, wiped on start),
+# every uvicorn worker writes its samples to mmap'ed files there and /metrics aggregates them.
+MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+REQUEST_LATENCY = Histogram(
+    "projectboard_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "projectboard_http_requests_in_flight",
+    "HTTP requests currently being served",
+    multiprocess_mode="livesum",
+)
+
+DB_POOL_CONNECTIONS = Gauge(
+    "projectboard_db_pool_connections",
+    "Open DB connections held by the pool",
+    multiprocess_mode="livesum",
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "projectboard_db_pool_checked_out",
+    "DB connections currently checked out of the pool",
+    multiprocess_mode="livesum",
+)
+
+S3_LATENCY = Histogram(
+    "projectboard_s3_operation_duration_seconds",
+    "S3 operation latency",
+    ["operation"],
+)
+S3_ERRORS = Counter(
+    "projectboard_s3_operation_errors",
+    "S3 operations that raised",
+    ["operation"],
+)
+
+UPLOAD_BYTES = Counter("projectboard_upload_bytes", "Bytes accepted by document uploads")
+QUOTA_REJECTIONS = Counter(
+    "projectboard_quota_rejections",
+    "Uploads rejected because the project size limit would be exceeded",
+)
+THUMBNAILS = Counter(
+    "projectboard_thumbnail_jobs",
+    "Thumbnail generation jobs by result (ok, failed, stale)",
+    ["result"],
+)
+
+
+def observe_request(method: str, route: str | None, status: int, seconds: float) -> None:
+    REQUEST_LATENCY.labels(method, route or UNMATCHED_ROUTE, str(status)).observe(seconds)
+
+
+def observe_s3(op: str, seconds: float, failed: bool) -> None:
+    S3_LATENCY.labels(op).observe(seconds)
+    if failed:
+        S3_ERRORS.labels(op).inc()
+
+
+def install_pool_metrics(engine: Engine) -> None:
+    event.listen(engine, "connect", lambda *_: DB_POOL_CONNECTIONS.inc())
+    event.listen(engine, "close", lambda *_: DB_POOL_CONNECTIONS.dec())
+    event.listen(engine, "close_detached", lambda *_: DB_POOL_CONNECTIONS.dec())
+    event.listen(engine, "checkout", lambda *_: DB_POOL_CHECKED_OUT.inc())
+    event.listen(engine, "checkin", lambda *_: DB_POOL_CHECKED_OUT.dec())
+
+
+def render_latest() -> tuple[bytes, str]:
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def mark_worker_dead() -> None:
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,109 @@
+"""SigV4 presigned S3 GET URLs without botocore's per-call request pipeline.
+
+``generate_presigned_url`` builds, resolves and signs a full request and derives the signing
+key on every call. Here botocore presigns one probe URL per bucket, which fixes the endpoint
+(addressing style, custom ``endpoint_url``) and the credential scope; after that each URL is a
+template fill and two HMACs, with the signing key cached per (date, region, service). The
+output is byte-identical to botocore's ``s3v4`` presigner (see ``test_presign.py``).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+from datetime import datetime, timezone
+from functools import lru_cache
+from urllib.parse import parse_qs, quote, urlsplit
+
+ALGORITHM = "AWS4-HMAC-SHA256"
+_PROBE_KEY = "x"
+
+
+@lru_cache(maxsize=64)
+def signing_key(secret_key: str, date: str, region: str, service: str) -> bytes:
+    key = hmac.new(f"AWS4{secret_key}".encode(), date.encode(), hashlib.sha256).digest()
+    for part in (region, service, "aws4_request"):
+        key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+    return key
+
+
+class S3Presigner:
+    """Presigns GET URLs for the keys of one bucket.
+
+    ``base_url`` is everything before the object key (``https://bucket.s3.amazonaws.com/`` or
+    ``https://s3.region.amazonaws.com/bucket/``). ``credentials`` is a botocore credentials
+    object; refreshable ones are frozen on every call, so rotation is picked up.
+    """
+
+    def __init__(self, base_url: str, region: str, credentials, *, service: str = "s3"):
+        parts = urlsplit(base_url)
+        self.base_url = base_url
+        self.region = region
+        self.service = service
+        self._credentials = credentials
+        self._origin = f"{parts.scheme}://{parts.netloc}"
+        self._path = parts.path
+        self._host = _canonical_host(parts)
+
+    @classmethod
+    def from_client(cls, client, bucket: str) -> S3Presigner | None:
+        """Take endpoint, scope and credentials from a boto3 client; None if that fails."""
+        try:
+            credentials = client._get_credentials()
+            if credentials is None:
+                return None
+            probe = client.generate_presigned_url(
+                "get_object", Params={"Bucket": bucket, "Key": _PROBE_KEY}, ExpiresIn=1
+            )
+        except Exception:
+            return None
+        parts = urlsplit(probe)
+        scope = parse_qs(parts.query).get("X-Amz-Credential", [""])[0].split("/")
+        if len(scope) != 5 or not parts.path.endswith("/" + _PROBE_KEY):
+            return None  # not a SigV4 query URL we know how to reproduce
+        base = f"{parts.scheme}://{parts.netloc}{parts.path[: -len(_PROBE_KEY)]}"
+        return cls(base, scope[2], credentials, service=scope[3])
+
+    def presign_get(self, key: str, expires_in: int, *, now: datetime | None = None) -> str:
+        now = now or datetime.now(timezone.utc)
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        date = amz_date[:8]
+        creds = self._credentials.get_frozen_credentials()
+        scope = f"{date}/{self.region}/{self.service}/aws4_request"
+
+        path = self._path + quote(key, safe="/~")
+        credential = _q(f"{creds.access_key}/{scope}")
+        # canonical order (sorted by name); the URL keeps botocore's order
+        token = f"X-Amz-Security-Token={_q(creds.token)}&" if creds.token else ""
+        canonical_query = (
+            f"X-Amz-Algorithm={ALGORITHM}&X-Amz-Credential={credential}"
+            f"&X-Amz-Date={amz_date}&X-Amz-Expires={expires_in}&{token}X-Amz-SignedHeaders=host"
+        )
+        canonical_request = (
+            f"GET\n{path}\n{canonical_query}\nhost:{self._host}\n\nhost\nUNSIGNED-PAYLOAD"
+        )
+        string_to_sign = (
+            f"{ALGORITHM}\n{amz_date}\n{scope}\n"
+            + hashlib.sha256(canonical_request.encode()).hexdigest()
+        )
+        key_bytes = signing_key(creds.secret_key, date, self.region, self.service)
+        signature = hmac.new(key_bytes, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+        query = (
+            f"X-Amz-Algorithm={ALGORITHM}&X-Amz-Credential={credential}&X-Amz-Date={amz_date}"
+            f"&X-Amz-Expires={expires_in}&X-Amz-SignedHeaders=host"
+        )
+        if creds.token:
+            query += f"&X-Amz-Security-Token={_q(creds.token)}"
+        return f"{self._origin}{path}?{query}&X-Amz-Signature={signature}"
+
+
+def _q(value: str) -> str:
+    return quote(value, safe="-_.~")
+
+
+def _canonical_host(parts) -> str:
+    default = {"http": 80, "https": 443}.get(parts.scheme)
+    if parts.port is not None and parts.port == default:
+        return parts.hostname
+    return parts.netloc
@@ -2,7 +2,7 @@ from datetime import datetime, timedelta, timezone
 from os import getenv
 from typing import Any, Dict
 
-from jose import jwt
+from jose import ExpiredSignatureError, JWTError, jwt
 from passlib.context import CryptContext
 
 _pwd_ctx = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -25,3 +25,15 @@ def create_access_token(subject: str, ttl_minutes: int = ACCESS_TOKEN_EXPIRE_MIN
     exp = now + timedelta(minutes=ttl_minutes)
     payload: Dict[str, Any] = {"sub": subject, "iat": int(now.timestamp()), "exp": exp}
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALG)
+
+
+def user_id_from_token(token: str, secret: str = JWT_SECRET, alg: str = JWT_ALG) -> int | None:
+    """The user id a valid access token was issued for, else ``None``."""
+    try:
+        payload = jwt.decode(token, secret, algorithms=[alg])
+    except (ExpiredSignatureError, JWTError):
+        return None
+    try:
+        return int(payload.get("sub"))
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,317 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from itertools import count
+from pathlib import Path
+from urllib.parse import quote
+from uuid import uuid4
+
+from botocore.exceptions import ClientError
+from botocore.response import StreamingBody
+
+_CHUNK = 1024 * 1024
+_MAX_OPEN_LISTINGS = 64
+_MIN_PART_SIZE = 5 * 1024 * 1024  # S3 rejects smaller non-final parts on completion
+
+
+class LocalS3Client:
+    """Filesystem-backed stand-in for the subset of the boto3 S3 client the app uses.
+
+    Selected with ``S3_BACKEND=local``; objects live under ``<root>/<bucket>/<key>`` so the
+    API, benchmarks and offline tools running in separate processes see the same data.
+    """
+
+    # continuation tokens must outlive a single client instance (get_s3_client builds one per call)
+    _listings: OrderedDict[str, list] = OrderedDict()
+    _listings_lock = threading.Lock()
+    _tokens = count(1)
+
+    def __init__(self, root: str | os.PathLike):
+        self.root = Path(root)
+
+    # helpers
+    def _path(self, bucket: str, key: str) -> Path:
+        base = (self.root / bucket).resolve()
+        path = (base / key).resolve()
+        if base not in path.parents:
+            raise ClientError({"Error": {"Code": "InvalidKey", "Message": key}}, "LocalS3")
+        return path
+
+    def _key(self, bucket: str, path: Path) -> str:
+        return path.relative_to((self.root / bucket).resolve()).as_posix()
+
+    @staticmethod
+    def _not_found(op: str, key: str) -> ClientError:
+        return ClientError(
+            {
+                "Error": {"Code": "NoSuchKey", "Message": key},
+                "ResponseMetadata": {"HTTPStatusCode": 404},
+            },
+            op,
+        )
+
+    @staticmethod
+    def _error(code: str, op: str, message: str = "", status: int = 400) -> ClientError:
+        return ClientError(
+            {
+                "Error": {"Code": code, "Message": message},
+                "ResponseMetadata": {"HTTPStatusCode": status},
+            },
+            op,
+        )
+
+    @staticmethod
+    def _etag(path: Path) -> str:
+        md5 = hashlib.md5(usedforsecurity=False)
+        with open(path, "rb") as fh:
+            for chunk in iter(lambda: fh.read(_CHUNK), b""):
+                md5.update(chunk)
+        return f'"{md5.hexdigest()}"'
+
+    def _write(self, bucket: str, key: str, fileobj) -> str:
+        path = self._path(bucket, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        md5 = hashlib.md5(usedforsecurity=False)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".upload-")
+        with os.fdopen(fd, "wb") as out:
+            for chunk in iter(lambda: fileobj.read(_CHUNK), b""):
+                md5.update(chunk)
+                out.write(chunk)
+        os.replace(tmp, path)
+        return f'"{md5.hexdigest()}"'
+
+    # bucket
+    def head_bucket(self, Bucket: str) -> dict:
+        (self.root / Bucket).mkdir(parents=True, exist_ok=True)
+        return {}
+
+    # objects
+    def upload_fileobj(self, Fileobj, Bucket: str, Key: str, ExtraArgs=None, **kwargs) -> None:
+        self._write(Bucket, Key, Fileobj)
+
+    def put_object(self, Bucket: str, Key: str, Body=b"", **kwargs) -> dict:
+        if isinstance(Body, (bytes, bytearray)):
+            Body = io.BytesIO(Body)
+        return {"ETag": self._write(Bucket, Key, Body)}
+
+    def head_object(self, Bucket: str, Key: str, **kwargs) -> dict:
+        path = self._path(Bucket, Key)
+        if not path.is_file():
+            raise self._not_found("HeadObject", Key)
+        st = path.stat()
+        return {
+            "ContentLength": st.st_size,
+            "ETag": self._etag(path),
+            "LastModified": datetime.fromtimestamp(st.st_mtime, tz=timezone.utc),
+        }
+
+    def get_object(self, Bucket: str, Key: str, **kwargs) -> dict:
+        path = self._path(Bucket, Key)
+        if not path.is_file():
+            raise self._not_found("GetObject", Key)
+        size = path.stat().st_size
+        return {
+            "Body": StreamingBody(open(path, "rb"), size),
+            "ContentLength": size,
+        }
+
+    def copy_object(self, Bucket: str, Key: str, CopySource: dict, **kwargs) -> dict:
+        src = self._path(CopySource["Bucket"], CopySource["Key"])
+        if not src.is_file():
+            raise self._not_found("CopyObject", CopySource["Key"])
+        with open(src, "rb") as fh:
+            etag = self._write(Bucket, Key, fh)
+        return {"CopyObjectResult": {"ETag": etag}}
+
+    def delete_object(self, Bucket: str, Key: str, **kwargs) -> dict:
+        self._path(Bucket, Key).unlink(missing_ok=True)
+        return {}
+
+    def list_objects_v2(
+        self,
+        Bucket: str,
+        Prefix: str = "",
+        ContinuationToken: str | None = None,
+        MaxKeys: int = 1000,
+        Delimiter: str | None = None,
+        **kwargs,
+    ) -> dict:
+        if ContinuationToken:
+            with self._listings_lock:
+                entries = self._listings.pop(ContinuationToken, [])
+        else:
+            entries = self._scan(Bucket, Prefix)
+            if Delimiter:
+                entries = self._group(Bucket, Prefix, Delimiter, entries)
+
+        page, rest = entries[:MaxKeys], entries[MaxKeys:]
+        contents, prefixes = [], []
+        for entry in page:
+            if isinstance(entry, str):
+                prefixes.append({"Prefix": entry})
+                continue
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            contents.append({"Key": self._key(Bucket, entry), "Size": st.st_size})
+
+        resp = {
+            "Contents": contents,
+            "KeyCount": len(contents) + len(prefixes),
+            "IsTruncated": bool(rest),
+        }
+        if prefixes:
+            resp["CommonPrefixes"] = prefixes
+        if rest:
+            with self._listings_lock:
+                token = str(next(self._tokens))
+                self._listings[token] = rest
+                while len(self._listings) > _MAX_OPEN_LISTINGS:
+                    self._listings.popitem(last=False)
+            resp["NextContinuationToken"] = token
+        return resp
+
+    def _group(self, bucket: str, prefix: str, delimiter: str, paths: list[Path]) -> list:
+        """Roll keys up to ``CommonPrefixes`` (str entries) the way S3 does for ``Delimiter``."""
+        grouped: list[Path | str] = []
+        for path in paths:
+            rest = self._key(bucket, path)[len(prefix) :]
+            cut = rest.find(delimiter)
+            if cut < 0:
+                grouped.append(path)
+                continue
+            common = prefix + rest[: cut + len(delimiter)]
+            if not grouped or grouped[-1] != common:
+                grouped.append(common)
+        return grouped
+
+    def _scan(self, bucket: str, prefix: str) -> list[Path]:
+        base = (self.root / bucket).resolve()
+        start = base / prefix.rsplit("/", 1)[0] if "/" in prefix else base
+        if not start.is_dir():
+            return []
+        found = []
+        for dirpath, _, filenames in os.walk(start):
+            for name in filenames:
+                if name.startswith(".upload-"):
+                    continue
+                path = Path(dirpath) / name
+                if path.relative_to(base).as_posix().startswith(prefix):
+                    found.append(path)
+        found.sort(key=lambda p: p.relative_to(base).as_posix())
+        return found
+
+    # multipart (parts live under <root>/.multipart/<bucket>/<upload id>/ until completed)
+    def _upload_dir(self, bucket: str, key: str, upload_id: str, op: str) -> Path:
+        path = self.root / ".multipart" / bucket / upload_id
+        if not upload_id.isalnum() or not path.is_dir() or (path / "key").read_text() != key:
+            raise self._error("NoSuchUpload", op, upload_id, 404)
+        return path
+
+    def create_multipart_upload(self, Bucket: str, Key: str, **kwargs) -> dict:
+        self._path(Bucket, Key)
+        upload_id = uuid4().hex
+        path = self.root / ".multipart" / Bucket / upload_id
+        path.mkdir(parents=True)
+        (path / "key").write_text(Key)
+        return {"Bucket": Bucket, "Key": Key, "UploadId": upload_id}
+
+    def upload_part(
+        self, Bucket: str, Key: str, UploadId: str, PartNumber: int, Body=b"", **kwargs
+    ) -> dict:
+        path = self._upload_dir(Bucket, Key, UploadId, "UploadPart")
+        if not 1 <= PartNumber <= 10000:
+            raise self._error("InvalidArgument", "UploadPart", f"PartNumber {PartNumber}")
+        if isinstance(Body, (bytes, bytearray)):
+            Body = io.BytesIO(Body)
+        md5 = hashlib.md5(usedforsecurity=False)
+        fd, tmp = tempfile.mkstemp(dir=path, prefix=".part-")
+        with os.fdopen(fd, "wb") as out:
+            for chunk in iter(lambda: Body.read(_CHUNK), b""):
+                md5.update(chunk)
+                out.write(chunk)
+        os.replace(tmp, path / f"{PartNumber:05d}")
+        return {"ETag": f'"{md5.hexdigest()}"'}
+
+    def upload_part_copy(
+        self,
+        Bucket: str,
+        Key: str,
+        UploadId: str,
+        PartNumber: int,
+        CopySource: dict,
+        CopySourceRange: str,
+        **kwargs,
+    ) -> dict:
+        src = self._path(CopySource["Bucket"], CopySource["Key"])
+        if not src.is_file():
+            raise self._not_found("UploadPartCopy", CopySource["Key"])
+        first, _, last = CopySourceRange.removeprefix("bytes=").partition("-")
+        start, end = int(first), int(last)
+        if not 0 <= start <= end < src.stat().st_size:
+            raise self._error("InvalidRange", "UploadPartCopy", CopySourceRange, 416)
+        with open(src, "rb") as fh:
+            fh.seek(start)
+            resp = self.upload_part(Bucket, Key, UploadId, PartNumber, _Range(fh, end - start + 1))
+        return {"CopyPartResult": {"ETag": resp["ETag"]}}
+
+    def complete_multipart_upload(
+        self, Bucket: str, Key: str, UploadId: str, MultipartUpload: dict, **kwargs
+    ) -> dict:
+        op = "CompleteMultipartUpload"
+        path = self._upload_dir(Bucket, Key, UploadId, op)
+        parts = MultipartUpload.get("Parts") or []
+        numbers = [p["PartNumber"] for p in parts]
+        if not parts or numbers != sorted(set(numbers)):
+            raise self._error("InvalidPartOrder", op)
+        files, digests = [], []
+        for i, part in enumerate(parts):
+            file = path / f"{part['PartNumber']:05d}"
+            if not file.is_file() or self._etag(file) != part["ETag"]:
+                raise self._error("InvalidPart", op, str(part["PartNumber"]))
+            if i < len(parts) - 1 and file.stat().st_size < _MIN_PART_SIZE:
+                raise self._error("EntityTooSmall", op, str(part["PartNumber"]))
+            files.append(file)
+            digests.append(bytes.fromhex(part["ETag"].strip('"')))
+
+        target = self._path(Bucket, Key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=".upload-")
+        with os.fdopen(fd, "wb") as out:
+            for file in files:
+                with open(file, "rb") as src:
+                    shutil.copyfileobj(src, out, _CHUNK)
+        os.replace(tmp, target)
+        shutil.rmtree(path, ignore_errors=True)
+        etag = hashlib.md5(b"".join(digests), usedforsecurity=False).hexdigest()
+        return {"Bucket": Bucket, "Key": Key, "ETag": f'"{etag}-{len(parts)}"'}
+
+    def abort_multipart_upload(self, Bucket: str, Key: str, UploadId: str, **kwargs) -> dict:
+        shutil.rmtree(self._upload_dir(Bucket, Key, UploadId, "AbortMultipartUpload"))
+        return {}
+
+    def generate_presigned_url(self, ClientMethod: str, Params: dict, ExpiresIn: int = 3600):
+        key = quote(Params["Key"], safe="/~")
+        return f"http://local-s3/{Params['Bucket']}/{key}?X-Amz-Expires={ExpiresIn}"
+
+
+class _Range:
+    """Read at most ``length`` bytes from ``fh``."""
+
+    def __init__(self, fh, length: int):
+        self._fh = fh
+        self._left = length
+
+    def read(self, n: int = -1) -> bytes:
+        n = self._left if n < 0 else min(n, self._left)
+        data = self._fh.read(n)
+        self._left -= len(data)
+        return data
@@ -3,21 +3,37 @@ from __future__ import annotations
 import logging
 
 import boto3
+from botocore.config import Config
 from botocore.exceptions import BotoCoreError, ClientError
 
 from app.core.config import settings
+from app.core.instrumentation import record_s3
+from app.core.presign import S3Presigner
+from app.core.storage_local import LocalS3Client
+from app.core.tracing import instrument_boto_client
 
 logger = logging.getLogger(__name__)
 
+_presigners: dict[str, S3Presigner] = {}  # per bucket; built from the first client
+
 
 def get_s3_client():
-    return boto3.client("s3", region_name=settings.AWS_REGION)
+    if settings.S3_BACKEND == "local":
+        return LocalS3Client(settings.S3_LOCAL_ROOT)
+    # SigV4 for presigned URLs too (botocore would use SigV2 in us-east-1)
+    client = boto3.client(
+        "s3", region_name=settings.AWS_REGION, config=Config(signature_version="s3v4")
+    )
+    if settings.TRACING_ENABLED:
+        instrument_boto_client(client)
+    return client
 
 
 def ping_bucket() -> bool:
     s3 = get_s3_client()
     try:
-        s3.head_bucket(Bucket=settings.S3_BUCKET)
+        with record_s3("ping_bucket"):
+            s3.head_bucket(Bucket=settings.S3_BUCKET)
         return True
     except ClientError as e:
         resp = e.response or {}
@@ -33,28 +49,32 @@ def ping_bucket() -> bool:
         return False
 
 
-def put_file(key: str, fileobj, content_type: str, metadata: dict | None = None) -> str | None:
-    s3 = get_s3_client()
+def put_file(
+    key: str, fileobj, content_type: str, metadata: dict | None = None, client=None
+) -> str | None:
+    """Store ``fileobj`` with a single PUT and return the object's ETag.
+
+    Direct uploads are capped by the project size limit; big files go through the resumable
+    (multipart) upload API instead.
+    """
+    s3 = client or get_s3_client()
     extra = {"ContentType": content_type}
     if metadata:
         extra["Metadata"] = metadata
     try:
-        s3.upload_fileobj(
-            Fileobj=fileobj,
-            Bucket=settings.S3_BUCKET,
-            Key=key,
-            ExtraArgs=extra,
-        )
-        return None
+        with record_s3("put_file"):
+            resp = s3.put_object(Bucket=settings.S3_BUCKET, Key=key, Body=fileobj, **extra)
+        return resp.get("ETag")
     except (ClientError, BotoCoreError) as e:
         logger.exception("S3 put_file failed (key=%s): %s", key, e)
         raise ValueError("DOC_S3_ERROR")
 
 
-def delete_file(key: str) -> None:
-    s3 = get_s3_client()
+def delete_file(key: str, client=None) -> None:
+    s3 = client or get_s3_client()
     try:
-        s3.delete_object(Bucket=settings.S3_BUCKET, Key=key)
+        with record_s3("delete_file"):
+            s3.delete_object(Bucket=settings.S3_BUCKET, Key=key)
     except ClientError as e:
         code = (e.response or {}).get("Error", {}).get("Code")
         if code in {"NoSuchKey", "NotFound"}:
@@ -64,7 +84,174 @@ def delete_file(key: str) -> None:
         raise ValueError("DOC_S3_ERROR")
 
 
+def create_multipart_upload(
+    key: str, content_type: str, metadata: dict | None = None, client=None
+) -> str:
+    s3 = client or get_s3_client()
+    extra = {"ContentType": content_type}
+    if metadata:
+        extra["Metadata"] = metadata
+    try:
+        with record_s3("create_multipart_upload"):
+            resp = s3.create_multipart_upload(Bucket=settings.S3_BUCKET, Key=key, **extra)
+        return resp["UploadId"]
+    except (ClientError, BotoCoreError) as e:
+        logger.exception("S3 create_multipart_upload failed (key=%s): %s", key, e)
+        raise ValueError("DOC_S3_ERROR")
+
+
+def upload_part(key: str, upload_id: str, part_number: int, data: bytes, client=None) -> str:
+    """Store one part and return its ETag."""
+    s3 = client or get_s3_client()
+    try:
+        with record_s3("upload_part"):
+            resp = s3.upload_part(
+                Bucket=settings.S3_BUCKET,
+                Key=key,
+                UploadId=upload_id,
+                PartNumber=part_number,
+                Body=data,
+            )
+        return resp["ETag"]
+    except (ClientError, BotoCoreError) as e:
+        logger.exception("S3 upload_part failed (key=%s, part=%s): %s", key, part_number, e)
+        raise ValueError("DOC_S3_ERROR")
+
+
+def complete_multipart_upload(
+    key: str, upload_id: str, parts: list[tuple[int, str]], client=None
+) -> str | None:
+    """Assemble the object from ``(part_number, etag)`` pairs in ascending order.
+
+    Returns the ETag of the assembled object.
+    """
+    s3 = client or get_s3_client()
+    try:
+        with record_s3("complete_multipart_upload"):
+            resp = s3.complete_multipart_upload(
+                Bucket=settings.S3_BUCKET,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": [{"PartNumber": n, "ETag": etag} for n, etag in parts]},
+            )
+        return resp.get("ETag")
+    except (ClientError, BotoCoreError) as e:
+        logger.exception("S3 complete_multipart_upload failed (key=%s): %s", key, e)
+        raise ValueError("DOC_S3_ERROR")
+
+
+def abort_multipart_upload(key: str, upload_id: str, client=None) -> None:
+    s3 = client or get_s3_client()
+    try:
+        with record_s3("abort_multipart_upload"):
+            s3.abort_multipart_upload(Bucket=settings.S3_BUCKET, Key=key, UploadId=upload_id)
+    except ClientError as e:
+        code = (e.response or {}).get("Error", {}).get("Code")
+        if code == "NoSuchUpload":
+            return
+        raise ValueError("DOC_S3_ERROR")
+    except BotoCoreError:
+        raise ValueError("DOC_S3_ERROR")
+
+
+def copy_file(src_key: str, dst_key: str, size: int, client=None) -> str | None:
+    """Copy an object inside the bucket without downloading it; returns the copy's ETag.
+
+    Objects above ``S3_COPY_MULTIPART_THRESHOLD_BYTES`` are copied part by part
+    (``CopyObject`` stops at 5 GiB and is slow for big objects).
+    """
+    s3 = client or get_s3_client()
+    source = {"Bucket": settings.S3_BUCKET, "Key": src_key}
+    try:
+        if size <= settings.S3_COPY_MULTIPART_THRESHOLD_BYTES:
+            with record_s3("copy_object"):
+                resp = s3.copy_object(Bucket=settings.S3_BUCKET, Key=dst_key, CopySource=source)
+            return resp.get("CopyObjectResult", {}).get("ETag")
+        return _copy_multipart(s3, source, dst_key, size)
+    except ClientError as e:
+        code = (e.response or {}).get("Error", {}).get("Code")
+        if code in {"NoSuchKey", "NotFound", "404"}:
+            raise ValueError("DOC_NOT_FOUND")
+        logger.exception("S3 copy failed (%s -> %s): %s", src_key, dst_key, e)
+        raise ValueError("DOC_S3_ERROR")
+    except BotoCoreError as e:
+        logger.exception("S3 copy failed (%s -> %s): %s", src_key, dst_key, e)
+        raise ValueError("DOC_S3_ERROR")
+
+
+def _copy_multipart(s3, source: dict, dst_key: str, size: int) -> str | None:
+    with record_s3("head_object"):
+        head = s3.head_object(**source)
+    extra = {"ContentType": head.get("ContentType") or "application/octet-stream"}
+    if head.get("Metadata"):
+        extra["Metadata"] = head["Metadata"]
+    with record_s3("create_multipart_upload"):
+        upload_id = s3.create_multipart_upload(Bucket=settings.S3_BUCKET, Key=dst_key, **extra)[
+            "UploadId"
+        ]
+    try:
+        part_size = max(settings.S3_COPY_PART_BYTES, 5 * 1024 * 1024)
+        parts = []
+        for number, start in enumerate(range(0, size, part_size), start=1):
+            end = min(start + part_size, size) - 1
+            with record_s3("upload_part_copy"):
+                resp = s3.upload_part_copy(
+                    Bucket=settings.S3_BUCKET,
+                    Key=dst_key,
+                    UploadId=upload_id,
+                    PartNumber=number,
+                    CopySource=source,
+                    CopySourceRange=f"bytes={start}-{end}",
+                )
+            parts.append({"PartNumber": number, "ETag": resp["CopyPartResult"]["ETag"]})
+        with record_s3("complete_multipart_upload"):
+            resp = s3.complete_multipart_upload(
+                Bucket=settings.S3_BUCKET,
+                Key=dst_key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+        return resp.get("ETag")
+    except Exception:
+        try:
+            s3.abort_multipart_upload(Bucket=settings.S3_BUCKET, Key=dst_key, UploadId=upload_id)
+        except (ClientError, BotoCoreError):
+            pass
+        raise
+
+
+def iter_object(key: str, chunk_size: int = 1024 * 1024, client=None):
+    """Yield the body of ``key`` in chunks of at most ``chunk_size`` bytes."""
+    s3 = client or get_s3_client()
+    try:
+        with record_s3("get_object"):
+            body = s3.get_object(Bucket=settings.S3_BUCKET, Key=key)["Body"]
+    except ClientError as e:
+        code = (e.response or {}).get("Error", {}).get("Code")
+        if code in {"NoSuchKey", "NotFound"}:
+            raise ValueError("DOC_NOT_FOUND")
+        logger.exception("S3 get_object failed (key=%s): %s", key, e)
+        raise ValueError("DOC_S3_ERROR")
+    except BotoCoreError as e:
+        logger.exception("S3 get_object failed (key=%s): %s", key, e)
+        raise ValueError("DOC_S3_ERROR")
+    try:
+        while chunk := body.read(chunk_size):
+            yield chunk
+    finally:
+        body.close()
+
+
 def presigned_download_url(*, key: str, ttl: int = 600) -> str:
+    return presigned_download_urls([key], ttl=ttl)[0]
+
+
+def presigned_download_urls(keys: list[str], *, ttl: int = 600) -> list[str]:
+    """Presigned GET URLs for ``keys``, in order.
+
+    Signed locally by ``S3Presigner`` once it could be set up from a client; otherwise (local
+    backend, no credentials yet) each URL goes through botocore.
+    """
     if ttl < 1:
         raise ValueError("DOC_BAD_TTL")
     if ttl > 3600:
@@ -75,13 +262,64 @@ def presigned_download_url(*, key: str, ttl: int = 600) -> str:
         logger.error("presigned_download_url failed: S3_BUCKET not configured")
         raise ValueError("DOC_S3_ERROR")
 
-    s3 = get_s3_client()
+    signer = _presigner(bucket)
+    urls: list[str] = []
+    key = None
     try:
-        return s3.generate_presigned_url(
-            ClientMethod="get_object",
-            Params={"Bucket": bucket, "Key": key},
-            ExpiresIn=ttl,
-        )
+        with record_s3("presigned_download_url"):
+            if signer is not None:
+                return [signer.presign_get(key, ttl) for key in keys]
+            s3 = get_s3_client()
+            for key in keys:
+                urls.append(
+                    s3.generate_presigned_url(
+                        ClientMethod="get_object",
+                        Params={"Bucket": bucket, "Key": key},
+                        ExpiresIn=ttl,
+                    )
+                )
+        return urls
     except (ClientError, BotoCoreError) as e:
         logger.exception("S3 presign failed (key=%s): %s", key, e)
         raise ValueError("DOC_S3_ERROR")
+
+
+def _presigner(bucket: str) -> S3Presigner | None:
+    signer = _presigners.get(bucket)
+    if signer is None and settings.S3_BACKEND == "aws":
+        signer = S3Presigner.from_client(get_s3_client(), bucket)
+        if signer is not None:
+            _presigners[bucket] = signer
+    return signer
+
+
+def _list_pages(s3, **params):
+    token = None
+    while True:
+        kwargs = {"Bucket": settings.S3_BUCKET, **params}
+        if token:
+            kwargs["ContinuationToken"] = token
+        try:
+            with record_s3("list_objects"):
+                resp = s3.list_objects_v2(**kwargs)
+        except (ClientError, BotoCoreError) as e:
+            logger.exception("S3 list failed (params=%s): %s", params, e)
+            raise ValueError("DOC_S3_ERROR")
+        yield resp
+        token = resp.get("NextContinuationToken")
+        if not token:
+            return
+
+
+def list_prefix(prefix: str, client=None):
+    """Yield ``(key, size)`` for every object under ``prefix``, one page at a time."""
+    for resp in _list_pages(client or get_s3_client(), Prefix=prefix):
+        for obj in resp.get("Contents", []) or []:
+            yield obj["Key"], int(obj.get("Size", 0))
+
+
+def list_common_prefixes(prefix: str, delimiter: str = "/", client=None):
+    """Yield the next-level "directories" under ``prefix`` (e.g. ``projects/12/``)."""
+    for resp in _list_pages(client or get_s3_client(), Prefix=prefix, Delimiter=delimiter):
+        for entry in resp.get("CommonPrefixes", []) or []:
+            yield entry["Prefix"]
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import functools
+import os
+import sys
+
+from opentelemetry import trace
+from opentelemetry.propagate import extract, inject
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import SpanProcessor, TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SpanExporter
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+tracer = trace.get_tracer("projectboard")
+
+_MAX_STATEMENT_LEN = 2000
+
+
+def _one_line(finished_span) -> str:
+    return finished_span.to_json(indent=None) + os.linesep
+
+
+class _FileSpanExporter(ConsoleSpanExporter):
+    """Console exporter that owns its file; the provider's shutdown (at exit) closes it."""
+
+    def __init__(self, path: str):
+        super().__init__(out=open(path, "a", encoding="utf-8"), formatter=_one_line)
+
+    def shutdown(self) -> None:
+        self.out.close()
+
+
+def _build_exporter() -> SpanExporter | None:
+    kind = (settings.TRACING_EXPORTER or "").lower()
+    if kind == "console":
+        return ConsoleSpanExporter(out=sys.stdout, formatter=_one_line)
+    if kind == "file":
+        return _FileSpanExporter(settings.TRACING_FILE)
+    return None
+
+
+def setup_tracing(processor: SpanProcessor | None = None) -> None:
+    """Install the SDK tracer provider. Without it every span below is a no-op."""
+    if processor is None:
+        if not settings.TRACING_ENABLED:
+            return
+        exporter = _build_exporter()
+        if exporter is None:
+            return
+        processor = BatchSpanProcessor(exporter)
+    trace.set_tracer_provider(build_provider(processor))
+
+
+def build_provider(processor: SpanProcessor) -> TracerProvider:
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": "projectboard-api"}),
+        sampler=ParentBased(TraceIdRatioBased(settings.TRACING_SAMPLE_RATIO)),
+    )
+    provider.add_span_processor(processor)
+    return provider
+
+
+def traced(fn=None, *, name: str | None = None):
+    """Run the decorated function inside a child span named ``module.function``."""
+
+    def decorate(func):
+        span_name = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with tracer.start_as_current_span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorate(fn) if fn is not None else decorate
+
+
+def span(name: str, **attributes):
+    return tracer.start_as_current_span(name, attributes=attributes or None)
+
+
+# SQL
+def install_sql_tracing(engine: Engine) -> None:
+    event.listen(engine, "before_cursor_execute", _sql_before)
+    event.listen(engine, "after_cursor_execute", _sql_after)
+    event.listen(engine, "handle_error", _sql_error)
+
+
+def _sql_before(conn, cursor, statement, parameters, context, executemany):
+    sql_span = tracer.start_span(
+        "db.query",
+        kind=SpanKind.CLIENT,
+        attributes={
+            "db.system": conn.dialect.name,
+            "db.statement": statement[:_MAX_STATEMENT_LEN],
+        },
+    )
+    conn.info.setdefault("trace_spans", []).append(sql_span)
+
+
+def _sql_after(conn, cursor, statement, parameters, context, executemany):
+    spans = conn.info.get("trace_spans")
+    if spans:
+        spans.pop().end()
+
+
+def _sql_error(exception_context):
+    conn = exception_context.connection
+    spans = conn.info.get("trace_spans") if conn is not None else None
+    if spans:
+        sql_span = spans.pop()
+        sql_span.record_exception(exception_context.original_exception)
+        sql_span.set_status(Status(StatusCode.ERROR))
+        sql_span.end()
+
+
+# boto3
+def instrument_boto_client(client) -> None:
+    events = client.meta.events
+    events.register("before-call", _boto_before)
+    events.register("after-call", _boto_after)
+    events.register("after-call-error", _boto_error)
+
+
+def _boto_before(model, params, context, **kwargs):
+    context["trace_span"] = tracer.start_span(
+        f"s3.{model.name}",
+        kind=SpanKind.CLIENT,
+        attributes={"rpc.system": "aws-api", "rpc.service": "S3", "rpc.method": model.name},
+    )
+
+
+def _boto_after(http_response, parsed, model, context, **kwargs):
+    boto_span = context.pop("trace_span", None)
+    if boto_span is not None:
+        boto_span.set_attribute("http.status_code", http_response.status_code)
+        boto_span.end()
+
+
+def _boto_error(exception, context, **kwargs):
+    boto_span = context.pop("trace_span", None)
+    if boto_span is not None:
+        boto_span.record_exception(exception)
+        boto_span.set_status(Status(StatusCode.ERROR))
+        boto_span.end()
+
+
+# HTTP
+def register_tracing(app) -> None:
+    @app.middleware("http")
+    async def _trace_request(request, call_next):
+        parent = extract(request.headers)
+        with tracer.start_as_current_span(
+            f"{request.method} {request.url.path}",
+            context=parent,
+            kind=SpanKind.SERVER,
+            attributes={"http.method": request.method, "http.target": request.url.path},
+        ) as root:
+            response = await call_next(request)
+            route = getattr(request.scope.get("route"), "path", None)
+            if route:
+                root.update_name(f"{request.method} {route}")
+                root.set_attribute("http.route", route)
+            root.set_attribute("http.status_code", response.status_code)
+            if response.status_code >= 500:
+                root.set_status(Status(StatusCode.ERROR))
+            inject(response.headers)
+        return response
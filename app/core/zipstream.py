@@ -0,0 +1,147 @@
+"""Build a ZIP archive on the fly: no seeking, no temp files, no whole members in memory.
+
+``zipfile`` is pointed at a write-only sink, so every member gets a data descriptor and
+the bytes can be handed to the client as soon as they are written. Member bodies are
+fetched ahead of the writer by a small thread pool, each into a bounded queue of chunks,
+so memory stays around ``read_ahead * (queue_depth + 1) * chunk`` however large the
+archive is.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import queue
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator
+
+ERRORS_MEMBER = "_errors.txt"
+
+_DONE = object()
+
+
+@dataclass
+class ZipEntry:
+    name: str
+    size: int
+    open: Callable[[], Iterator[bytes]]  # yields the member body in chunks
+    date_time: tuple = (1980, 1, 1, 0, 0, 0)
+
+
+class _Sink:
+    """Write-only target for ``ZipFile``; collects bytes until the next ``drain()``."""
+
+    def __init__(self):
+        self._buf = bytearray()
+
+    def write(self, data) -> int:
+        self._buf += data
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        out = bytes(self._buf)
+        self._buf.clear()
+        return out
+
+
+class _Prefetch:
+    """Pump one member's chunks on a worker thread into a bounded queue."""
+
+    def __init__(self, pool: ThreadPoolExecutor, entry: ZipEntry, depth: int, stop):
+        self._queue: queue.Queue = queue.Queue(maxsize=depth)
+        self._stop = stop
+        pool.submit(contextvars.copy_context().run, self._pump, entry)
+
+    def _pump(self, entry: ZipEntry) -> None:
+        try:
+            chunks = entry.open()
+            try:
+                for chunk in chunks:
+                    if not self._put(chunk):
+                        return
+            finally:
+                close = getattr(chunks, "close", None)
+                if close:
+                    close()
+            self._put(_DONE)
+        except Exception as exc:
+            self._put(exc)
+
+    def _put(self, item) -> bool:
+        # give up once the consumer is gone instead of blocking a worker forever
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def __iter__(self) -> Iterator[bytes]:
+        while True:
+            item = self._queue.get()
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+
+def stream_zip(
+    entries: Iterable[ZipEntry], *, read_ahead: int = 4, queue_depth: int = 4
+) -> Iterator[bytes]:
+    """Yield the archive of ``entries`` (stored, ZIP64) as it is written.
+
+    A member that cannot be opened is left out and listed in ``_errors.txt`` at the end;
+    a failure halfway through a member aborts the stream.
+    """
+    entries = iter(entries)
+    sink = _Sink()
+    stop = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=max(1, read_ahead), thread_name_prefix="zipstream")
+    window: deque[tuple[ZipEntry, _Prefetch]] = deque()
+    failed: list[str] = []
+
+    def refill() -> None:
+        while len(window) < max(1, read_ahead):
+            entry = next(entries, None)
+            if entry is None:
+                return
+            window.append((entry, _Prefetch(pool, entry, queue_depth, stop)))
+
+    try:
+        with zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED, allowZip64=True) as zf:
+            refill()
+            while window:
+                entry, fetch = window.popleft()
+                refill()
+                chunks = iter(fetch)
+                try:
+                    first = next(chunks, b"")
+                except Exception as exc:
+                    failed.append(f"{entry.name}: {exc}")
+                    continue
+
+                info = zipfile.ZipInfo(entry.name, entry.date_time)
+                info.file_size = entry.size
+                info.external_attr = 0o644 << 16
+                with zf.open(info, "w", force_zip64=True) as member:
+                    member.write(first)
+                    yield sink.drain()
+                    for chunk in chunks:
+                        member.write(chunk)
+                        yield sink.drain()
+                yield sink.drain()
+
+            if failed:
+                zf.writestr(ERRORS_MEMBER, "\n".join(failed) + "\n")
+        yield sink.drain()
+    finally:
+        stop.set()
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -1,7 +1,30 @@
 from .base import Base
 from .document import Document
+from .document_version import DocumentVersion
+from .idempotency_key import IdempotencyKey
 from .project import Project
 from .project_access import ProjectAccess, ProjectRole
+from .project_change import ProjectChange
+from .project_size_state import ProjectSizeState
+from .s3_event_sequencer import S3EventSequencer
+from .s3_object import S3Object
+from .upload_part import UploadPart
+from .upload_session import UploadSession
 from .user import User
 
-__all__ = ["Base", "User", "Project", "ProjectAccess", "Document", "ProjectRole"]
+__all__ = [
+    "Base",
+    "User",
+    "Project",
+    "ProjectAccess",
+    "Document",
+    "ProjectRole",
+    "S3Object",
+    "ProjectSizeState",
+    "S3EventSequencer",
+    "UploadSession",
+    "UploadPart",
+    "IdempotencyKey",
+    "DocumentVersion",
+    "ProjectChange",
+]
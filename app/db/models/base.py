@@ -1,5 +1,37 @@
+from typing import TypeVar
+
+from sqlalchemy import Constraint
 from sqlalchemy.orm import DeclarativeBase
 
 
 class Base(DeclarativeBase):
     pass
+
+
+_C = TypeVar("_C", bound=Constraint)
+
+
+def _not_postgresql(ddl, target, bind, dialect, **kw) -> bool:
+    return dialect.name != "postgresql"
+
+
+def postgresql_only(constraint: _C) -> _C:
+    """Create ``constraint`` only on PostgreSQL, where migrations partition ``documents``."""
+    constraint.info["postgresql"] = True
+    return constraint.ddl_if(dialect="postgresql")
+
+
+def except_postgresql(constraint: _C) -> _C:
+    """Create ``constraint`` on every database but PostgreSQL."""
+    constraint.info["postgresql"] = False
+    return constraint.ddl_if(callable_=_not_postgresql)
+
+
+def compared_on(item, dialect_name: str) -> bool:
+    """Whether alembic autogenerate should compare ``item`` against a ``dialect_name`` database.
+
+    Autogenerate ignores ``ddl_if``, so ``migrations/env.py`` uses this to leave out the
+    constraints of the other dialect.
+    """
+    postgresql = item.info.get("postgresql")
+    return postgresql is None or postgresql == (dialect_name == "postgresql")
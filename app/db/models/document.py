@@ -7,14 +7,57 @@ if TYPE_CHECKING:
 
 from datetime import datetime
 
-from sqlalchemy import BigInteger, DateTime, ForeignKey, Integer, String, func
+from sqlalchemy import (
+    BigInteger,
+    CheckConstraint,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    UniqueConstraint,
+    func,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from app.db.models.base import Base
+from app.db.models.base import Base, except_postgresql, postgresql_only
 
 
 class Document(Base):
+    """A stored file of a project.
+
+    On PostgreSQL the table is hash-partitioned by ``project_id`` (migration 9e3b71c5d2a4):
+    the primary key there is ``(id, project_id)``, and ``s3_key`` is unique per project plus
+    checked to start with ``projects/<project_id>/``, which keeps it unique overall. Queries
+    that filter on ``project_id`` touch a single partition.
+
+    The model declares those constraints for PostgreSQL and a plain unique ``s3_key`` elsewhere.
+    The ORM keeps ``id`` alone as the primary key (alembic does not compare primary keys), and
+    ``migrations/env.py`` leaves the partitions out of autogenerate.
+    """
+
     __tablename__ = "documents"
+    __table_args__ = (
+        # sync manifest: range scan on sync_version; the known-set diff is index-only on Postgres
+        Index(
+            "ix_documents_project_id_sync_version",
+            "project_id",
+            "sync_version",
+            postgresql_include=["id", "sha256"],
+        ),
+        postgresql_only(
+            UniqueConstraint("project_id", "s3_key", name="documents_project_id_s3_key_key")
+        ),
+        postgresql_only(
+            CheckConstraint(
+                "s3_key LIKE 'projects/' || project_id || '/%'",
+                name="ck_documents_s3_key_in_project",
+            )
+        ),
+        except_postgresql(UniqueConstraint("s3_key", name="documents_s3_key_key")),
+    )
+    # fetch server defaults (uploaded_at) via RETURNING instead of a follow-up SELECT
+    __mapper_args__ = {"eager_defaults": True}
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     project_id: Mapped[int] = mapped_column(
@@ -22,8 +65,12 @@ class Document(Base):
         nullable=False,
     )
     filename: Mapped[str] = mapped_column(String(255), nullable=False)
-    s3_key: Mapped[str] = mapped_column(String(512), nullable=False, unique=True)
+    s3_key: Mapped[str] = mapped_column(String(512), nullable=False)
     size_bytes: Mapped[int | None] = mapped_column(BigInteger, nullable=False)
+    content_type: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    # hex digest of the content; NULL until known (resumable uploads fill it in the background)
+    sha256: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    etag: Mapped[str | None] = mapped_column(String(128), nullable=True)
     uploaded_by: Mapped[int | None] = mapped_column(
         ForeignKey("users.id", ondelete="SET NULL"),
         nullable=True,
@@ -33,6 +80,18 @@ class Document(Base):
         server_default=func.now(),
         nullable=False,
     )
+    # set once the downscaled renditions of an image exist in S3
+    thumbnail_key: Mapped[str | None] = mapped_column(String(600), nullable=True)
+    preview_key: Mapped[str | None] = mapped_column(String(600), nullable=True)
+    # bumped on every replace/restore; earlier ones live in document_versions
+    version: Mapped[int] = mapped_column(Integer, nullable=False, server_default="1", default=1)
+    # projects.sync_version when the content last changed / the document entered the project
+    sync_version: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, server_default="0", default=0
+    )
+    added_version: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, server_default="0", default=0
+    )
 
     # relationship
     project: Mapped["Project"] = relationship(back_populates="documents")
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import (
+    BigInteger,
+    DateTime,
+    ForeignKey,
+    ForeignKeyConstraint,
+    Integer,
+    String,
+    UniqueConstraint,
+    func,
+)
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.models.base import Base, except_postgresql
+
+
+class DocumentVersion(Base):
+    """Earlier content of a document, kept in S3 so it can be restored without re-uploading.
+
+    Its object stays under the project's prefix and counts towards the project total.
+    ``project_id`` is the document's; on PostgreSQL, where ``documents`` is partitioned, the
+    foreign key is ``(document_id, project_id)`` so deletes cascade within one partition.
+    That key needs the partitioned primary key, so only the migration creates it; the model
+    declares the plain foreign key for other databases, and services delete versions explicitly.
+    """
+
+    __tablename__ = "document_versions"
+    __table_args__ = (
+        UniqueConstraint("document_id", "version"),
+        except_postgresql(
+            ForeignKeyConstraint(
+                ["document_id"],
+                ["documents.id"],
+                name="document_versions_document_id_fkey",
+                ondelete="CASCADE",
+            )
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    document_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    # project deletes and reconcile select versions by project
+    project_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False)
+    filename: Mapped[str] = mapped_column(String(255), nullable=False)
+    s3_key: Mapped[str] = mapped_column(String(512), nullable=False, unique=True)
+    size_bytes: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    content_type: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    sha256: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    etag: Mapped[str | None] = mapped_column(String(128), nullable=True)
+    uploaded_by: Mapped[int | None] = mapped_column(
+        ForeignKey("users.id", ondelete="SET NULL"), nullable=True
+    )
+    uploaded_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    thumbnail_key: Mapped[str | None] = mapped_column(String(600), nullable=True)
+    preview_key: Mapped[str | None] = mapped_column(String(600), nullable=True)
+    archived_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False, index=True
+    )
+
+    def __repr__(self):
+        return f"<DocumentVersion document={self.document_id} version={self.version}>"
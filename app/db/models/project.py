@@ -17,6 +17,8 @@ from app.db.models.base import Base
 
 class Project(Base):
     __tablename__ = "projects"
+    # fetch created_at / updated_at via INSERT/UPDATE ... RETURNING
+    __mapper_args__ = {"eager_defaults": True}
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     name: Mapped[str] = mapped_column(String(120), nullable=False)
@@ -25,6 +27,10 @@ class Project(Base):
     total_size_bytes: Mapped[int] = mapped_column(
         BigInteger, nullable=False, server_default="0", default=0
     )
+    # bumped by every write that changes the project's documents (see the sync manifest)
+    sync_version: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, server_default="0", default=0
+    )
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), onupdate=func.now(), server_default=func.now()
@@ -39,10 +45,12 @@ class Project(Base):
         back_populates="project",
         cascade="all, delete-orphan",
     )
+    # deleted in bulk by project_id (see delete_project), never loaded for that
     documents: Mapped[list["Document"]] = relationship(
         "Document",
         back_populates="project",
         cascade="all, delete-orphan",
+        passive_deletes=True,
     )
 
     def __repr__(self):
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import DateTime, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.models.base import Base
+
+
+class ProjectSizeState(Base):
+    """Reconciliation bookkeeping for ``projects.total_size_bytes``.
+
+    ``dirty_since`` is set when the Lambda sees a removal it cannot account for (no ledger row);
+    the periodic reconcile run re-lists those prefixes, at most once per project per interval.
+    """
+
+    __tablename__ = "project_size_state"
+
+    project_id: Mapped[int] = mapped_column(
+        ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True
+    )
+    dirty_since: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True, index=True
+    )
+    reconciled_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<ProjectSizeState project={self.project_id} dirty_since={self.dirty_since}>"
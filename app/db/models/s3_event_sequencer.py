@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import DateTime, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.models.base import Base
+
+
+class S3EventSequencer(Base):
+    """Highest S3 event ``sequencer`` processed per key (dedup for at-least-once delivery).
+
+    Sequencers are stored left-padded with zeros to a fixed width, so string comparison matches
+    S3's event order for the same key. Rows older than the Lambda's dedup TTL are purged.
+    """
+
+    __tablename__ = "s3_event_sequencers"
+
+    key: Mapped[str] = mapped_column(String(1024), primary_key=True)
+    sequencer: Mapped[str] = mapped_column(String(32), nullable=False)
+    processed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False, index=True
+    )
+
+    def __repr__(self):
+        return f"<S3EventSequencer key={self.key!r} sequencer={self.sequencer}>"
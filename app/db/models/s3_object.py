@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, ForeignKey, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.models.base import Base
+
+
+class S3Object(Base):
+    """Key -> size ledger kept by the S3 size-updater Lambda.
+
+    Holds only the keys the Lambda counted into the project total: objects without a
+    ``documents`` or ``document_versions`` row, whose sizes the API does not track. Lets
+    ``ObjectRemoved`` events subtract such an object's size without re-listing the project
+    prefix. Rows are written from S3 events only; the API never touches them.
+    """
+
+    __tablename__ = "s3_objects"
+
+    key: Mapped[str] = mapped_column(String(1024), primary_key=True)
+    project_id: Mapped[int] = mapped_column(
+        ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    size_bytes: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    recorded_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+    def __repr__(self):
+        return f"<S3Object key={self.key!r} size={self.size_bytes}>"
@@ -2,11 +2,18 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
+from app.core.instrumentation import install_sql_hooks
+from app.core.metrics import install_pool_metrics
+from app.core.tracing import install_sql_tracing
 
 DATABASE_URL = settings.DATABASE_URL
 
 engine = create_engine(DATABASE_URL, pool_pre_ping=True, future=True)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+install_sql_hooks(engine)
+install_pool_metrics(engine)
+if settings.TRACING_ENABLED:
+    install_sql_tracing(engine)
+SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False)
 
 
 def get_db():
@@ -1,9 +1,16 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 
 import app.db.models
 from app.api.routers import register_routers
 from app.core.errors import register_exception_handlers
+from app.core.idempotency import register_idempotency
+from app.core.instrumentation import register_request_instrumentation
+from app.core.metrics import mark_worker_dead, render_latest
+from app.core.tracing import register_tracing, setup_tracing
+from app.services.changes import broker as change_broker
+from app.services.thumbnails import shutdown_pool
 
+setup_tracing()
 app = FastAPI(title="ProjectBoard API")
 
 
@@ -12,5 +19,19 @@ def health():
     return {"Status": "OK"}
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    data, content_type = render_latest()
+    return Response(content=data, media_type=content_type)
+
+
+app.add_event_handler("shutdown", mark_worker_dead)
+app.add_event_handler("shutdown", shutdown_pool)
+app.add_event_handler("shutdown", change_broker.close)
+
+
 register_routers(app)
 register_exception_handlers(app)
+register_idempotency(app)  # innermost, so replays are still measured and traced
+register_request_instrumentation(app)
+register_tracing(app)  # added last -> outermost, so the root span covers everything
@@ -0,0 +1,109 @@
+"""project change log
+
+Revision ID: 0569728faa0b
+Revises: 178cc4cee60b
+Create Date: 2026-10-19 09:21:40.512803
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0569728faa0b"
+down_revision: Union[str, Sequence[str], None] = "178cc4cee60b"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# one NOTIFY per project per statement; listeners read the rows themselves
+NOTIFY_FUNCTION = """
+CREATE FUNCTION notify_project_changes() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('project_changes', p::text)
+    FROM (SELECT DISTINCT project_id AS p FROM new_rows) AS changed;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+NOTIFY_TRIGGER = """
+CREATE TRIGGER project_changes_notify
+AFTER INSERT ON project_changes
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION notify_project_changes()
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "project_changes",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("project_id", sa.Integer(), nullable=False),
+        sa.Column("seq", sa.BigInteger(), nullable=False),
+        sa.Column("kind", sa.String(length=32), nullable=False),
+        sa.Column("document_id", sa.Integer(), nullable=True),
+        sa.Column("actor_id", sa.Integer(), nullable=True),
+        sa.Column("data", sa.JSON(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(["project_id"], ["projects.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["actor_id"], ["users.id"], ondelete="SET NULL"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_project_changes_project_id_seq", "project_changes", ["project_id", "seq"], unique=False
+    )
+    # tombstones become removal entries of the log
+    op.execute(
+        "INSERT INTO project_changes (project_id, seq, kind, document_id, created_at) "
+        "SELECT project_id, sync_version, 'document.removed', document_id, removed_at "
+        "FROM document_tombstones"
+    )
+    op.drop_index(
+        "ix_document_tombstones_project_id_sync_version", table_name="document_tombstones"
+    )
+    op.drop_table("document_tombstones")
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute(NOTIFY_FUNCTION)
+        op.execute(NOTIFY_TRIGGER)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP TRIGGER project_changes_notify ON project_changes")
+        op.execute("DROP FUNCTION notify_project_changes()")
+    op.create_table(
+        "document_tombstones",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("project_id", sa.Integer(), nullable=False),
+        sa.Column("document_id", sa.Integer(), nullable=False),
+        sa.Column("sync_version", sa.BigInteger(), nullable=False),
+        sa.Column(
+            "removed_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(["project_id"], ["projects.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_document_tombstones_project_id_sync_version",
+        "document_tombstones",
+        ["project_id", "sync_version"],
+        unique=False,
+    )
+    op.execute(
+        "INSERT INTO document_tombstones (project_id, document_id, sync_version, removed_at) "
+        "SELECT project_id, document_id, seq, created_at FROM project_changes "
+        "WHERE kind = 'document.removed'"
+    )
+    op.drop_index("ix_project_changes_project_id_seq", table_name="project_changes")
+    op.drop_table("project_changes")
@@ -0,0 +1,80 @@
+"""document checksums and sync versions
+
+Revision ID: 178cc4cee60b
+Revises: cbd5d670cd8f
+Create Date: 2026-10-19 08:58:12.104377
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "178cc4cee60b"
+down_revision: Union[str, Sequence[str], None] = "cbd5d670cd8f"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in ("documents", "document_versions"):
+        op.add_column(table, sa.Column("content_type", sa.String(length=255), nullable=True))
+        op.add_column(table, sa.Column("sha256", sa.String(length=64), nullable=True))
+        op.add_column(table, sa.Column("etag", sa.String(length=128), nullable=True))
+    op.add_column(
+        "documents", sa.Column("sync_version", sa.BigInteger(), server_default="0", nullable=False)
+    )
+    op.add_column(
+        "documents", sa.Column("added_version", sa.BigInteger(), server_default="0", nullable=False)
+    )
+    op.add_column(
+        "projects", sa.Column("sync_version", sa.BigInteger(), server_default="0", nullable=False)
+    )
+    op.create_index(
+        "ix_documents_project_id_sync_version",
+        "documents",
+        ["project_id", "sync_version"],
+        unique=False,
+        postgresql_include=["id", "sha256"],
+    )
+    op.create_table(
+        "document_tombstones",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("project_id", sa.Integer(), nullable=False),
+        sa.Column("document_id", sa.Integer(), nullable=False),
+        sa.Column("sync_version", sa.BigInteger(), nullable=False),
+        sa.Column(
+            "removed_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(["project_id"], ["projects.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_document_tombstones_project_id_sync_version",
+        "document_tombstones",
+        ["project_id", "sync_version"],
+        unique=False,
+    )
+    # existing rows keep sha256 NULL until `python -m app.tools.backfill_checksums` has run
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        "ix_document_tombstones_project_id_sync_version", table_name="document_tombstones"
+    )
+    op.drop_table("document_tombstones")
+    op.drop_index("ix_documents_project_id_sync_version", table_name="documents")
+    op.drop_column("projects", "sync_version")
+    op.drop_column("documents", "added_version")
+    op.drop_column("documents", "sync_version")
+    for table in ("document_versions", "documents"):
+        op.drop_column(table, "etag")
+        op.drop_column(table, "sha256")
+        op.drop_column(table, "content_type")
@@ -0,0 +1,64 @@
+"""s3 object ledger and project size state
+
+Revision ID: 3f2a9c7d41e8
+Revises: 6bf89a0d1c60
+Create Date: 2026-10-19 10:12:31.402117
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3f2a9c7d41e8"
+down_revision: Union[str, Sequence[str], None] = "6bf89a0d1c60"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "s3_objects",
+        sa.Column("key", sa.String(length=1024), nullable=False),
+        sa.Column("project_id", sa.Integer(), nullable=False),
+        sa.Column("size_bytes", sa.BigInteger(), nullable=False),
+        sa.Column(
+            "recorded_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(["project_id"], ["projects.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("key"),
+    )
+    op.create_index(op.f("ix_s3_objects_project_id"), "s3_objects", ["project_id"], unique=False)
+    op.create_table(
+        "project_size_state",
+        sa.Column("project_id", sa.Integer(), nullable=False),
+        sa.Column("dirty_since", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("reconciled_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["project_id"], ["projects.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("project_id"),
+    )
+    op.create_index(
+        op.f("ix_project_size_state_dirty_since"),
+        "project_size_state",
+        ["dirty_since"],
+        unique=False,
+    )
+    # seed the ledger from what the API already knows; anything missing is caught by reconcile
+    op.execute(
+        "INSERT INTO s3_objects (key, project_id, size_bytes) "
+        "SELECT s3_key, project_id, size_bytes FROM documents"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_project_size_state_dirty_since"), table_name="project_size_state")
+    op.drop_table("project_size_state")
+    op.drop_index(op.f("ix_s3_objects_project_id"), table_name="s3_objects")
+    op.drop_table("s3_objects")
@@ -0,0 +1,46 @@
+"""s3 event sequencers
+
+Revision ID: 8d51e0b7a9c2
+Revises: 3f2a9c7d41e8
+Create Date: 2026-10-19 11:03:48.771950
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8d51e0b7a9c2"
+down_revision: Union[str, Sequence[str], None] = "3f2a9c7d41e8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "s3_event_sequencers",
+        sa.Column("key", sa.String(length=1024), nullable=False),
+        sa.Column("sequencer", sa.String(length=32), nullable=False),
+        sa.Column(
+            "processed_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("key"),
+    )
+    op.create_index(
+        op.f("ix_s3_event_sequencers_processed_at"),
+        "s3_event_sequencers",
+        ["processed_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_s3_event_sequencers_processed_at"), table_name="s3_event_sequencers")
+    op.drop_table("s3_event_sequencers")
@@ -0,0 +1,162 @@
+"""hash-partition documents by project_id
+
+Revision ID: 9e3b71c5d2a4
+Revises: 0569728faa0b
+Create Date: 2026-10-19 11:02:17.406215
+
+PostgreSQL only; on other databases only ``document_versions.project_id`` (and its index)
+is added.
+
+A partitioned table's unique constraints must contain the partition key, so the primary key
+becomes ``(id, project_id)`` (ids still come from the same sequence) and ``s3_key`` is unique
+per project. A CHECK that every key starts with ``projects/<project_id>/`` makes the key prefix
+determine the project, so per-project uniqueness is still uniqueness across the table.
+``document_versions`` gets ``project_id`` and a composite foreign key, as a key on ``id`` alone
+can no longer be referenced.
+
+The rows are copied in this transaction; plan a maintenance window for large tables.
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9e3b71c5d2a4"
+down_revision: Union[str, Sequence[str], None] = "0569728faa0b"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARTITIONS = 16  # hash modulus; changing it later means another full copy
+KEY_IN_PROJECT = "s3_key LIKE 'projects/' || project_id || '/%'"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("document_versions", sa.Column("project_id", sa.Integer(), nullable=True))
+    op.execute(
+        "UPDATE document_versions SET project_id = "
+        "(SELECT project_id FROM documents WHERE documents.id = document_versions.document_id)"
+    )
+    op.alter_column("document_versions", "project_id", nullable=False)
+    op.create_index(
+        op.f("ix_document_versions_project_id"), "document_versions", ["project_id"], unique=False
+    )
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    bad = op.get_bind().scalar(
+        sa.text(f"SELECT count(*) FROM documents WHERE NOT ({KEY_IN_PROJECT})")
+    )
+    if bad:
+        raise RuntimeError(
+            f"{bad} documents have an s3_key outside projects/<project_id>/; "
+            "fix them before partitioning (s3_key uniqueness depends on that prefix)"
+        )
+
+    op.drop_constraint(
+        "document_versions_document_id_fkey", "document_versions", type_="foreignkey"
+    )
+    op.execute(
+        "CREATE TABLE documents_new (LIKE documents INCLUDING DEFAULTS) PARTITION BY HASH (project_id)"
+    )
+    for i in range(PARTITIONS):
+        op.execute(
+            f"CREATE TABLE documents_p{i:02d} PARTITION OF documents_new "
+            f"FOR VALUES WITH (MODULUS {PARTITIONS}, REMAINDER {i})"
+        )
+    op.execute("INSERT INTO documents_new SELECT * FROM documents")
+    # the old table owns the id sequence; hand it over before dropping the table
+    op.execute("ALTER SEQUENCE documents_id_seq OWNED BY documents_new.id")
+    op.drop_table("documents")
+    op.rename_table("documents_new", "documents")
+
+    op.create_primary_key("documents_pkey", "documents", ["id", "project_id"])
+    op.create_unique_constraint(
+        "documents_project_id_s3_key_key", "documents", ["project_id", "s3_key"]
+    )
+    op.create_check_constraint("ck_documents_s3_key_in_project", "documents", KEY_IN_PROJECT)
+    op.create_foreign_key(
+        "documents_project_id_fkey",
+        "documents",
+        "projects",
+        ["project_id"],
+        ["id"],
+        ondelete="CASCADE",
+    )
+    op.create_foreign_key(
+        "documents_uploaded_by_fkey",
+        "documents",
+        "users",
+        ["uploaded_by"],
+        ["id"],
+        ondelete="SET NULL",
+    )
+    op.create_index(
+        "ix_documents_project_id_sync_version",
+        "documents",
+        ["project_id", "sync_version"],
+        unique=False,
+        postgresql_include=["id", "sha256"],
+    )
+    op.create_foreign_key(
+        "document_versions_document_id_project_id_fkey",
+        "document_versions",
+        "documents",
+        ["document_id", "project_id"],
+        ["id", "project_id"],
+        ondelete="CASCADE",
+        onupdate="CASCADE",
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_constraint(
+            "document_versions_document_id_project_id_fkey",
+            "document_versions",
+            type_="foreignkey",
+        )
+        op.execute("CREATE TABLE documents_old (LIKE documents INCLUDING DEFAULTS)")
+        op.execute("INSERT INTO documents_old SELECT * FROM documents")
+        op.execute("ALTER SEQUENCE documents_id_seq OWNED BY documents_old.id")
+        op.drop_table("documents")  # drops the partitions with it
+        op.rename_table("documents_old", "documents")
+
+        op.create_primary_key("documents_pkey", "documents", ["id"])
+        op.create_unique_constraint("documents_s3_key_key", "documents", ["s3_key"])
+        op.create_foreign_key(
+            "documents_project_id_fkey",
+            "documents",
+            "projects",
+            ["project_id"],
+            ["id"],
+            ondelete="CASCADE",
+        )
+        op.create_foreign_key(
+            "documents_uploaded_by_fkey",
+            "documents",
+            "users",
+            ["uploaded_by"],
+            ["id"],
+            ondelete="SET NULL",
+        )
+        op.create_index(
+            "ix_documents_project_id_sync_version",
+            "documents",
+            ["project_id", "sync_version"],
+            unique=False,
+            postgresql_include=["id", "sha256"],
+        )
+        op.create_foreign_key(
+            "document_versions_document_id_fkey",
+            "document_versions",
+            "documents",
+            ["document_id"],
+            ["id"],
+            ondelete="CASCADE",
+        )
+    op.drop_index(op.f("ix_document_versions_project_id"), table_name="document_versions")
+    op.drop_column("document_versions", "project_id")
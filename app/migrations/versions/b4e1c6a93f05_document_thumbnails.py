@@ -0,0 +1,30 @@
+"""document thumbnails
+
+Revision ID: b4e1c6a93f05
+Revises: 8d51e0b7a9c2
+Create Date: 2026-10-19 14:12:05.318204
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b4e1c6a93f05"
+down_revision: Union[str, Sequence[str], None] = "8d51e0b7a9c2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("documents", sa.Column("thumbnail_key", sa.String(length=600), nullable=True))
+    op.add_column("documents", sa.Column("preview_key", sa.String(length=600), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("documents", "preview_key")
+    op.drop_column("documents", "thumbnail_key")
@@ -0,0 +1,36 @@
+"""keep only keys without a documents row in the s3 object ledger
+
+Revision ID: b5c08e2f71a9
+Revises: e27f4b8c6d13
+Create Date: 2026-10-19 18:05:44.120938
+
+The API adjusts project totals for its own documents and versions, so the size-updater Lambda
+now only counts, and only keeps ledger rows for, keys it does not know. Rows seeded for such
+keys would make a removal subtract the size a second time.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b5c08e2f71a9"
+down_revision: Union[str, Sequence[str], None] = "e27f4b8c6d13"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("DELETE FROM s3_objects WHERE key IN (SELECT s3_key FROM documents)")
+    op.execute("DELETE FROM s3_objects WHERE key IN (SELECT s3_key FROM document_versions)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ("documents", "document_versions"):
+        op.execute(
+            "INSERT INTO s3_objects (key, project_id, size_bytes) "
+            f"SELECT s3_key, project_id, size_bytes FROM {table} "
+            "ON CONFLICT (key) DO NOTHING"
+        )
@@ -0,0 +1,59 @@
+"""document versions
+
+Revision ID: cbd5d670cd8f
+Revises: 6d4c4ccbea20
+Create Date: 2026-10-19 08:28:04.825964
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "cbd5d670cd8f"
+down_revision: Union[str, Sequence[str], None] = "6d4c4ccbea20"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "document_versions",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("document_id", sa.Integer(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("filename", sa.String(length=255), nullable=False),
+        sa.Column("s3_key", sa.String(length=512), nullable=False),
+        sa.Column("size_bytes", sa.BigInteger(), nullable=False),
+        sa.Column("uploaded_by", sa.Integer(), nullable=True),
+        sa.Column("uploaded_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("thumbnail_key", sa.String(length=600), nullable=True),
+        sa.Column("preview_key", sa.String(length=600), nullable=True),
+        sa.Column(
+            "archived_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(["document_id"], ["documents.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["uploaded_by"], ["users.id"], ondelete="SET NULL"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("document_id", "version"),
+        sa.UniqueConstraint("s3_key"),
+    )
+    op.create_index(
+        op.f("ix_document_versions_archived_at"), "document_versions", ["archived_at"], unique=False
+    )
+    op.add_column(
+        "documents", sa.Column("version", sa.Integer(), server_default="1", nullable=False)
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("documents", "version")
+    op.drop_index(op.f("ix_document_versions_archived_at"), table_name="document_versions")
+    op.drop_table("document_versions")
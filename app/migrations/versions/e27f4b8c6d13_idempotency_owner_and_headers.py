@@ -0,0 +1,30 @@
+"""idempotency key owner and response headers
+
+Revision ID: e27f4b8c6d13
+Revises: 9e3b71c5d2a4
+Create Date: 2026-10-19 16:40:12.518377
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e27f4b8c6d13"
+down_revision: Union[str, Sequence[str], None] = "9e3b71c5d2a4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("idempotency_keys", sa.Column("owner", sa.String(length=32), nullable=True))
+    op.add_column("idempotency_keys", sa.Column("response_headers", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("idempotency_keys", "response_headers")
+    op.drop_column("idempotency_keys", "owner")
@@ -2,6 +2,10 @@ from .auth import LoginIn as LoginIn
 from .auth import RegisterIn as RegisterIn
 from .auth import TokenOut as TokenOut
 from .auth import UserOut as UserOut
+from .project import BulkInviteIn as BulkInviteIn
+from .project import BulkInviteOut as BulkInviteOut
+from .project import ChangeListOut as ChangeListOut
+from .project import ChangeOut as ChangeOut
 from .project import ProjectIn as ProjectIn
 from .project import ProjectOut as ProjectOut
 from .project import ProjectUpdate as ProjectUpdate
@@ -1,7 +1,7 @@
 from datetime import datetime
-from typing import Annotated, List, Optional
+from typing import Annotated, List, Literal, Optional
 
-from pydantic import BaseModel, ConfigDict, Field, StringConstraints
+from pydantic import BaseModel, ConfigDict, Field, StringConstraints, computed_field
 
 Filename255 = Annotated[str, StringConstraints(min_length=1, max_length=255)]
 S3Key512 = Annotated[str, StringConstraints(min_length=1, max_length=512)]
@@ -13,6 +13,33 @@ class DocumentIn(BaseModel):
     size_bytes: int
 
 
+class UploadSessionIn(BaseModel):
+    filename: Filename255
+    size_bytes: int = Field(gt=0)
+    content_type: str
+
+
+class ManifestEntryIn(BaseModel):
+    id: int
+    sha256: Optional[str] = None
+
+
+class SyncManifestIn(BaseModel):
+    known: Optional[List[ManifestEntryIn]] = Field(
+        None, description="Documents the client holds, with the checksum of its copy"
+    )
+    since: Optional[int] = Field(None, ge=0, description="`version` of the previous manifest")
+
+
+class DocumentTransferIn(BaseModel):
+    document_ids: List[int] = Field(min_length=1)
+
+
+class DocumentBatchIn(BaseModel):
+    document_ids: List[int] = Field(min_length=1)
+    ttl: int = Field(600, ge=1, le=3600, description="Seconds the URLs stay valid")
+
+
 class DocumentUpdate(BaseModel):
     filename: Optional[Filename255] = None
     size_bytes: Optional[int] = None
@@ -26,11 +53,27 @@ class DocumentOut(BaseModel):
     s3_key: S3Key512
     size_bytes: Optional[int] = None
     content_type: Optional[str] = None
+    sha256: Optional[str] = None
+    etag: Optional[str] = None
     uploaded_by: Optional[int] = None
     uploaded_at: datetime
+    thumbnail_key: Optional[str] = Field(None, exclude=True)
+    preview_key: Optional[str] = Field(None, exclude=True)
+    version: int = 1
 
     model_config = ConfigDict(from_attributes=True)
 
+    # stable API paths that redirect to presigned URLs, so listings need no S3 calls
+    @computed_field
+    @property
+    def thumbnail_url(self) -> Optional[str]:
+        return f"/document/{self.id}/thumbnail" if self.thumbnail_key else None
+
+    @computed_field
+    @property
+    def preview_url(self) -> Optional[str]:
+        return f"/document/{self.id}/thumbnail?size=preview" if self.preview_key else None
+
 
 class DocumentListOut(BaseModel):
     items: List[DocumentOut]
@@ -39,6 +82,84 @@ class DocumentListOut(BaseModel):
     page_size: int = Field(ge=1, le=200, default=50)
 
 
+class SyncManifestOut(BaseModel):
+    version: int = Field(ge=0, description="Send as `since` next time")
+    added: List[DocumentOut]
+    changed: List[DocumentOut]
+    deleted: List[int]
+
+
+class DocumentVersionOut(BaseModel):
+    id: int
+    document_id: int
+    version: int
+    filename: str
+    size_bytes: int
+    uploaded_by: Optional[int] = None
+    uploaded_at: datetime
+    archived_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class DocumentVersionListOut(BaseModel):
+    items: List[DocumentVersionOut]
+    total: int = Field(ge=0)
+    page: int = Field(ge=1, default=1)
+    page_size: int = Field(ge=1, le=200, default=50)
+
+
 class DocumentDownloadLinkOut(BaseModel):
     url: str
     expires_in: int = Field(ge=1)
+
+
+class DocumentBatchItemOut(BaseModel):
+    document_id: int
+    document: Optional[DocumentOut] = None
+    url: Optional[str] = None
+    error: Optional[str] = None
+
+
+class DocumentBatchOut(BaseModel):
+    items: List[DocumentBatchItemOut]
+    expires_in: int = Field(ge=1)
+
+
+class BatchUploadItemOut(BaseModel):
+    filename: str
+    status: Literal["uploaded", "failed"]
+    document: Optional[DocumentOut] = None
+    error: Optional[str] = None
+
+
+class BatchUploadOut(BaseModel):
+    items: List[BatchUploadItemOut]
+    uploaded: int = Field(ge=0)
+    failed: int = Field(ge=0)
+
+
+class DocumentTransferItemOut(BaseModel):
+    document_id: int
+    status: Literal["copied", "moved", "failed"]
+    document: Optional[DocumentOut] = None
+    error: Optional[str] = None
+
+
+class DocumentTransferOut(BaseModel):
+    items: List[DocumentTransferItemOut]
+    succeeded: int = Field(ge=0)
+    failed: int = Field(ge=0)
+
+
+class UploadSessionOut(BaseModel):
+    id: str
+    project_id: int
+    filename: str
+    content_type: str
+    size_bytes: int
+    chunk_size: int = Field(description="Send chunks of exactly this size at multiples of it")
+    received_bytes: int = Field(ge=0)
+    missing_offsets: List[int]
+    complete: bool
+    expires_at: datetime
@@ -1,9 +1,10 @@
 from datetime import datetime
 from typing import Annotated, Optional
 
-from pydantic import BaseModel, ConfigDict, StringConstraints
+from pydantic import BaseModel, ConfigDict, Field, StringConstraints
 
 Name120 = Annotated[str, StringConstraints(min_length=1, max_length=120)]
+Login = Annotated[str, StringConstraints(min_length=1, max_length=50)]
 
 
 # Requests
@@ -17,6 +18,10 @@ class ProjectUpdate(BaseModel):
     description: Optional[str] = None
 
 
+class BulkInviteIn(BaseModel):
+    logins: Annotated[list[Login], Field(min_length=1, max_length=1000)]
+
+
 # Response
 class ProjectOut(BaseModel):
     id: int
@@ -28,3 +33,26 @@ class ProjectOut(BaseModel):
     updated_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class BulkInviteOut(BaseModel):
+    added: list[str]
+    already_member: list[str]
+    unknown: list[str]
+
+
+class ChangeOut(BaseModel):
+    seq: int
+    kind: str
+    document_id: Optional[int] = None
+    actor_id: Optional[int] = None
+    data: Optional[dict] = None
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ChangeListOut(BaseModel):
+    items: list[ChangeOut]
+    next: int = Field(description="Pass as `since` to continue")
+    has_more: bool
@@ -11,6 +11,7 @@ from app.core.security import (
     hash_password,
     verify_password,
 )
+from app.core.tracing import traced
 from app.db.models import User
 
 
@@ -18,6 +19,7 @@ def _normalize_login(login: str) -> str:
     return login.strip().lower()
 
 
+@traced
 def register(db: Session, *, login: str, password: str) -> User:
     norm_login = _normalize_login(login)
 
@@ -29,13 +31,13 @@ def register(db: Session, *, login: str, password: str) -> User:
     db.add(user)
     try:
         db.commit()
-        db.refresh(user)
         return user
     except IntegrityError:
         db.rollback()
         raise UserExistsError("User already exists")
 
 
+@traced
 def login(db: Session, *, login: str, password: str) -> Tuple[str, int]:
     norm_login = _normalize_login(login)
     user = db.execute(select(User).where(User.login == norm_login)).scalar_one_or_none()
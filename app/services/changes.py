@@ -0,0 +1,230 @@
+"""Per-project change log: recording entries, paging through them and the SSE stream.
+
+Every write that changes what a project contains appends entries in its own transaction,
+stamped with the project's new ``sync_version``. Readers resume from the last ``seq`` they saw
+(``since`` or ``Last-Event-ID``); the entries of one transaction are never split across pages.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import AsyncIterator
+
+from sqlalchemy import event, exists, insert, select, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.changefeed import RESYNC, ChangeBroker
+from app.core.config import settings
+from app.core.tracing import traced
+from app.db.models.project import Project
+from app.db.models.project_access import ProjectAccess
+from app.db.models.project_change import ProjectChange
+from app.schemas import ChangeOut
+
+DOCUMENT_ADDED = "document.added"
+DOCUMENT_UPDATED = "document.updated"
+DOCUMENT_REMOVED = "document.removed"
+MEMBER_ADDED = "member.added"
+
+_PENDING = "changes.pending_projects"  # Session.info key: projects to wake after commit
+
+
+def entry(
+    project_id: int,
+    seq: int,
+    kind: str,
+    *,
+    actor_id: int | None = None,
+    document_id: int | None = None,
+    data: dict | None = None,
+) -> dict:
+    return {
+        "project_id": project_id,
+        "seq": seq,
+        "kind": kind,
+        "actor_id": actor_id,
+        "document_id": document_id,
+        "data": data,
+    }
+
+
+def document_entry(kind: str, doc, seq: int, actor_id: int | None, project_id: int | None = None):
+    """Entry for ``doc``; ``project_id`` overrides the document's (the source of a move)."""
+    return entry(
+        doc.project_id if project_id is None else project_id,
+        seq,
+        kind,
+        actor_id=actor_id,
+        document_id=doc.id,
+        data={"filename": doc.filename, "size_bytes": doc.size_bytes},
+    )
+
+
+def record_changes(db: Session, entries: list[dict]) -> None:
+    """Append ``entries`` in the caller's transaction (one executemany INSERT)."""
+    if not entries:
+        return
+    db.execute(insert(ProjectChange), entries)
+    db.info.setdefault(_PENDING, set()).update(e["project_id"] for e in entries)
+
+
+def next_seq(db: Session, project_id: int) -> int:
+    """Bump the project's sync version for a change that moves no bytes.
+
+    The project row stays locked until the transaction ends, which orders the sequences.
+    """
+    return db.execute(
+        update(Project)
+        .where(Project.id == project_id)
+        .values(sync_version=Project.sync_version + 1)
+        .returning(Project.sync_version)
+        .execution_options(synchronize_session=False)
+    ).scalar_one()
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_subscribers(session: Session) -> None:
+    projects = session.info.pop(_PENDING, None)
+    if projects and not broker.listening:  # with LISTEN, the database trigger does this
+        for project_id in projects:
+            broker.notify(project_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_pending(session: Session) -> None:
+    session.info.pop(_PENDING, None)
+
+
+@traced
+def list_changes(
+    db: Session, *, user_id: int, project_id: int, since: int = 0, limit: int | None = None
+) -> dict:
+    """Entries after ``since``, oldest first; ``next`` is the ``since`` of the following page."""
+    current = _current_seq(db, user_id, project_id)
+    if since > current:
+        raise ValueError("SYNC_BAD_VERSION")
+    limit = max(1, min(limit or settings.CHANGES_PAGE_SIZE, settings.CHANGES_PAGE_SIZE))
+    items, has_more = _page(db, project_id, since, limit)
+    return {"items": items, "next": items[-1].seq if items else since, "has_more": has_more}
+
+
+async def change_stream(
+    *, user_id: int, project_id: int, since: int, session_factory=None
+) -> AsyncIterator[str]:
+    """Check access, then return the project's changes after ``since`` as SSE text.
+
+    The stream catches up from the log, then follows the broker. Each event carries its
+    entry as JSON; the last event of a transaction carries ``id: <seq>`` so a reconnecting
+    client resumes after whole transactions only.
+    """
+    factory = session_factory or _default_session_factory()
+
+    def check(db: Session) -> None:
+        if since > _current_seq(db, user_id, project_id):
+            raise ValueError("SYNC_BAD_VERSION")
+
+    await run_in_threadpool(_with_session, factory, check)
+    _listen_if_postgres(factory)
+    return _events(project_id, since, factory)
+
+
+# Private helpers
+async def _events(project_id: int, cursor: int, factory) -> AsyncIterator[str]:
+    yield "retry: 3000\n\n"
+    async with broker.subscribe(project_id, factory) as queue:
+        catch_up = True
+        while True:
+            while catch_up:
+                page, catch_up = await run_in_threadpool(
+                    _with_session, factory, _page, project_id, cursor, settings.CHANGES_PAGE_SIZE
+                )
+                if page:
+                    cursor = page[-1].seq
+                    yield _frame(page)
+            try:
+                item = await asyncio.wait_for(
+                    queue.get(), timeout=settings.CHANGES_HEARTBEAT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            if item is RESYNC:
+                catch_up = True
+                continue
+            fresh = [c for c in item if c.seq > cursor]  # the catch-up may have sent them
+            if fresh:
+                cursor = fresh[-1].seq
+                yield _frame(fresh)
+
+
+def _frame(changes: list[ChangeOut]) -> str:
+    lines: list[str] = []
+    for i, c in enumerate(changes):
+        if i + 1 == len(changes) or changes[i + 1].seq != c.seq:
+            lines.append(f"id: {c.seq}")
+        lines += [f"event: {c.kind}", f"data: {c.model_dump_json()}", ""]
+    return "\n".join(lines) + "\n"
+
+
+def _page(db: Session, project_id: int, since: int, limit: int) -> tuple[list[ChangeOut], bool]:
+    """Up to ``limit`` entries after ``since``, cut at a transaction boundary."""
+    base = select(ProjectChange).where(ProjectChange.project_id == project_id)
+    rows = db.scalars(
+        base.where(ProjectChange.seq > since)
+        .order_by(ProjectChange.seq, ProjectChange.id)
+        .limit(limit + 1)
+    ).all()
+    has_more = len(rows) > limit
+    if has_more:
+        cut = rows[limit].seq
+        rows = [r for r in rows[:limit] if r.seq != cut]
+        if not rows:  # one transaction larger than a page: send it whole
+            rows = db.scalars(base.where(ProjectChange.seq == cut).order_by(ProjectChange.id)).all()
+    return [ChangeOut.model_validate(r) for r in rows], has_more
+
+
+def _fetch_after(db: Session, project_id: int, after: int) -> list[ChangeOut]:
+    rows = db.scalars(
+        select(ProjectChange)
+        .where(ProjectChange.project_id == project_id, ProjectChange.seq > after)
+        .order_by(ProjectChange.seq, ProjectChange.id)
+    ).all()
+    return [ChangeOut.model_validate(r) for r in rows]
+
+
+def _latest_seq(db: Session, project_id: int) -> int:
+    return db.scalar(select(Project.sync_version).where(Project.id == project_id)) or 0
+
+
+def _current_seq(db: Session, user_id: int, project_id: int) -> int:
+    """The project's sync version, after checking that ``user_id`` is a member."""
+    member = exists().where(
+        ProjectAccess.project_id == Project.id, ProjectAccess.user_id == user_id
+    )
+    row = db.execute(select(Project.sync_version, member).where(Project.id == project_id)).first()
+    if row is None:
+        raise ValueError("NOT_FOUND")
+    if not row[1]:
+        raise PermissionError("FORBIDDEN")
+    return row[0] or 0
+
+
+def _with_session(factory, fn, *args):
+    with factory() as db:
+        return fn(db, *args)
+
+
+def _listen_if_postgres(factory) -> None:
+    bind = factory.kw.get("bind")
+    if bind is not None and bind.dialect.name == "postgresql":
+        broker.listen(bind.url.set(drivername="postgresql").render_as_string(hide_password=False))
+
+
+def _default_session_factory():
+    from app.db.session import SessionLocal
+
+    return SessionLocal
+
+
+broker = ChangeBroker(_fetch_after, _latest_seq, queue_size=settings.CHANGES_QUEUE_SIZE)
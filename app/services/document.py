@@ -1,20 +1,62 @@
 from __future__ import annotations
 
+import contextvars
+import hashlib
 import io
+import logging
+import os
 import re
-from datetime import datetime
-from typing import BinaryIO, Optional
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from typing import BinaryIO, Iterator, Optional
 from uuid import uuid4
 
-from fastapi import UploadFile
-from sqlalchemy import func
+from fastapi import BackgroundTasks, UploadFile
+from sqlalchemy import bindparam, case, delete, func, insert, or_, select, update
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
-from app.core.storage_s3 import delete_file, presigned_download_url, put_file
+from app.core.metrics import QUOTA_REJECTIONS, UPLOAD_BYTES
+from app.core.storage_s3 import (
+    abort_multipart_upload,
+    complete_multipart_upload,
+    copy_file,
+    create_multipart_upload,
+    delete_file,
+    get_s3_client,
+    iter_object,
+    presigned_download_url,
+    presigned_download_urls,
+    put_file,
+    upload_part,
+)
+from app.core.tracing import span, traced
+from app.core.zipstream import ZipEntry, stream_zip
 from app.db.models.document import Document
+from app.db.models.document_version import DocumentVersion
 from app.db.models.project import Project
 from app.db.models.project_access import ProjectAccess
+from app.db.models.project_change import ProjectChange
+from app.db.models.upload_part import UploadPart
+from app.db.models.upload_session import UploadSession
+from app.db.upsert import dialect_insert
+from app.services.changes import (
+    DOCUMENT_ADDED,
+    DOCUMENT_REMOVED,
+    DOCUMENT_UPDATED,
+    document_entry,
+    record_changes,
+)
+from app.services.thumbnails import (
+    RENDITIONS,
+    delete_renditions,
+    rendition_key,
+    schedule_thumbnails,
+)
+
+logger = logging.getLogger(__name__)
 
 # Config
 ALLOWED_MIME = {
@@ -28,12 +70,14 @@ ALLOWED_MIME = {
 MAX_UPLOAD_BYTES = settings.PROJECT_SIZE_LIMIT_BYTES
 
 
+@traced
 def upload_document(
     db: Session,
     *,
     user_id: int,
     project_id: int,
     file: UploadFile,
+    background: BackgroundTasks | None = None,
 ) -> Document:
     proj = _ensure_access(db, user_id, project_id)
 
@@ -47,43 +91,138 @@ def upload_document(
     limit = settings.PROJECT_SIZE_LIMIT_BYTES
     current = getattr(proj, "total_size_bytes", 0) or 0
     if current + size > limit:
+        QUOTA_REJECTIONS.inc()
         raise ValueError("DOC_PROJECT_LIMIT")
 
     safe = _sanitize_filename(file.filename or "file")
     key = f"projects/{project_id}/{uuid4()}-{safe}"
+    sha256 = hashlib.sha256(blob).hexdigest()
 
     try:
         buf: BinaryIO = io.BytesIO(blob)
-        put_file(key, buf, ctype, metadata={"original": file.filename or ""})
+        etag = put_file(key, buf, ctype, metadata={"original": file.filename or ""})
     except Exception:
         raise
 
     try:
+        seq = _adjust_total_size(db, project_id, size, limit=limit, commit=False)
         doc = Document(
             project_id=project_id,
             filename=file.filename or safe,
             s3_key=key,
             size_bytes=size,
+            content_type=ctype,
+            sha256=sha256,
+            etag=etag,
             uploaded_by=user_id,
+            sync_version=seq,
+            added_version=seq,
         )
         db.add(doc)
-
-        if hasattr(Project, "total_size_bytes"):
-            current = getattr(proj, "total_size_bytes", 0) or 0
-            setattr(proj, "total_size_bytes", current + size)
-
         db.flush()
-        db.commit()
-        db.refresh(doc)
-        return doc
+        record_changes(db, [document_entry(DOCUMENT_ADDED, doc, seq, user_id)])
 
+        with span("db.commit"):
+            db.commit()
+        UPLOAD_BYTES.inc(size)
+        schedule_thumbnails(background, doc.id, key, ctype)
+        return doc
 
-    except Exception as db_err:
+    except Exception:
         db.rollback()
         delete_file(key)
         raise
 
 
+@traced
+def upload_documents(
+    db: Session,
+    *,
+    user_id: int,
+    project_id: int,
+    files: list[UploadFile],
+    background: BackgroundTasks | None = None,
+) -> dict:
+    """Upload many files with one access check, one quota reservation and one commit.
+
+    Bad files and failed S3 puts are reported per item; only an exceeded quota fails the
+    whole batch. Uploads stream from the spooled request files, never through memory.
+    """
+    if len(files) > settings.UPLOAD_BATCH_MAX_FILES:
+        raise ValueError("DOC_BATCH_TOO_LARGE")
+    _ensure_access(db, user_id, project_id)
+
+    items: list[dict] = []
+    pending: list[_PendingUpload] = []
+    for file in files:
+        item = {
+            "filename": file.filename or "file",
+            "status": "failed",
+            "document": None,
+            "error": None,
+        }
+        items.append(item)
+        try:
+            ctype, size = _check_upload(file)
+        except ValueError as e:
+            item["error"] = str(e)
+            continue
+        safe = _sanitize_filename(file.filename or "file")
+        key = f"projects/{project_id}/{uuid4()}-{safe}"
+        pending.append(_PendingUpload(item, file, ctype, size, key))
+
+    if not pending:
+        return _batch_result(items)
+
+    reserved = sum(p.size for p in pending)
+    _adjust_total_size(db, project_id, reserved, limit=settings.PROJECT_SIZE_LIMIT_BYTES)
+
+    client = get_s3_client()  # one shared client; creating them is not thread-safe
+    stored = _put_concurrently(pending, client)
+    try:
+        # releases what failed to upload and, holding the project row until the commit, hands
+        # out the sync version the new rows are stamped with
+        unused = reserved - sum(p.size for p in stored)
+        seq = _adjust_total_size(db, project_id, -unused, commit=False)
+        # one multi-row INSERT ... RETURNING; rows come back unordered, so match them by key
+        rows = [
+            {
+                "project_id": project_id,
+                "filename": p.upload.filename or p.item["filename"],
+                "s3_key": p.key,
+                "size_bytes": p.size,
+                "content_type": p.ctype,
+                "sha256": p.sha256,
+                "etag": p.etag,
+                "uploaded_by": user_id,
+                "sync_version": seq,
+                "added_version": seq,
+            }
+            for p in stored
+        ]
+        docs = db.scalars(insert(Document).returning(Document), rows).all() if rows else []
+        record_changes(db, [document_entry(DOCUMENT_ADDED, d, seq, user_id) for d in docs])
+        with span("db.commit"):
+            db.commit()
+    except Exception:
+        db.rollback()
+        _adjust_total_size(db, project_id, -reserved)
+        for p in stored:
+            try:
+                delete_file(p.key, client=client)
+            except Exception:
+                pass
+        raise
+
+    by_key = {doc.s3_key: doc for doc in docs}
+    for p in stored:
+        p.item.update(status="uploaded", document=by_key[p.key], error=None)
+        schedule_thumbnails(background, by_key[p.key].id, p.key, p.ctype)
+    UPLOAD_BYTES.inc(reserved - unused)
+    return _batch_result(items)
+
+
+@traced
 def list_documents(
     db: Session,
     *,
@@ -118,6 +257,49 @@ def list_documents(
     }
 
 
+@traced
+def export_documents(
+    db: Session,
+    *,
+    user_id: int,
+    project_id: int,
+    q: Optional[str] = None,
+    doc_ids: Optional[list[int]] = None,
+) -> Iterator[bytes]:
+    """Stream a ZIP of the project's documents (optionally filtered) as it is built.
+
+    Rows are read up front, so the returned iterator only talks to S3.
+    """
+    _ensure_access(db, user_id, project_id)
+
+    stmt = (
+        select(Document.filename, Document.s3_key, Document.size_bytes, Document.uploaded_at)
+        .where(Document.project_id == project_id)
+        .order_by(Document.id)
+    )
+    if q:
+        stmt = stmt.where(Document.filename.ilike(f"%{q}%"))
+    if doc_ids:
+        stmt = stmt.where(Document.id.in_(doc_ids))
+    rows = db.execute(stmt).all()
+
+    client = get_s3_client()
+    names = _archive_names(r.filename for r in rows)
+    entries = [
+        ZipEntry(
+            name=name,
+            size=r.size_bytes or 0,
+            open=partial(
+                iter_object, r.s3_key, chunk_size=settings.EXPORT_CHUNK_BYTES, client=client
+            ),
+            date_time=_zip_date_time(r.uploaded_at),
+        )
+        for name, r in zip(names, rows)
+    ]
+    return stream_zip(entries, read_ahead=settings.EXPORT_READ_AHEAD)
+
+
+@traced
 def get_document_download_link_by_id(
     db: Session,
     *,
@@ -136,12 +318,74 @@ def get_document_download_link_by_id(
     return {"url": url, "expires_in": expires_in}
 
 
+@traced
+def get_documents_with_links(
+    db: Session,
+    *,
+    user_id: int,
+    doc_ids: list[int],
+    ttl: int = 600,
+) -> dict:
+    """Metadata and a presigned download URL for each of ``doc_ids``, in request order.
+
+    One query for the documents, one for the access check of all their projects, and the
+    URLs are signed with a single client. Missing or inaccessible ids are reported per item.
+    """
+    if len(doc_ids) > settings.DOCUMENT_BATCH_MAX_IDS:
+        raise ValueError("DOC_BATCH_TOO_LARGE")
+    ids = list(dict.fromkeys(doc_ids))
+    docs = {d.id: d for d in db.scalars(select(Document).where(Document.id.in_(ids)))}
+    allowed = _allowed_projects(db, user_id, {d.project_id for d in docs.values()}, False)
+
+    items: list[dict] = []
+    visible: list[dict] = []
+    for doc_id in ids:
+        item = {"document_id": doc_id, "document": None, "url": None, "error": None}
+        items.append(item)
+        doc = docs.get(doc_id)
+        if doc is None:
+            item["error"] = "DOC_NOT_FOUND"
+        elif doc.project_id not in allowed:
+            item["error"] = "DOC_NO_ACCESS"
+        else:
+            item["document"] = doc
+            visible.append(item)
+
+    urls = presigned_download_urls([i["document"].s3_key for i in visible], ttl=ttl)
+    for item, url in zip(visible, urls):
+        item["url"] = url
+    return {"items": items, "expires_in": min(max(ttl, 1), 3600)}
+
+
+@traced
+def get_thumbnail_link(
+    db: Session,
+    *,
+    user_id: int,
+    doc_id: int,
+    size: str = "thumb",
+    ttl: int = 600,
+) -> str:
+    doc = db.get(Document, doc_id)
+    if not doc:
+        raise ValueError("DOC_NOT_FOUND")
+
+    _ensure_access(db, user_id, doc.project_id)
+
+    key = doc.preview_key if size == "preview" else doc.thumbnail_key
+    if not key:
+        raise ValueError("DOC_NO_THUMBNAIL")
+    return presigned_download_url(key=key, ttl=ttl)
+
+
+@traced
 def replace_document(
     db: Session,
     *,
     user_id: int,
     doc_id: int,
     file: UploadFile,
+    background: BackgroundTasks | None = None,
 ) -> Document:
     doc = db.get(Document, doc_id)
     if not doc:
@@ -156,47 +400,65 @@ def replace_document(
 
     blob = _read_limited(file, MAX_UPLOAD_BYTES)
     new_size = len(blob)
-    old_size = doc.size_bytes or 0
+    keep_old = settings.DOCUMENT_VERSIONS_KEEP > 0
+    # a kept version still occupies its bytes
+    old_size = 0 if keep_old else doc.size_bytes or 0
 
     limit = settings.PROJECT_SIZE_LIMIT_BYTES
     current_total = getattr(proj, "total_size_bytes", 0) or 0
     projected_total = current_total - old_size + new_size
     if projected_total > limit:
+        QUOTA_REJECTIONS.inc()
         raise ValueError("DOC_PROJECT_LIMIT")
 
     safe = _sanitize_filename(file.filename or "file")
     new_key = f"projects/{proj.id}/{uuid4()}-{safe}"
     old_key = doc.s3_key
+    had_renditions = bool(doc.thumbnail_key or doc.preview_key)
+    sha256 = hashlib.sha256(blob).hexdigest()
 
     try:
         buf: BinaryIO = io.BytesIO(blob)
-        put_file(new_key, buf, ctype, metadata={"original": file.filename or ""})
+        etag = put_file(new_key, buf, ctype, metadata={"original": file.filename or ""})
     except Exception:
         raise
 
     try:
+        seq = _adjust_total_size(db, proj.id, new_size - old_size, limit=limit, commit=False)
+        if keep_old:
+            db.add(_version_of(doc))
         doc.s3_key = new_key
         doc.filename = file.filename or safe
         doc.size_bytes = new_size
+        doc.content_type = ctype
+        doc.sha256 = sha256
+        doc.etag = etag
         doc.uploaded_by = user_id
         doc.uploaded_at = datetime.utcnow()
+        doc.thumbnail_key = doc.preview_key = None
+        doc.version = (doc.version or 1) + 1
+        doc.sync_version = seq
+        record_changes(db, [document_entry(DOCUMENT_UPDATED, doc, seq, user_id)])
 
-        if hasattr(Project, "total_size_bytes"):
-            proj.total_size_bytes = max(projected_total, 0)
-
-        db.flush()
-        db.commit()
+        with span("db.commit"):
+            db.commit()
+        UPLOAD_BYTES.inc(new_size)
+        schedule_thumbnails(background, doc.id, new_key, ctype)
 
-        if old_key and old_key != new_key:
+        if keep_old:
+            if background is not None:
+                background.add_task(prune_document_versions, doc.id)
+        elif old_key and old_key != new_key:
             try:
                 delete_file(old_key)
             except Exception:
                 pass
+            if had_renditions:
+                delete_renditions(old_key)
 
-        db.refresh(doc)
         return doc
 
-    except Exception as db_err:
+    except Exception:
         db.rollback()
         try:
             delete_file(new_key)
@@ -205,6 +467,7 @@ def replace_document(
         raise
 
 
+@traced
 def delete_document_by_id(
     db: Session,
     *,
@@ -217,6 +480,13 @@ def delete_document_by_id(
 
     proj = _get_project_or_404(db, doc.project_id)
     _ensure_owner(user_id, proj)
+    versions = []
+    if (doc.version or 1) > 1:  # a document that was never replaced has no history
+        versions = db.execute(
+            select(
+                DocumentVersion.s3_key, DocumentVersion.size_bytes, DocumentVersion.thumbnail_key
+            ).where(DocumentVersion.document_id == doc.id)
+        ).all()
 
     try:
         delete_file(doc.s3_key)
@@ -224,17 +494,556 @@ def delete_document_by_id(
         raise
 
     try:
-        _decrement_total_size(proj, doc.size_bytes)
+        freed = (doc.size_bytes or 0) + sum(v.size_bytes for v in versions)
+        seq = _adjust_total_size(db, proj.id, -freed, commit=False)
+        record_changes(db, [document_entry(DOCUMENT_REMOVED, doc, seq, user_id)])
+        if versions:
+            db.execute(delete(DocumentVersion).where(DocumentVersion.document_id == doc.id))
         db.delete(doc)
-        db.flush()
+        with span("db.commit"):
+            db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    if doc.thumbnail_key or doc.preview_key:
+        delete_renditions(doc.s3_key)
+    for v in versions:
+        _delete_quietly(v.s3_key, bool(v.thumbnail_key), None)
+
+
+# Copy and move
+@traced
+def copy_documents(
+    db: Session, *, user_id: int, target_project_id: int, doc_ids: list[int]
+) -> dict:
+    """Duplicate documents (from any project the user can access) into the target project."""
+    return _transfer_documents(db, user_id, target_project_id, doc_ids, move=False)
+
+
+@traced
+def move_documents(
+    db: Session, *, user_id: int, target_project_id: int, doc_ids: list[int]
+) -> dict:
+    """Move documents into the target project; the user must own their current projects.
+
+    Moved documents keep their ids.
+    """
+    return _transfer_documents(db, user_id, target_project_id, doc_ids, move=True)
+
+
+# Versions
+@traced
+def list_document_versions(
+    db: Session,
+    *,
+    user_id: int,
+    doc_id: int,
+    page: int = 1,
+    page_size: int = 50,
+) -> dict:
+    """Earlier versions of a document, newest first."""
+    doc = db.get(Document, doc_id)
+    if not doc:
+        raise ValueError("DOC_NOT_FOUND")
+    _ensure_access(db, user_id, doc.project_id)
+
+    page = max(1, page or 1)
+    page_size = max(1, min(page_size or 50, 200))
+
+    where = DocumentVersion.document_id == doc_id
+    items = db.scalars(
+        select(DocumentVersion)
+        .where(where)
+        .order_by(DocumentVersion.version.desc())
+        .offset((page - 1) * page_size)
+        .limit(page_size)
+    ).all()
+    total = db.scalar(select(func.count(DocumentVersion.id)).where(where)) or 0
+
+    return {
+        "items": items,
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+    }
+
+
+@traced
+def restore_document_version(
+    db: Session,
+    *,
+    user_id: int,
+    doc_id: int,
+    version: int,
+    background: BackgroundTasks | None = None,
+) -> Document:
+    """Make an earlier version current again by swapping rows; S3 is not touched.
+
+    The content being replaced becomes a version itself, so a restore can be undone.
+    """
+    doc = db.get(Document, doc_id)
+    if not doc:
+        raise ValueError("DOC_NOT_FOUND")
+    _ensure_access(db, user_id, doc.project_id)
+    old = _get_version_or_404(db, doc_id, version)
+
+    try:
+        seq = doc.sync_version = _adjust_total_size(db, doc.project_id, 0, commit=False)
+        db.add(_version_of(doc))
+        doc.filename = old.filename
+        doc.s3_key = old.s3_key
+        doc.size_bytes = old.size_bytes
+        doc.content_type = old.content_type
+        doc.sha256 = old.sha256
+        doc.etag = old.etag
+        doc.uploaded_by = old.uploaded_by
+        doc.uploaded_at = old.uploaded_at
+        doc.thumbnail_key = old.thumbnail_key
+        doc.preview_key = old.preview_key
+        doc.version = (doc.version or 1) + 1
+        db.delete(old)
+        record_changes(db, [document_entry(DOCUMENT_UPDATED, doc, seq, user_id)])
+        with span("db.commit"):
+            db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    if background is not None:
+        background.add_task(prune_document_versions, doc.id)
+    return doc
+
+
+@traced
+def delete_document_version(db: Session, *, user_id: int, doc_id: int, version: int) -> None:
+    doc = db.get(Document, doc_id)
+    if not doc:
+        raise ValueError("DOC_NOT_FOUND")
+    proj = _get_project_or_404(db, doc.project_id)
+    _ensure_owner(user_id, proj)
+    old = _get_version_or_404(db, doc_id, version)
+
+    try:
+        _adjust_total_size(db, proj.id, -old.size_bytes, commit=False)
+        db.delete(old)
+        with span("db.commit"):
+            db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    _delete_quietly(old.s3_key, bool(old.thumbnail_key), None)
+
+
+def prune_versions(
+    db: Session, *, document_ids: list[int] | None = None, batch: int = 500, client=None
+) -> int:
+    """Drop up to ``batch`` versions outside the retention policy; returns how many.
+
+    A version is pruned when more than ``DOCUMENT_VERSIONS_KEEP`` newer ones exist or it is
+    older than ``DOCUMENT_VERSION_MAX_AGE_DAYS``. Rows and totals go first, in one
+    transaction; objects are deleted afterwards, and one that fails to delete is left for
+    the reconcile tool to report as orphaned.
+    """
+    ranked = select(
+        DocumentVersion.id,
+        DocumentVersion.archived_at,
+        func.row_number()
+        .over(partition_by=DocumentVersion.document_id, order_by=DocumentVersion.version.desc())
+        .label("rank"),
+    )
+    if document_ids is not None:
+        ranked = ranked.where(DocumentVersion.document_id.in_(document_ids))
+    ranked = ranked.subquery()
+    expired = ranked.c.rank > settings.DOCUMENT_VERSIONS_KEEP
+    if settings.DOCUMENT_VERSION_MAX_AGE_DAYS > 0:
+        cutoff = _utcnow() - timedelta(days=settings.DOCUMENT_VERSION_MAX_AGE_DAYS)
+        expired = or_(expired, ranked.c.archived_at < cutoff)
+
+    rows = db.execute(
+        select(
+            DocumentVersion.id,
+            DocumentVersion.s3_key,
+            DocumentVersion.size_bytes,
+            DocumentVersion.thumbnail_key,
+            Document.project_id,
+        )
+        .join(ranked, ranked.c.id == DocumentVersion.id)
+        .join(Document, Document.id == DocumentVersion.document_id)
+        .where(expired)
+        .order_by(DocumentVersion.id)
+        .limit(batch)
+    ).all()
+    if not rows:
+        return 0
+
+    removed: dict[int, int] = {}
+    for r in rows:
+        removed[r.project_id] = removed.get(r.project_id, 0) + r.size_bytes
+    db.execute(delete(DocumentVersion).where(DocumentVersion.id.in_([r.id for r in rows])))
+    _lock_projects(db, removed)
+    _subtract_totals(db, removed)
+    with span("db.commit"):
         db.commit()
+
+    client = client or get_s3_client()
+    for r in rows:
+        _delete_quietly(r.s3_key, bool(r.thumbnail_key), client)
+    return len(rows)
+
+
+def prune_document_versions(document_id: int, *, session_factory=None) -> int:
+    """Background job: apply the retention policy to one document's history."""
+    if session_factory is None:
+        from app.db.session import SessionLocal as session_factory
+
+    try:
+        with session_factory() as db:
+            return prune_versions(db, document_ids=[document_id])
+    except Exception:
+        logger.warning("Version pruning failed (document=%s)", document_id, exc_info=True)
+        return 0
+
+
+# Sync
+@traced
+def sync_manifest(
+    db: Session,
+    *,
+    user_id: int,
+    project_id: int,
+    known: Optional[dict[int, Optional[str]]] = None,
+    since: Optional[int] = None,
+) -> dict:
+    """What a client must fetch or drop to mirror the project.
+
+    The client sends the ``{id: sha256}`` it holds, or the ``version`` of its last manifest as
+    ``since`` (a range scan on ``(project_id, sync_version)``), or both to also skip documents
+    it already has. With neither, everything is new. Against ``known``, documents whose
+    checksum is not known yet always count as changed; once it is filled in the document
+    gets a new sync version, so ``since`` reports it again with the checksum.
+    """
+    if known is not None and len(known) > settings.SYNC_MANIFEST_MAX_KNOWN:
+        raise ValueError("DOC_BATCH_TOO_LARGE")
+    if known is None and since is None:
+        since = 0
+    proj = _ensure_access(db, user_id, project_id)
+    # read first: whatever commits after this is reported again on the next call
+    version = proj.sync_version or 0
+    if since is not None and since > version:
+        raise ValueError("SYNC_BAD_VERSION")
+
+    in_project = Document.project_id == project_id
+    if since is not None:
+        docs = db.scalars(
+            select(Document).where(in_project, Document.sync_version > since).order_by(Document.id)
+        ).all()
+        gone = set(
+            db.scalars(
+                select(ProjectChange.document_id).where(
+                    ProjectChange.project_id == project_id,
+                    ProjectChange.seq > since,
+                    ProjectChange.kind == DOCUMENT_REMOVED,
+                )
+            )
+        )
+        gone -= {d.id for d in docs}  # moved away and back again
+        if known is not None:
+            gone &= known.keys()
+    else:
+        current = db.execute(select(Document.id, Document.sha256).where(in_project)).all()
+        stale = {r.id for r in current if r.sha256 is None or known.get(r.id) != r.sha256}
+        gone = known.keys() - {r.id for r in current}
+        docs = []
+        if stale:
+            stmt = select(Document).where(in_project).order_by(Document.id)
+            if len(stale) <= _IN_LIST_MAX:
+                stmt = stmt.where(Document.id.in_(stale))
+            docs = [d for d in db.scalars(stmt) if d.id in stale]
+
+    added, changed = [], []
+    for doc in docs:
+        if known is None:
+            (added if doc.added_version > since else changed).append(doc)
+        elif doc.id not in known:
+            added.append(doc)
+        elif doc.sha256 is None or known[doc.id] != doc.sha256:
+            changed.append(doc)
+    return {"version": version, "added": added, "changed": changed, "deleted": sorted(gone)}
+
+
+def fill_checksum(doc_id: int, s3_key: str, *, session_factory=None, client=None) -> bool:
+    """Background job: hash the stored object and record it on the document.
+
+    Nothing is written if the document was replaced or deleted in the meantime.
+    """
+    try:
+        digest = _object_sha256(s3_key, client or get_s3_client())
+    except Exception:
+        logger.warning("Checksum failed (key=%s)", s3_key, exc_info=True)
+        return False
+
+    if session_factory is None:
+        from app.db.session import SessionLocal as session_factory
+
+    with session_factory() as db:
+        project_id = db.scalar(
+            select(Document.project_id).where(Document.id == doc_id, Document.s3_key == s3_key)
+        )
+        if project_id is None:
+            return False
+        # a new version, so clients syncing with ``since`` learn the checksum
+        seq = _adjust_total_size(db, project_id, 0, commit=False)
+        res = db.execute(
+            update(Document)
+            .where(Document.id == doc_id, Document.s3_key == s3_key)
+            .values(sha256=digest, sync_version=seq)
+            .execution_options(synchronize_session=False)
+        )
+        if res.rowcount:
+            db.commit()
+        else:
+            db.rollback()  # replaced or deleted since the lookup
+    return res.rowcount > 0
+
+
+def backfill_checksums(
+    db: Session, *, after_id: int = 0, batch: int = 100, client=None
+) -> tuple[int, int]:
+    """Hash up to ``batch`` documents without a checksum, in id order after ``after_id``.
+
+    Returns ``(last_id, filled)`` with ``last_id`` 0 once none are left. Objects that cannot
+    be read keep a NULL checksum and are skipped. Filled documents get a new sync version.
+    """
+    rows = db.execute(
+        select(Document.id, Document.project_id, Document.s3_key)
+        .where(Document.sha256.is_(None), Document.id > after_id)
+        .order_by(Document.id)
+        .limit(batch)
+    ).all()
+    if not rows:
+        return 0, 0
+
+    client = client or get_s3_client()
+    workers = max(1, min(settings.UPLOAD_CONCURRENCY, len(rows)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_object_sha256, r.s3_key, client) for r in rows]
+    done = [(r, fut.result()) for r, fut in zip(rows, futures) if fut.exception() is None]
+    if done:
+        projects = {r.project_id for r, _ in done}
+        _lock_projects(db, projects)
+        seqs = _subtract_totals(db, dict.fromkeys(projects, 0))  # only bumps the versions
+        table = Document.__table__
+        db.execute(
+            update(table)
+            .where(table.c.id == bindparam("b_id"), table.c.s3_key == bindparam("b_key"))
+            .values(sha256=bindparam("b_sha256"), sync_version=bindparam("b_seq")),
+            [
+                {"b_id": r.id, "b_key": r.s3_key, "b_sha256": digest, "b_seq": seqs[r.project_id]}
+                for r, digest in done
+            ],
+        )
+        with span("db.commit"):
+            db.commit()
+    return rows[-1].id, len(done)
+
+
+# Resumable uploads
+@traced
+def create_upload_session(
+    db: Session,
+    *,
+    user_id: int,
+    project_id: int,
+    filename: str,
+    size_bytes: int,
+    content_type: str,
+) -> dict:
+    proj = _ensure_access(db, user_id, project_id)
+
+    ctype = (content_type or "").lower()
+    if ctype not in ALLOWED_MIME:
+        raise ValueError("DOC_UNSUPPORTED_TYPE")
+    if size_bytes <= 0:
+        raise ValueError("DOC_EMPTY")
+    if size_bytes > settings.PROJECT_SIZE_LIMIT_BYTES:
+        raise ValueError("DOC_TOO_LARGE")
+    # early answer only; enforced atomically when the upload is completed
+    if (proj.total_size_bytes or 0) + size_bytes > settings.PROJECT_SIZE_LIMIT_BYTES:
+        QUOTA_REJECTIONS.inc()
+        raise ValueError("DOC_PROJECT_LIMIT")
+
+    safe = _sanitize_filename(filename or "file")
+    key = f"projects/{project_id}/{uuid4()}-{safe}"
+    s3_upload_id = create_multipart_upload(key, ctype, metadata={"original": filename or ""})
+
+    sess = UploadSession(
+        id=str(uuid4()),
+        project_id=project_id,
+        created_by=user_id,
+        filename=filename or safe,
+        content_type=ctype,
+        size_bytes=size_bytes,
+        chunk_size=settings.UPLOAD_CHUNK_BYTES,
+        s3_key=key,
+        s3_upload_id=s3_upload_id,
+        expires_at=_utcnow() + timedelta(seconds=settings.UPLOAD_SESSION_TTL_SECONDS),
+    )
+    db.add(sess)
+    try:
+        with span("db.commit"):
+            db.commit()
     except Exception:
         db.rollback()
+        abort_multipart_upload(key, s3_upload_id)
         raise
+    return _upload_progress(sess, [])
+
+
+@traced
+def get_upload_progress(db: Session, *, user_id: int, upload_id: str) -> dict:
+    sess = _get_upload_session(db, user_id, upload_id)
+    return _upload_progress(sess, _upload_parts(db, sess.id))
+
+
+@traced
+def put_upload_chunk(
+    db: Session,
+    *,
+    user_id: int,
+    upload_id: str,
+    offset: int,
+    data: bytes,
+) -> dict:
+    """Store the chunk starting at ``offset`` as its multipart part; resending it is harmless."""
+    sess = _get_upload_session(db, user_id, upload_id)
+
+    if offset < 0 or offset >= sess.size_bytes or offset % sess.chunk_size:
+        raise ValueError("UPLOAD_BAD_OFFSET")
+    if len(data) != min(sess.chunk_size, sess.size_bytes - offset):
+        raise ValueError("UPLOAD_BAD_CHUNK")
+
+    part_number = offset // sess.chunk_size + 1
+    etag = upload_part(sess.s3_key, sess.s3_upload_id, part_number, data)
+
+    stmt = dialect_insert(db, UploadPart).values(
+        session_id=sess.id, part_number=part_number, size_bytes=len(data), etag=etag
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["session_id", "part_number"],
+        set_={"size_bytes": stmt.excluded.size_bytes, "etag": stmt.excluded.etag},
+    )
+    db.execute(stmt)
+    with span("db.commit"):
+        db.commit()
+    return _upload_progress(sess, _upload_parts(db, sess.id))
+
+
+@traced
+def complete_upload(
+    db: Session,
+    *,
+    user_id: int,
+    upload_id: str,
+    background: BackgroundTasks | None = None,
+) -> Document:
+    """Reserve quota, assemble the parts, then create the document in a short transaction.
+
+    The reservation is committed before S3 assembles the object, which can take many seconds
+    for a large upload, so the project row is not locked meanwhile.
+    """
+    sess = _get_upload_session(db, user_id, upload_id)
+    _ensure_access(db, user_id, sess.project_id)
+
+    parts = _upload_parts(db, sess.id)
+    if _missing_offsets(sess, parts) or sum(size for _, _, size in parts) != sess.size_bytes:
+        raise ValueError("UPLOAD_INCOMPLETE")
+
+    project_id, size = sess.project_id, sess.size_bytes
+    _adjust_total_size(db, project_id, size, limit=settings.PROJECT_SIZE_LIMIT_BYTES)
+    try:
+        etag = complete_multipart_upload(
+            sess.s3_key, sess.s3_upload_id, [(n, etag) for n, etag, _ in parts]
+        )
+    except Exception:
+        _adjust_total_size(db, project_id, -size)
+        raise
+
+    try:
+        # a concurrent complete that removed the session first owns the object
+        claimed = _delete_upload_sessions(db, [sess.id]) > 0
+        if claimed:
+            seq = _adjust_total_size(db, project_id, 0, commit=False)
+            doc = Document(
+                project_id=project_id,
+                filename=sess.filename,
+                s3_key=sess.s3_key,
+                size_bytes=size,
+                content_type=sess.content_type,
+                etag=etag,
+                uploaded_by=user_id,
+                sync_version=seq,
+                added_version=seq,
+            )
+            db.add(doc)
+            db.flush()
+            record_changes(db, [document_entry(DOCUMENT_ADDED, doc, seq, user_id)])
+        with span("db.commit"):
+            db.commit()
+    except Exception as exc:
+        db.rollback()
+        # S3 no longer has the multipart upload, so the session cannot be completed again
+        delete_file(sess.s3_key)
+        _adjust_total_size(db, project_id, -size)
+        _drop_upload_session(db, sess.id)
+        raise ValueError("UPLOAD_LOST") from exc
+    if not claimed:
+        _adjust_total_size(db, project_id, -size)
+        raise ValueError("UPLOAD_NOT_FOUND")
+
+    UPLOAD_BYTES.inc(sess.size_bytes)
+    schedule_thumbnails(background, doc.id, doc.s3_key, sess.content_type)
+    if background is not None:  # the chunks were never seen together, so hash the object
+        background.add_task(fill_checksum, doc.id, doc.s3_key)
+    return doc
+
+
+@traced
+def abort_upload(db: Session, *, user_id: int, upload_id: str) -> None:
+    sess = _get_upload_session(db, user_id, upload_id, allow_expired=True)
+    abort_multipart_upload(sess.s3_key, sess.s3_upload_id)
+    _delete_upload_sessions(db, [sess.id])
+    with span("db.commit"):
+        db.commit()
+
+
+def expire_upload_sessions(db: Session, *, batch: int = 500, client=None) -> int:
+    """Abort the multipart uploads of up to ``batch`` expired sessions and drop them.
+
+    Sessions whose abort fails stay behind and are retried on the next run.
+    """
+    rows = db.execute(
+        select(UploadSession.id, UploadSession.s3_key, UploadSession.s3_upload_id)
+        .where(UploadSession.expires_at <= _utcnow())
+        .order_by(UploadSession.expires_at)
+        .limit(batch)
+    ).all()
+    done = []
+    for row in rows:
+        try:
+            abort_multipart_upload(row.s3_key, row.s3_upload_id, client=client)
+        except ValueError:
+            continue
+        done.append(row.id)
+    if done:
+        _delete_upload_sessions(db, done)
+        db.commit()
+    return len(done)
 
 
 # Private Helpers
 _SAFE_NAME_RE = re.compile(r"[^A-Za-z0-9._-]")
+_IN_LIST_MAX = 1000  # bigger id sets are filtered while scanning the project instead
 
 
 def _sanitize_filename(name: str) -> str:
@@ -243,7 +1052,7 @@ def _sanitize_filename(name: str) -> str:
 
 
 def _ensure_access(db: Session, user_id: int, project_id: int) -> Project:
-    proj = db.query(Project).filter(Project.id == project_id).first()
+    proj = db.get(Project, project_id)
     if not proj:
         raise ValueError("NOT_FOUND")
     if proj.owner_id == user_id:
@@ -261,6 +1070,7 @@ def _ensure_access(db: Session, user_id: int, project_id: int) -> Project:
     return proj
 
 
+@traced(name="document.read_upload")
 def _read_limited(upload: UploadFile, max_bytes: int) -> bytes:
     data = upload.file.read(max_bytes + 1)
     if len(data) == 0:
@@ -270,6 +1080,450 @@ def _read_limited(upload: UploadFile, max_bytes: int) -> bytes:
     return data
 
 
+@dataclass
+class _PendingUpload:
+    item: dict
+    upload: UploadFile
+    ctype: str
+    size: int
+    key: str
+    sha256: str | None = None
+    etag: str | None = None
+
+
+def _check_upload(upload: UploadFile) -> tuple[str, int]:
+    """Validate type and size without reading the body; returns ``(content_type, size)``."""
+    ctype = (upload.content_type or "").lower()
+    if ctype not in ALLOWED_MIME:
+        raise ValueError("DOC_UNSUPPORTED_TYPE")
+    fh = upload.file
+    fh.seek(0, os.SEEK_END)
+    size = fh.tell()
+    fh.seek(0)
+    if size == 0:
+        raise ValueError("DOC_EMPTY")
+    if size > MAX_UPLOAD_BYTES:
+        raise ValueError("DOC_TOO_LARGE")
+    return ctype, size
+
+
+@traced(name="document.put_batch")
+def _put_concurrently(pending: list[_PendingUpload], client) -> list[_PendingUpload]:
+    """PUT every file with at most ``UPLOAD_CONCURRENCY`` in flight; returns those stored."""
+
+    def put(p: _PendingUpload) -> None:
+        p.sha256 = _file_sha256(p.upload.file)
+        p.etag = put_file(
+            p.key,
+            p.upload.file,
+            p.ctype,
+            metadata={"original": p.upload.filename or ""},
+            client=client,
+        )
+
+    workers = max(1, min(settings.UPLOAD_CONCURRENCY, len(pending)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # a context copy per task keeps spans and request stats attached to this request
+        futures = [pool.submit(contextvars.copy_context().run, put, p) for p in pending]
+
+    stored = []
+    for p, fut in zip(pending, futures):
+        exc = fut.exception()
+        if exc is None:
+            stored.append(p)
+        else:
+            p.item["error"] = str(exc) if isinstance(exc, ValueError) else "DOC_S3_ERROR"
+    return stored
+
+
+def _adjust_total_size(
+    db: Session, project_id: int, delta: int, *, limit: int | None = None, commit: bool = True
+) -> int | None:
+    """Atomically add ``delta`` to the project total; with ``limit``, refuse to exceed it.
+
+    Also bumps the project's sync version and returns the new value. The row stays locked
+    until the transaction ends, so versions become visible in the order they were handed out.
+    """
+    stmt = (
+        update(Project)
+        .where(Project.id == project_id)
+        .values(
+            total_size_bytes=Project.total_size_bytes + delta,
+            sync_version=Project.sync_version + 1,
+        )
+        .returning(Project.sync_version)
+    )
+    if limit is not None:
+        stmt = stmt.where(Project.total_size_bytes + delta <= limit)
+    seq = db.execute(stmt).scalar_one_or_none()
+    if seq is None and limit is not None:
+        db.rollback()
+        QUOTA_REJECTIONS.inc()
+        raise ValueError("DOC_PROJECT_LIMIT")
+    if commit:
+        with span("db.commit"):
+            db.commit()
+    return seq
+
+
+@dataclass
+class _PendingTransfer:
+    item: dict
+    doc: Document
+    key: str
+    renditions: bool = False
+    etag: str | None = None
+
+
+def _transfer_documents(
+    db: Session, user_id: int, target_project_id: int, doc_ids: list[int], *, move: bool
+) -> dict:
+    """Server-side copy into ``projects/{target}/``, then one transaction for rows and totals.
+
+    Both project totals change in the same commit as the rows. For a move the old objects are
+    deleted only after that commit.
+    """
+    if len(doc_ids) > settings.UPLOAD_BATCH_MAX_FILES:
+        raise ValueError("DOC_BATCH_TOO_LARGE")
+    target = _ensure_access(db, user_id, target_project_id)
+
+    ids = list(dict.fromkeys(doc_ids))
+    docs = {d.id: d for d in db.scalars(select(Document).where(Document.id.in_(ids)))}
+    allowed = _allowed_projects(db, user_id, {d.project_id for d in docs.values()}, move)
+
+    items: list[dict] = []
+    pending: list[_PendingTransfer] = []
+    for doc_id in ids:
+        item = {"document_id": doc_id, "status": "failed", "document": None, "error": None}
+        items.append(item)
+        doc = docs.get(doc_id)
+        if doc is None:
+            item["error"] = "DOC_NOT_FOUND"
+        elif doc.project_id not in allowed:
+            item["error"] = "DOC_NO_ACCESS"
+        elif move and doc.project_id == target_project_id:
+            item["error"] = "DOC_SAME_PROJECT"
+        else:
+            safe = _sanitize_filename(doc.filename or "file")
+            key = f"projects/{target_project_id}/{uuid4()}-{safe}"
+            pending.append(_PendingTransfer(item, doc, key))
+    if not pending:
+        return _transfer_result(items)
+
+    # early answer only; the UPDATE below enforces the limit atomically
+    needed = sum(p.doc.size_bytes or 0 for p in pending)
+    if (target.total_size_bytes or 0) + needed > settings.PROJECT_SIZE_LIMIT_BYTES:
+        QUOTA_REJECTIONS.inc()
+        raise ValueError("DOC_PROJECT_LIMIT")
+
+    client = get_s3_client()
+    copied = _copy_concurrently(pending, client)
+    try:
+        if move:  # source and target rows, in id order, before either UPDATE touches them
+            _lock_projects(db, {target_project_id} | {p.doc.project_id for p in copied})
+        added = sum(p.doc.size_bytes or 0 for p in copied)
+        seq = _adjust_total_size(
+            db, target_project_id, added, limit=settings.PROJECT_SIZE_LIMIT_BYTES, commit=False
+        )
+        if move:
+            # history stays behind: earlier versions are dropped from the source project
+            history = db.execute(
+                select(
+                    DocumentVersion.document_id,
+                    DocumentVersion.s3_key,
+                    DocumentVersion.size_bytes,
+                    DocumentVersion.thumbnail_key,
+                ).where(DocumentVersion.document_id.in_([p.doc.id for p in copied]))
+            ).all()
+            removed: dict[int, int] = {}
+            for p in copied:
+                removed[p.doc.project_id] = removed.get(p.doc.project_id, 0) + (
+                    p.doc.size_bytes or 0
+                )
+            source = {p.doc.id: p.doc.project_id for p in copied}
+            for v in history:
+                removed[source[v.document_id]] += v.size_bytes
+            if history:
+                db.execute(
+                    delete(DocumentVersion).where(
+                        DocumentVersion.document_id.in_({v.document_id for v in history})
+                    )
+                )
+            left = _subtract_totals(db, removed)
+            entries = [
+                document_entry(DOCUMENT_REMOVED, p.doc, left[p.doc.project_id], user_id)
+                for p in copied
+            ]
+            old_keys = {p.doc.id: p.doc.s3_key for p in copied}
+            for p in copied:  # flushed as one executemany UPDATE
+                p.doc.project_id = target_project_id
+                p.doc.s3_key = p.key
+                p.doc.etag = p.etag
+                p.doc.thumbnail_key = rendition_key(p.key, "thumb") if p.renditions else None
+                p.doc.preview_key = rendition_key(p.key, "preview") if p.renditions else None
+                p.doc.sync_version = p.doc.added_version = seq
+            result = {p.doc.id: p.doc for p in copied}
+            entries += [document_entry(DOCUMENT_ADDED, d, seq, user_id) for d in result.values()]
+        else:
+            rows = [
+                {
+                    "project_id": target_project_id,
+                    "filename": p.doc.filename,
+                    "s3_key": p.key,
+                    "size_bytes": p.doc.size_bytes,
+                    "content_type": p.doc.content_type,
+                    "sha256": p.doc.sha256,
+                    "etag": p.etag,
+                    "uploaded_by": user_id,
+                    "thumbnail_key": rendition_key(p.key, "thumb") if p.renditions else None,
+                    "preview_key": rendition_key(p.key, "preview") if p.renditions else None,
+                    "sync_version": seq,
+                    "added_version": seq,
+                }
+                for p in copied
+            ]
+            new = db.scalars(insert(Document).returning(Document), rows).all() if rows else []
+            by_key = {d.s3_key: d for d in new}
+            result = {p.doc.id: by_key[p.key] for p in copied}
+            entries = [document_entry(DOCUMENT_ADDED, d, seq, user_id) for d in new]
+        record_changes(db, entries)
+        with span("db.commit"):
+            db.commit()
+    except Exception:
+        db.rollback()
+        for p in copied:
+            _delete_quietly(p.key, p.renditions, client)
+        raise
+
+    status = "moved" if move else "copied"
+    for p in copied:
+        p.item.update(status=status, document=result[p.doc.id], error=None)
+        if move:
+            _delete_quietly(old_keys[p.doc.id], p.renditions, client)
+    if move:
+        for v in history:
+            _delete_quietly(v.s3_key, bool(v.thumbnail_key), client)
+    return _transfer_result(items)
+
+
+def _lock_projects(db: Session, project_ids) -> None:
+    """Lock project rows in id order (PostgreSQL), for transactions that update several.
+
+    A multi-row UPDATE locks rows in whatever order it visits them, so two transactions
+    touching the same projects could deadlock. ``FOR NO KEY UPDATE`` is what the UPDATE
+    itself takes, and it leaves foreign-key checks (``FOR KEY SHARE``) unblocked.
+    """
+    if project_ids:
+        db.execute(
+            select(Project.id)
+            .where(Project.id.in_(sorted(project_ids)))
+            .order_by(Project.id)
+            .with_for_update(key_share=True)
+        )
+
+
+def _subtract_totals(db: Session, removed: dict[int, int]) -> dict[int, int]:
+    """Subtract ``{project_id: bytes}`` from several project totals in one UPDATE.
+
+    Bumps their sync versions as well; returns ``{project_id: sync_version}``. Callers lock
+    the rows first with ``_lock_projects``.
+    """
+    if not removed:
+        return {}
+    rows = db.execute(
+        update(Project)
+        .where(Project.id.in_(removed))
+        .values(
+            total_size_bytes=Project.total_size_bytes - case(removed, value=Project.id, else_=0),
+            sync_version=Project.sync_version + 1,
+        )
+        .returning(Project.id, Project.sync_version)
+        .execution_options(synchronize_session=False)
+    )
+    return {r.id: r.sync_version for r in rows}
+
+
+def _allowed_projects(db: Session, user_id: int, project_ids: set[int], owner_only: bool) -> set:
+    if not project_ids:
+        return set()
+    owned = select(Project.id).where(Project.id.in_(project_ids), Project.owner_id == user_id)
+    if owner_only:
+        return set(db.scalars(owned))
+    shared = select(ProjectAccess.project_id).where(
+        ProjectAccess.project_id.in_(project_ids), ProjectAccess.user_id == user_id
+    )
+    return set(db.scalars(owned.union(shared)))
+
+
+@traced(name="document.copy_batch")
+def _copy_concurrently(pending: list[_PendingTransfer], client) -> list[_PendingTransfer]:
+    """Copy every object (and its renditions) server-side; returns those copied."""
+
+    def copy(p: _PendingTransfer) -> None:
+        p.etag = copy_file(p.doc.s3_key, p.key, p.doc.size_bytes or 0, client=client)
+        if p.doc.thumbnail_key and p.doc.preview_key:
+            try:
+                for name in RENDITIONS:
+                    src = rendition_key(p.doc.s3_key, name)
+                    copy_file(src, rendition_key(p.key, name), 0, client=client)
+                p.renditions = True
+            except ValueError:  # not worth failing the document for
+                delete_renditions(p.key, client=client)
+
+    workers = max(1, min(settings.UPLOAD_CONCURRENCY, len(pending)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, copy, p) for p in pending]
+
+    copied = []
+    for p, fut in zip(pending, futures):
+        exc = fut.exception()
+        if exc is None:
+            copied.append(p)
+        else:
+            p.item["error"] = str(exc) if isinstance(exc, ValueError) else "DOC_S3_ERROR"
+    return copied
+
+
+def _delete_quietly(key: str, renditions: bool, client) -> None:
+    try:
+        delete_file(key, client=client)
+    except Exception:
+        pass
+    if renditions:
+        delete_renditions(key, client=client)
+
+
+def _transfer_result(items: list[dict]) -> dict:
+    done = sum(1 for i in items if i["status"] != "failed")
+    return {"items": items, "succeeded": done, "failed": len(items) - done}
+
+
+def _batch_result(items: list[dict]) -> dict:
+    uploaded = sum(1 for i in items if i["status"] == "uploaded")
+    return {"items": items, "uploaded": uploaded, "failed": len(items) - uploaded}
+
+
+def _archive_names(filenames) -> list[str]:
+    """Flat, unique member names: ``a.pdf``, ``a (2).pdf``, ..."""
+    seen: set[str] = set()
+    out = []
+    for raw in filenames:
+        name = (raw or "").replace("/", "_").replace("\\", "_").strip()
+        if name in {"", ".", ".."}:
+            name = "file"
+        stem, dot, ext = name.rpartition(".")
+        if not stem:
+            stem, dot, ext = name, "", ""
+        candidate, n = name, 1
+        while candidate.lower() in seen:
+            n += 1
+            candidate = f"{stem} ({n}){dot}{ext}"
+        seen.add(candidate.lower())
+        out.append(candidate)
+    return out
+
+
+def _zip_date_time(ts: datetime | None) -> tuple:
+    ts = ts or datetime.utcnow()
+    return ts.timetuple()[:6] if ts.year >= 1980 else (1980, 1, 1, 0, 0, 0)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _get_upload_session(
+    db: Session, user_id: int, upload_id: str, allow_expired: bool = False
+) -> UploadSession:
+    sess = db.get(UploadSession, upload_id)
+    if not sess or sess.created_by != user_id:
+        raise ValueError("UPLOAD_NOT_FOUND")
+    expires_at = sess.expires_at
+    if expires_at.tzinfo is None:  # SQLite drops the zone
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    if not allow_expired and expires_at <= _utcnow():
+        raise ValueError("UPLOAD_EXPIRED")
+    return sess
+
+
+def _upload_parts(db: Session, session_id: str) -> list[tuple[int, str, int]]:
+    """``(part_number, etag, size_bytes)`` of the stored parts, in part order."""
+    rows = db.execute(
+        select(UploadPart.part_number, UploadPart.etag, UploadPart.size_bytes)
+        .where(UploadPart.session_id == session_id)
+        .order_by(UploadPart.part_number)
+    ).all()
+    return [tuple(r) for r in rows]
+
+
+def _missing_offsets(sess: UploadSession, parts: list[tuple[int, str, int]]) -> list[int]:
+    have = {n for n, _, _ in parts}
+    total = -(-sess.size_bytes // sess.chunk_size)
+    return [(n - 1) * sess.chunk_size for n in range(1, total + 1) if n not in have]
+
+
+def _upload_progress(sess: UploadSession, parts: list[tuple[int, str, int]]) -> dict:
+    missing = _missing_offsets(sess, parts)
+    return {
+        "id": sess.id,
+        "project_id": sess.project_id,
+        "filename": sess.filename,
+        "content_type": sess.content_type,
+        "size_bytes": sess.size_bytes,
+        "chunk_size": sess.chunk_size,
+        "received_bytes": sum(size for _, _, size in parts),
+        "missing_offsets": missing,
+        "complete": not missing,
+        "expires_at": sess.expires_at,
+    }
+
+
+def _delete_upload_sessions(db: Session, session_ids: list[str]) -> int:
+    # explicit, so it does not depend on the database enforcing ON DELETE CASCADE
+    db.execute(delete(UploadPart).where(UploadPart.session_id.in_(session_ids)))
+    return db.execute(delete(UploadSession).where(UploadSession.id.in_(session_ids))).rowcount
+
+
+def _drop_upload_session(db: Session, session_id: str) -> None:
+    """Best-effort removal after a failed complete; expiry cleans up if this fails too."""
+    try:
+        _delete_upload_sessions(db, [session_id])
+        db.commit()
+    except Exception:
+        db.rollback()
+        logger.warning("Could not drop upload session %s", session_id, exc_info=True)
+
+
+def _version_of(doc: Document) -> DocumentVersion:
+    """The current content of ``doc`` as a history entry."""
+    return DocumentVersion(
+        document_id=doc.id,
+        project_id=doc.project_id,
+        version=doc.version or 1,
+        filename=doc.filename,
+        s3_key=doc.s3_key,
+        size_bytes=doc.size_bytes or 0,
+        content_type=doc.content_type,
+        sha256=doc.sha256,
+        etag=doc.etag,
+        uploaded_by=doc.uploaded_by,
+        uploaded_at=doc.uploaded_at,
+        thumbnail_key=doc.thumbnail_key,
+        preview_key=doc.preview_key,
+    )
+
+
+def _get_version_or_404(db: Session, doc_id: int, version: int) -> DocumentVersion:
+    old = db.scalar(
+        select(DocumentVersion).where(
+            DocumentVersion.document_id == doc_id, DocumentVersion.version == version
+        )
+    )
+    if not old:
+        raise ValueError("DOC_VERSION_NOT_FOUND")
+    return old
+
+
 def _get_project_or_404(db: Session, project_id: int) -> Project:
     proj = db.get(Project, project_id)
     if not proj:
@@ -289,7 +1543,17 @@ def _get_doc_or_404(db: Session, project_id: int, doc_id: int) -> Document:
     return doc
 
 
-def _decrement_total_size(proj: Project, delta: int | None) -> None:
-    if hasattr(Project, "total_size_bytes") and delta:
-        cur = getattr(proj, "total_size_bytes", 0) or 0
-        proj.total_size_bytes = max(cur - max(delta, 0), 0)
+def _object_sha256(key: str, client) -> str:
+    digest = hashlib.sha256()
+    for chunk in iter_object(key, client=client):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _file_sha256(fh) -> str:
+    digest = hashlib.sha256()
+    fh.seek(0)
+    for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+        digest.update(chunk)
+    fh.seek(0)
+    return digest.hexdigest()
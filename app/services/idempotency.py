@@ -0,0 +1,140 @@
+"""Idempotency-Key bookkeeping: claim a key, record the response, replay it on retries."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, select, tuple_, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models import IdempotencyKey
+from app.db.upsert import dialect_insert
+
+
+def claim_key(
+    db: Session, *, user_id: int, key: str, method: str, path: str, owner: str
+) -> IdempotencyKey | None:
+    """Take ``key`` for this request, or return the stored outcome of the original one.
+
+    ``None`` means the caller now owns the key under the token ``owner``. It must keep the
+    lock alive with ``extend_lock`` and finish with ``save_response`` or ``release_key``.
+    Raises ``IDEMPOTENCY_IN_PROGRESS`` while the original request is still running and
+    ``IDEMPOTENCY_KEY_REUSED`` when the key was used for another endpoint.
+    """
+    now = _utcnow()
+    locked_until = now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS)
+    stmt = dialect_insert(db, IdempotencyKey).values(
+        user_id=user_id, key=key, method=method, path=path, owner=owner, expires_at=locked_until
+    )
+    stmt = stmt.on_conflict_do_nothing(index_elements=["user_id", "key"])
+    claimed = db.execute(stmt.returning(IdempotencyKey.key)).first() is not None
+    if not claimed:
+        # an expired key (old result, or a request that died holding the lock) is reusable
+        claimed = db.execute(
+            update(IdempotencyKey)
+            .where(
+                IdempotencyKey.user_id == user_id,
+                IdempotencyKey.key == key,
+                IdempotencyKey.expires_at <= now,
+            )
+            .values(
+                method=method,
+                path=path,
+                owner=owner,
+                status_code=None,
+                content_type=None,
+                response_headers=None,
+                response_body=None,
+                expires_at=locked_until,
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    if claimed:
+        db.commit()
+        return None
+
+    row = db.execute(
+        select(IdempotencyKey).where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+    ).scalar_one_or_none()
+    db.commit()
+    if row is None or row.status_code is None:  # None: released a moment ago; retry
+        raise ValueError("IDEMPOTENCY_IN_PROGRESS")
+    if (row.method, row.path) != (method, path):
+        raise ValueError("IDEMPOTENCY_KEY_REUSED")
+    return row
+
+
+def extend_lock(db: Session, *, user_id: int, key: str, owner: str) -> bool:
+    """Push the lock of a still-running request forward; False if it was taken over."""
+    res = db.execute(
+        update(IdempotencyKey)
+        .where(*_owned(user_id, key, owner))
+        .values(expires_at=_utcnow() + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return res.rowcount == 1
+
+
+def save_response(
+    db: Session,
+    *,
+    user_id: int,
+    key: str,
+    owner: str,
+    status_code: int,
+    content_type: str | None,
+    headers: list[tuple[str, str]],
+    body: bytes,
+) -> bool:
+    """Store the outcome; False (nothing stored) if another request took the key over."""
+    res = db.execute(
+        update(IdempotencyKey)
+        .where(*_owned(user_id, key, owner))
+        .values(
+            status_code=status_code,
+            content_type=content_type,
+            response_headers=[list(h) for h in headers],
+            response_body=body,
+            expires_at=_utcnow() + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return res.rowcount == 1
+
+
+def release_key(db: Session, *, user_id: int, key: str, owner: str) -> None:
+    """Forget an unfinished key so the request can be retried (after a 5xx or a crash)."""
+    db.execute(delete(IdempotencyKey).where(*_owned(user_id, key, owner)))
+    db.commit()
+
+
+def purge_expired_keys(db: Session, *, batch: int = 1000) -> int:
+    """Delete up to ``batch`` expired keys; returns how many were removed."""
+    expired = (
+        select(IdempotencyKey.user_id, IdempotencyKey.key)
+        .where(IdempotencyKey.expires_at <= _utcnow())
+        .limit(batch)
+    )
+    res = db.execute(
+        delete(IdempotencyKey).where(
+            tuple_(IdempotencyKey.user_id, IdempotencyKey.key).in_(expired)
+        )
+    )
+    db.commit()
+    return res.rowcount
+
+
+def _owned(user_id: int, key: str, owner: str) -> tuple:
+    return (
+        IdempotencyKey.user_id == user_id,
+        IdempotencyKey.key == key,
+        IdempotencyKey.owner == owner,
+        IdempotencyKey.status_code.is_(None),
+    )
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
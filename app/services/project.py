@@ -1,28 +1,27 @@
-from sqlalchemy import exists, select
+from sqlalchemy import delete, exists, select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from app.db.models import Project, ProjectAccess, ProjectRole, User
+from app.core.tracing import traced
+from app.db.models import Document, DocumentVersion, Project, ProjectAccess, ProjectRole, User
+from app.db.upsert import dialect_insert
 from app.schemas import ProjectIn, ProjectUpdate
+from app.services.changes import MEMBER_ADDED, entry, next_seq, record_changes
 
 
+@traced
 def create_project(db: Session, current_user: User, data: ProjectIn) -> Project:
     proj = Project(name=data.name, description=data.description, owner_id=current_user.id)
+    # the unit of work inserts the project first (RETURNING id, created_at, updated_at)
+    # and then the owner link, so no explicit flush/refresh round trips are needed
+    proj.access_list.append(ProjectAccess(user_id=current_user.id, role=ProjectRole.owner))
     db.add(proj)
-    db.flush()
-
-    owner_link = ProjectAccess(
-        project_id=proj.id,
-        user_id=current_user.id,
-        role=ProjectRole.owner,
-    )
-    db.add(owner_link)
 
     db.commit()
-    db.refresh(proj)
     return proj
 
 
+@traced
 def list_projects(db: Session, current_user: User) -> list[Project]:
     stmt = (
         select(Project)
@@ -33,12 +32,14 @@ def list_projects(db: Session, current_user: User) -> list[Project]:
     return list(db.scalars(stmt).all())
 
 
+@traced
 def get_project(db: Session, current_user: User, project_id: int) -> Project:
     proj = _get_project_or_404(db, project_id)
     _ensure_member(db, current_user.id, project_id)
     return proj
 
 
+@traced
 def update_project(
     db: Session, current_user: User, project_id: int, data: ProjectUpdate
 ) -> Project:
@@ -49,19 +50,23 @@ def update_project(
         setattr(proj, field, value)
 
     db.commit()
-    db.refresh(proj)
     return proj
 
 
+@traced
 def delete_project(db: Session, current_user: User, project_id: int) -> None:
     proj = _get_project_or_404(db, project_id)
     _ensure_owner(current_user.id, proj)
 
+    # by project_id, so on a partitioned documents table each delete stays in one partition
+    db.execute(delete(DocumentVersion).where(DocumentVersion.project_id == project_id))
+    db.execute(delete(Document).where(Document.project_id == project_id))
     db.delete(proj)
     db.commit()
     return None
 
 
+@traced
 def invite_user(db: Session, owner_user: User, project_id: int, target_login: str) -> None:
     proj = _get_project_or_404(db, project_id)
     _ensure_owner(owner_user.id, proj)
@@ -82,6 +87,9 @@ def invite_user(db: Session, owner_user: User, project_id: int, target_login: st
     )
     db.add(access)
     try:
+        db.flush()
+        seq = next_seq(db, proj.id)
+        record_changes(db, [_member_entry(proj.id, seq, owner_user.id, target.id, target.login)])
         db.commit()
     except IntegrityError:
         db.rollback()
@@ -90,7 +98,55 @@ def invite_user(db: Session, owner_user: User, project_id: int, target_login: st
     return None
 
 
+@traced
+def invite_users(db: Session, owner_user: User, project_id: int, logins: list[str]) -> dict:
+    """Invite many logins at once: one user lookup and one conflict-ignoring insert."""
+    proj = _get_project_or_404(db, project_id)
+    _ensure_owner(owner_user.id, proj)
+
+    wanted = list(dict.fromkeys(x.strip().lower() for x in logins if x.strip()))
+    users = dict(db.execute(select(User.login, User.id).where(User.login.in_(wanted))).all())
+
+    added_ids: set[int] = set()
+    if users:
+        stmt = (
+            dialect_insert(db, ProjectAccess)
+            .values(
+                [
+                    {"project_id": proj.id, "user_id": uid, "role": ProjectRole.participant}
+                    for uid in users.values()
+                ]
+            )
+            .on_conflict_do_nothing(index_elements=["project_id", "user_id"])
+            .returning(ProjectAccess.user_id)
+        )
+        added_ids = set(db.scalars(stmt))
+    found = [login for login in wanted if login in users]
+    if added_ids:
+        seq = next_seq(db, proj.id)
+        record_changes(
+            db,
+            [
+                _member_entry(proj.id, seq, owner_user.id, users[login], login)
+                for login in found
+                if users[login] in added_ids
+            ],
+        )
+    db.commit()
+
+    return {
+        "added": [login for login in found if users[login] in added_ids],
+        "already_member": [login for login in found if users[login] not in added_ids],
+        "unknown": [login for login in wanted if login not in users],
+    }
+
+
 # Private helpers
+def _member_entry(project_id: int, seq: int, actor_id: int, user_id: int, login: str) -> dict:
+    data = {"user_id": user_id, "login": login}
+    return entry(project_id, seq, MEMBER_ADDED, actor_id=actor_id, data=data)
+
+
 def _get_project_or_404(db: Session, project_id: int) -> Project:
     project = db.get(Project, project_id)
     if project is None:
@@ -0,0 +1,131 @@
+"""Thumbnail and preview renditions for image documents.
+
+Generated after the response is sent: the original is read back from S3, rendered in a
+process pool and stored next to it as ``{s3_key}@thumb.jpg`` / ``{s3_key}@preview.jpg``.
+Sanitized upload names never contain ``@``, so these keys cannot clash with user files;
+they do not count towards the project quota.
+"""
+
+from __future__ import annotations
+
+import io
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from fastapi import BackgroundTasks
+from sqlalchemy import update
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.images import render_renditions
+from app.core.metrics import THUMBNAILS
+from app.core.storage_s3 import delete_file, get_s3_client, iter_object, put_file
+from app.db.models.document import Document
+
+logger = logging.getLogger(__name__)
+
+IMAGE_MIME = {"image/png", "image/jpeg"}
+RENDITIONS = ("thumb", "preview")
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def rendition_key(s3_key: str, name: str) -> str:
+    return f"{s3_key}@{name}.jpg"
+
+
+def is_rendition_key(key: str) -> bool:
+    return key.endswith(tuple(f"@{name}.jpg" for name in RENDITIONS))
+
+
+def schedule_thumbnails(
+    background: BackgroundTasks | None, doc_id: int, s3_key: str, content_type: str
+) -> None:
+    if background is not None and content_type in IMAGE_MIME:
+        background.add_task(generate_thumbnails, doc_id, s3_key)
+
+
+def generate_thumbnails(
+    doc_id: int, s3_key: str, *, session_factory: sessionmaker | None = None, client=None
+) -> bool:
+    """Render and store the renditions of ``s3_key``, then record them on the document.
+
+    If the document was replaced or deleted in the meantime the new objects are removed
+    again. Failures are logged; the document simply keeps no thumbnail.
+    """
+    client = client or get_s3_client()
+    try:
+        data = b"".join(iter_object(s3_key, client=client))
+        rendered = _render(data)
+        for name, body in rendered.items():
+            put_file(rendition_key(s3_key, name), io.BytesIO(body), "image/jpeg", client=client)
+    except Exception:
+        logger.warning("Thumbnail generation failed (key=%s)", s3_key, exc_info=True)
+        THUMBNAILS.labels("failed").inc()
+        return False
+
+    if session_factory is None:
+        from app.db.session import SessionLocal as session_factory
+
+    with session_factory() as db:
+        res = db.execute(
+            update(Document)
+            .where(Document.id == doc_id, Document.s3_key == s3_key)
+            .values(
+                thumbnail_key=rendition_key(s3_key, "thumb"),
+                preview_key=rendition_key(s3_key, "preview"),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    if res.rowcount == 0:
+        delete_renditions(s3_key, client=client)
+        THUMBNAILS.labels("stale").inc()
+        return False
+    THUMBNAILS.labels("ok").inc()
+    return True
+
+
+def delete_renditions(s3_key: str, client=None) -> None:
+    for name in RENDITIONS:
+        try:
+            delete_file(rendition_key(s3_key, name), client=client)
+        except Exception:
+            pass
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _render(data: bytes) -> dict[str, bytes]:
+    boxes = {"thumb": settings.THUMBNAIL_SIZE, "preview": settings.PREVIEW_SIZE}
+    if settings.THUMBNAIL_WORKERS <= 0:
+        return render_renditions(data, boxes)
+    try:
+        future = _get_pool().submit(render_renditions, data, boxes)
+        return future.result(timeout=settings.THUMBNAIL_TIMEOUT_SECONDS)
+    except BrokenProcessPool:
+        shutdown_pool()  # a worker died (e.g. OOM on a huge image); start fresh next time
+        raise
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    # decoding is CPU-bound and holds the GIL, so it runs outside the API process;
+    # spawn avoids forking a process that has live threads and DB connections
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
@@ -1,11 +1,14 @@
 import os
 import tempfile
+from contextlib import contextmanager
 from uuid import uuid4
 
 import pytest
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 
+from app.core.config import settings
+from app.core.instrumentation import install_sql_hooks, track_request
 from app.db.models.base import Base
 from app.services import auth as auth_svc
 
@@ -16,6 +19,7 @@ def engine():
     os.close(fd)
     url = f"sqlite:///{path}"
     eng = create_engine(url, future=True, connect_args={"check_same_thread": False})
+    install_sql_hooks(eng)
     Base.metadata.create_all(bind=eng)
     try:
         yield eng
@@ -27,9 +31,19 @@ def engine():
             pass
 
 
+@pytest.fixture(autouse=True)
+def fail_on_repeated_queries(monkeypatch):
+    """Each test runs as one tracked "request"; N+1 statement patterns raise."""
+    monkeypatch.setattr(settings, "SQL_REPEAT_RAISE", True)
+    with track_request() as stats:
+        yield stats
+
+
 @pytest.fixture(scope="function")
 def db_session(engine):
-    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+    SessionLocal = sessionmaker(
+        bind=engine, autoflush=False, autocommit=False, expire_on_commit=False, future=True
+    )
     db = SessionLocal()
     try:
         yield db
@@ -37,6 +51,26 @@ def db_session(engine):
         db.close()
 
 
+@pytest.fixture
+def statement_counter(engine):
+    """Collect the SQL statements sent to the database inside a ``with`` block."""
+
+    @contextmanager
+    def _count():
+        statements: list[str] = []
+
+        def _before(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", _before)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", _before)
+
+    return _count
+
+
 @pytest.fixture
 def user_factory(db_session):
     def _create(login: str, password: str = "pass"):
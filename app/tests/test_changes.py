@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+
+import pytest
+from fastapi import UploadFile
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+
+from app.core import storage_s3
+from app.core.storage_local import LocalS3Client
+from app.db.models import User
+from app.schemas import ProjectIn
+from app.services import changes as changes_svc
+from app.services import document as doc_svc
+from app.services import project as project_svc
+
+
+def _upload(data: bytes = b"x", name: str = "a.txt"):
+    return UploadFile(
+        file=io.BytesIO(data), filename=name, headers=Headers({"content-type": "text/plain"})
+    )
+
+
+@pytest.fixture
+def s3(tmp_path, monkeypatch):
+    client = LocalS3Client(tmp_path)
+    monkeypatch.setattr(storage_s3, "get_s3_client", lambda: client)
+    monkeypatch.setattr(doc_svc, "get_s3_client", lambda: client)
+    return client
+
+
+@pytest.fixture
+def project(db_session, user_factory, s3):
+    owner = user_factory("chg")
+    proj = project_svc.create_project(db_session, owner, ProjectIn(name="P"))
+    return owner, proj
+
+
+def _changes(db, owner, proj, since=0, limit=None):
+    return changes_svc.list_changes(
+        db, user_id=owner.id, project_id=proj.id, since=since, limit=limit
+    )
+
+
+def test_document_writes_are_logged_in_order(db_session, project):
+    owner, proj = project
+    doc = doc_svc.upload_document(db_session, user_id=owner.id, project_id=proj.id, file=_upload())
+    doc_svc.replace_document(db_session, user_id=owner.id, doc_id=doc.id, file=_upload(b"yy"))
+    doc_svc.delete_document_by_id(db_session, user_id=owner.id, doc_id=doc.id)
+
+    out = _changes(db_session, owner, proj)
+    assert [(c.kind, c.document_id) for c in out["items"]] == [
+        ("document.added", doc.id),
+        ("document.updated", doc.id),
+        ("document.removed", doc.id),
+    ]
+    assert out["items"][1].data == {"filename": "a.txt", "size_bytes": 2}
+    seqs = [c.seq for c in out["items"]]
+    assert seqs == sorted(set(seqs)) and out["next"] == seqs[-1] and not out["has_more"]
+    assert _changes(db_session, owner, proj, since=seqs[0])["items"][0].kind == "document.updated"
+
+
+def test_pages_never_split_a_transaction(db_session, project):
+    owner, proj = project
+    doc_svc.upload_document(db_session, user_id=owner.id, project_id=proj.id, file=_upload())
+    doc_svc.upload_documents(
+        db_session,
+        user_id=owner.id,
+        project_id=proj.id,
+        files=[_upload(name=f"{i}.txt") for i in range(3)],
+    )
+
+    first = _changes(db_session, owner, proj, limit=2)
+    assert len(first["items"]) == 1 and first["has_more"]
+    # the batch shares one seq and is larger than the page: it comes whole
+    second = _changes(db_session, owner, proj, since=first["next"], limit=2)
+    assert len(second["items"]) == 3 and len({c.seq for c in second["items"]}) == 1
+    assert _changes(db_session, owner, proj, since=second["next"])["items"] == []
+
+
+def test_move_logs_removal_and_addition(db_session, project, user_factory):
+    owner, proj = project
+    other = project_svc.create_project(db_session, owner, ProjectIn(name="Q"))
+    doc = doc_svc.upload_document(db_session, user_id=owner.id, project_id=proj.id, file=_upload())
+    doc_svc.move_documents(
+        db_session, user_id=owner.id, target_project_id=other.id, doc_ids=[doc.id]
+    )
+
+    assert _changes(db_session, owner, proj)["items"][-1].kind == "document.removed"
+    moved_in = _changes(db_session, owner, other)["items"]
+    assert [(c.kind, c.document_id) for c in moved_in] == [("document.added", doc.id)]
+
+
+def test_invites_log_only_new_members(db_session, project):
+    owner, proj = project
+    db_session.execute(insert(User), [{"login": f"chg_m{proj.id}", "password_hash": "x"}])
+    db_session.commit()
+    project_svc.invite_users(db_session, owner, proj.id, [f"chg_m{proj.id}"])
+    project_svc.invite_user(db_session, owner, proj.id, f"chg_m{proj.id}")  # already a member
+
+    items = _changes(db_session, owner, proj)["items"]
+    assert [(c.kind, c.data["login"]) for c in items] == [("member.added", f"chg_m{proj.id}")]
+
+
+def test_changes_require_membership(db_session, project, user_factory):
+    owner, proj = project
+    stranger = user_factory("chg_x")
+    with pytest.raises(PermissionError):
+        _changes(db_session, stranger, proj)
+    with pytest.raises(ValueError, match="SYNC_BAD_VERSION"):
+        _changes(db_session, owner, proj, since=10**6)
+
+
+def _parse(chunk: str) -> list[dict]:
+    events = []
+    for block in chunk.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line)
+        if "data" in fields:
+            events.append({**fields, "data": json.loads(fields["data"])})
+    return events
+
+
+@pytest.mark.asyncio
+async def test_stream_catches_up_then_follows(engine, db_session, project):
+    owner, proj = project
+    first = doc_svc.upload_document(
+        db_session, user_id=owner.id, project_id=proj.id, file=_upload()
+    )
+    factory = sessionmaker(bind=engine, expire_on_commit=False)
+
+    stream = await changes_svc.change_stream(
+        user_id=owner.id, project_id=proj.id, since=0, session_factory=factory
+    )
+    try:
+        assert (await anext(stream)).startswith("retry:")
+        caught_up = _parse(await anext(stream))
+        assert [e["data"]["document_id"] for e in caught_up] == [first.id]
+        assert caught_up[0]["id"] == str(caught_up[0]["data"]["seq"])
+
+        def write():
+            with factory() as db:
+                return doc_svc.upload_document(
+                    db, user_id=owner.id, project_id=proj.id, file=_upload(name="b.txt")
+                )
+
+        second = await run_in_threadpool(write)
+        live = _parse(await asyncio.wait_for(anext(stream), timeout=5))
+        assert [(e["event"], e["data"]["document_id"]) for e in live] == [
+            ("document.added", second.id)
+        ]
+    finally:
+        await stream.aclose()
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import io
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import BackgroundTasks, UploadFile
+from sqlalchemy import select, update
+from sqlalchemy.orm import sessionmaker
+from starlette.datastructures import Headers
+
+from app.core import storage_s3
+from app.core.config import settings
+from app.core.instrumentation import track_request
+from app.core.storage_local import LocalS3Client
+from app.db.models import DocumentVersion, Project
+from app.schemas import ProjectIn
+from app.services import document as doc_svc
+from app.services import project as project_svc
+
+
+def _upload(data: bytes, name: str = "a.txt"):
+    return UploadFile(
+        file=io.BytesIO(data), filename=name, headers=Headers({"content-type": "text/plain"})
+    )
+
+
+@pytest.fixture
+def s3(tmp_path, monkeypatch):
+    client = LocalS3Client(tmp_path)
+    monkeypatch.setattr(storage_s3, "get_s3_client", lambda: client)
+    monkeypatch.setattr(doc_svc, "get_s3_client", lambda: client)
+    return client
+
+
+def _objects(s3):
+    return sorted(p.read_bytes() for p in (s3.root / settings.S3_BUCKET).rglob("*") if p.is_file())
+
+
+def _total(db, proj):
+    return db.scalar(select(Project.total_size_bytes).where(Project.id == proj.id))
+
+
+@pytest.fixture
+def history(db_session, user_factory, s3):
+    """A document replaced twice: v1 b"one", v2 b"two!", current v3 b"three"."""
+    owner = user_factory("versions")
+    proj = project_svc.create_project(db_session, owner, ProjectIn(name="P"))
+    doc = doc_svc.upload_document(
+        db_session, user_id=owner.id, project_id=proj.id, file=_upload(b"one", "v1.txt")
+    )
+    for data, name in [(b"two!", "v2.txt"), (b"three", "v3.txt")]:
+        doc = doc_svc.replace_document(
+            db_session, user_id=owner.id, doc_id=doc.id, file=_upload(data, name)
+        )
+    return owner, proj, doc
+
+
+def test_replace_keeps_versions_and_restore_swaps_pointers(db_session, history, s3):
+    owner, proj, doc = history
+    assert doc.version == 3
+    assert _objects(s3) == [b"one", b"three", b"two!"]
+    assert _total(db_session, proj) == 12  # every kept version counts
+
+    page = doc_svc.list_document_versions(
+        db_session, user_id=owner.id, doc_id=doc.id, page=1, page_size=1
+    )
+    assert (page["total"], [v.version for v in page["items"]]) == (2, [2])
+
+    background = BackgroundTasks()
+    with track_request() as stats:
+        out = doc_svc.restore_document_version(
+            db_session, user_id=owner.id, doc_id=doc.id, version=1, background=background
+        )
+    assert stats.s3_count == 0
+    assert (out.filename, out.size_bytes, out.version) == ("v1.txt", 3, 4)
+    assert background.tasks[0].func is doc_svc.prune_document_versions
+    versions = doc_svc.list_document_versions(db_session, user_id=owner.id, doc_id=doc.id)
+    assert [(v.version, v.filename) for v in versions["items"]] == [(3, "v3.txt"), (2, "v2.txt")]
+    assert _total(db_session, proj) == 12
+
+    with pytest.raises(ValueError, match="DOC_VERSION_NOT_FOUND"):
+        doc_svc.restore_document_version(db_session, user_id=owner.id, doc_id=doc.id, version=1)
+
+
+def test_retention_prunes_by_count_and_age(db_session, history, s3, engine, monkeypatch):
+    owner, proj, doc = history
+    factory = sessionmaker(bind=engine, expire_on_commit=False)
+    monkeypatch.setattr(settings, "DOCUMENT_VERSIONS_KEEP", 1)
+
+    assert doc_svc.prune_document_versions(doc.id, session_factory=factory) == 1
+    assert _objects(s3) == [b"three", b"two!"]
+    assert _total(db_session, proj) == 9
+
+    monkeypatch.setattr(settings, "DOCUMENT_VERSION_MAX_AGE_DAYS", 30)
+    assert doc_svc.prune_versions(db_session, document_ids=[doc.id]) == 0
+    db_session.execute(
+        update(DocumentVersion)
+        .where(DocumentVersion.document_id == doc.id)
+        .values(archived_at=datetime.now(timezone.utc) - timedelta(days=31))
+    )
+    db_session.commit()
+    assert doc_svc.prune_versions(db_session, document_ids=[doc.id]) == 1
+    assert _objects(s3) == [b"three"]
+    assert _total(db_session, proj) == 5
+
+
+def test_delete_removes_history_and_frees_quota(db_session, history, s3):
+    owner, proj, doc = history
+    doc_svc.delete_document_by_id(db_session, user_id=owner.id, doc_id=doc.id)
+
+    assert _objects(s3) == []
+    assert _total(db_session, proj) == 0
+    left = select(DocumentVersion).where(DocumentVersion.document_id == doc.id)
+    assert db_session.scalars(left).all() == []
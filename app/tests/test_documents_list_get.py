@@ -139,3 +139,44 @@ def test_presigned_link_forbidden_non_member(db_session, user_factory):
 
     with pytest.raises(ValueError):
         doc_svc.get_document_download_link_by_id(db_session, user_id=alien.id, doc_id=d.id)
+
+
+# tests: batch metadata + links
+def test_batch_links_one_lookup_for_many_projects(
+    db_session, user_factory, monkeypatch, statement_counter
+):
+    owner = user_factory("owner8")
+    other = user_factory("owner8b")
+    p1 = _mk_project(db_session, owner.id, name="p1")
+    p2 = _mk_project(db_session, other.id, name="p2")
+    _add_participant(db_session, p2.id, owner.id)
+    p3 = _mk_project(db_session, other.id, name="p3")
+    docs = [_mk_doc(db_session, p.id, f"b{i}.pdf") for i, p in enumerate([p1, p2, p1, p2])]
+    private = _mk_doc(db_session, p3.id, "private.pdf")
+
+    signed = []
+
+    def fake_presign(keys, *, ttl=600):
+        signed.append(list(keys))
+        return [f"https://example.com/{k}?X-Amz-Expires={ttl}" for k in keys]
+
+    monkeypatch.setattr(doc_svc, "presigned_download_urls", fake_presign, raising=True)
+
+    ids = [d.id for d in docs] + [private.id, 999_999]
+    db_session.expunge_all()
+    with statement_counter() as stmts:
+        out = doc_svc.get_documents_with_links(db_session, user_id=owner.id, doc_ids=ids, ttl=120)
+    # documents WHERE id IN (...), accessible projects
+    assert len(stmts) <= 2, stmts
+    assert [i["document_id"] for i in out["items"]] == ids
+    assert [i["document"].id for i in out["items"][:4]] == [d.id for d in docs]
+    assert out["items"][0]["url"] == f"https://example.com/{docs[0].s3_key}?X-Amz-Expires=120"
+    assert [i["error"] for i in out["items"][4:]] == ["DOC_NO_ACCESS", "DOC_NOT_FOUND"]
+    assert signed == [[d.s3_key for d in docs]] and out["expires_in"] == 120
+
+
+def test_batch_links_limit(db_session, user_factory, monkeypatch):
+    owner = user_factory("owner9")
+    monkeypatch.setattr(doc_svc.settings, "DOCUMENT_BATCH_MAX_IDS", 2)
+    with pytest.raises(ValueError, match="DOC_BATCH_TOO_LARGE"):
+        doc_svc.get_documents_with_links(db_session, user_id=owner.id, doc_ids=[1, 2, 3])
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import io
+
+import pytest
+from fastapi import UploadFile
+from sqlalchemy import select
+from starlette.datastructures import Headers
+
+from app.core import storage_s3
+from app.core.config import settings
+from app.core.storage_local import LocalS3Client
+from app.db.models import Document, Project
+from app.schemas import ProjectIn
+from app.services import document as doc_svc
+from app.services import project as project_svc
+from app.services.thumbnails import rendition_key
+
+
+@pytest.fixture
+def s3(tmp_path, monkeypatch):
+    client = LocalS3Client(tmp_path)
+    monkeypatch.setattr(storage_s3, "get_s3_client", lambda: client)
+    monkeypatch.setattr(doc_svc, "get_s3_client", lambda: client)
+    return client
+
+
+def _body(s3, key):
+    return s3.get_object(Bucket=settings.S3_BUCKET, Key=key)["Body"].read()
+
+
+def _totals(db, *projects):
+    rows = dict(db.execute(select(Project.id, Project.total_size_bytes)).all())
+    return [rows[p.id] for p in projects]
+
+
+@pytest.fixture
+def setup(db_session, user_factory, s3):
+    owner = user_factory("transfer")
+    src = project_svc.create_project(db_session, owner, ProjectIn(name="src"))
+    dst = project_svc.create_project(db_session, owner, ProjectIn(name="dst"))
+    docs = doc_svc.upload_documents(
+        db_session,
+        user_id=owner.id,
+        project_id=src.id,
+        files=[
+            UploadFile(
+                file=io.BytesIO(data), filename=name, headers=Headers({"content-type": ctype})
+            )
+            for name, data, ctype in [
+                ("a.txt", b"aaa", "text/plain"),
+                ("p.png", b"PNG", "image/png"),
+            ]
+        ],
+    )["items"]
+    a, pic = (i["document"] for i in docs)
+    for name in ("thumb", "preview"):
+        s3.put_object(Bucket=settings.S3_BUCKET, Key=rendition_key(pic.s3_key, name), Body=b"jpg")
+    pic.thumbnail_key = rendition_key(pic.s3_key, "thumb")
+    pic.preview_key = rendition_key(pic.s3_key, "preview")
+    db_session.commit()
+    return owner, src, dst, a, pic
+
+
+def test_copy_duplicates_objects_renditions_and_charges_target(db_session, setup, s3):
+    owner, src, dst, a, pic = setup
+
+    out = doc_svc.copy_documents(
+        db_session, user_id=owner.id, target_project_id=dst.id, doc_ids=[a.id, pic.id, 999_999]
+    )
+
+    assert [(i["status"], i["error"]) for i in out["items"]] == [
+        ("copied", None),
+        ("copied", None),
+        ("failed", "DOC_NOT_FOUND"),
+    ]
+    new_a, new_pic = (i["document"] for i in out["items"][:2])
+    assert new_a.id != a.id and new_a.project_id == dst.id
+    assert new_a.s3_key.startswith(f"projects/{dst.id}/") and _body(s3, new_a.s3_key) == b"aaa"
+    assert new_pic.thumbnail_key == rendition_key(new_pic.s3_key, "thumb")
+    assert _body(s3, new_pic.thumbnail_key) == b"jpg"
+    assert _body(s3, a.s3_key) == b"aaa"  # the original stays
+    assert _totals(db_session, src, dst) == [6, 6]
+
+
+def test_move_keeps_ids_and_shifts_totals(db_session, setup, s3, user_factory):
+    owner, src, dst, a, pic = setup
+    member = user_factory("transfer_member")
+    project_svc.invite_user(db_session, owner, src.id, member.login)
+    project_svc.invite_user(db_session, owner, dst.id, member.login)
+    denied = doc_svc.move_documents(
+        db_session, user_id=member.id, target_project_id=dst.id, doc_ids=[a.id]
+    )
+    assert denied["items"][0]["error"] == "DOC_NO_ACCESS"  # moving needs the source's owner
+
+    old_keys = (a.s3_key, pic.s3_key, pic.thumbnail_key)
+    out = doc_svc.move_documents(
+        db_session, user_id=owner.id, target_project_id=dst.id, doc_ids=[a.id, pic.id]
+    )
+
+    assert (out["succeeded"], out["failed"]) == (2, 0)
+    moved = db_session.get(Document, pic.id)
+    assert moved.project_id == dst.id and moved.s3_key.startswith(f"projects/{dst.id}/")
+    assert _body(s3, moved.preview_key) == b"jpg"
+    assert not any((s3.root / settings.S3_BUCKET / k).exists() for k in old_keys)
+    assert _totals(db_session, src, dst) == [0, 6]
+
+
+def test_move_locks_both_projects_in_id_order_first(db_session, setup, s3, statement_counter):
+    owner, src, dst, a, pic = setup
+    with statement_counter() as stmts:
+        doc_svc.move_documents(
+            db_session, user_id=owner.id, target_project_id=dst.id, doc_ids=[a.id]
+        )
+
+    flat = [" ".join(s.split()) for s in stmts]
+    lock = next(i for i, s in enumerate(flat) if s.endswith("ORDER BY projects.id"))
+    first_update = next(i for i, s in enumerate(flat) if s.startswith("UPDATE projects"))
+    assert lock < first_update
+    assert "IN (?, ?)" in flat[lock]  # target and source together
+
+
+def test_transfer_over_quota_leaves_no_copies(db_session, setup, s3, monkeypatch):
+    owner, src, dst, a, pic = setup
+    monkeypatch.setattr(settings, "PROJECT_SIZE_LIMIT_BYTES", 8)
+    doc_svc.copy_documents(db_session, user_id=owner.id, target_project_id=dst.id, doc_ids=[a.id])
+
+    with pytest.raises(ValueError, match="DOC_PROJECT_LIMIT"):
+        doc_svc.copy_documents(
+            db_session, user_id=owner.id, target_project_id=dst.id, doc_ids=[a.id, pic.id]
+        )
+    assert _totals(db_session, src, dst) == [6, 3]
+    assert len(list((s3.root / settings.S3_BUCKET / f"projects/{dst.id}").iterdir())) == 1
+
+
+def test_large_objects_are_copied_in_parts(s3, monkeypatch):
+    monkeypatch.setattr(settings, "S3_COPY_MULTIPART_THRESHOLD_BYTES", 1)
+    monkeypatch.setattr(settings, "S3_COPY_PART_BYTES", 5 * 1024 * 1024)
+    data = bytes(range(256)) * (11 * 1024 * 1024 // 256)
+    s3.put_object(Bucket=settings.S3_BUCKET, Key="projects/1/big.bin", Body=data)
+
+    storage_s3.copy_file("projects/1/big.bin", "projects/2/big.bin", len(data))
+
+    assert _body(s3, "projects/2/big.bin") == data
+    with pytest.raises(ValueError, match="DOC_NOT_FOUND"):
+        storage_s3.copy_file("projects/1/missing.bin", "projects/2/x.bin", len(data))
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import io
+
+import pytest
+from fastapi import UploadFile
+from starlette.datastructures import Headers
+
+from app.core.config import settings
+from app.db.models import Document, Project
+from app.schemas import ProjectIn
+from app.services import document as doc_svc
+from app.services import project as project_svc
+
+
+def _upload(name: str, data: bytes = b"hello", ctype: str = "text/plain"):
+    return UploadFile(
+        file=io.BytesIO(data), filename=name, headers=Headers({"content-type": ctype})
+    )
+
+
+@pytest.fixture
+def s3_calls(monkeypatch):
+    calls = {"put": [], "delete": []}
+
+    def put(key, fileobj, ctype, metadata=None, client=None):
+        if key.endswith("broken.txt"):
+            raise ValueError("DOC_S3_ERROR")
+        calls["put"].append((key, fileobj.read()))
+
+    monkeypatch.setattr(doc_svc, "get_s3_client", lambda: None)
+    monkeypatch.setattr(doc_svc, "put_file", put)
+    monkeypatch.setattr(
+        doc_svc, "delete_file", lambda key, client=None: calls["delete"].append(key)
+    )
+    return calls
+
+
+def test_upload_documents_reports_each_file(db_session, user_factory, s3_calls):
+    owner = user_factory("batch_ul")
+    proj = project_svc.create_project(db_session, owner, ProjectIn(name="P"))
+
+    out = doc_svc.upload_documents(
+        db_session,
+        user_id=owner.id,
+        project_id=proj.id,
+        files=[
+            _upload("a.txt", b"aaa"),
+            _upload("empty.txt", b""),
+            _upload("x.exe", ctype="application/x-msdownload"),
+            _upload("broken.txt", b"bbbb"),
+            _upload("b.txt", b"bb"),
+        ],
+    )
+
+    assert [(i["filename"], i["status"], i["error"]) for i in out["items"]] == [
+        ("a.txt", "uploaded", None),
+        ("empty.txt", "failed", "DOC_EMPTY"),
+        ("x.exe", "failed", "DOC_UNSUPPORTED_TYPE"),
+        ("broken.txt", "failed", "DOC_S3_ERROR"),
+        ("b.txt", "uploaded", None),
+    ]
+    assert (out["uploaded"], out["failed"]) == (2, 3)
+    assert sorted(body for _, body in s3_calls["put"]) == [b"aaa", b"bb"]
+
+    db_session.expire_all()
+    # the bytes reserved for broken.txt were released again
+    assert db_session.get(Project, proj.id).total_size_bytes == 5
+    assert db_session.query(Document).filter_by(project_id=proj.id).count() == 2
+
+
+def test_upload_documents_rejects_batch_over_quota(db_session, user_factory, s3_calls, monkeypatch):
+    owner = user_factory("batch_quota")
+    proj = project_svc.create_project(db_session, owner, ProjectIn(name="P"))
+    monkeypatch.setattr(settings, "PROJECT_SIZE_LIMIT_BYTES", 6)
+
+    with pytest.raises(ValueError, match="DOC_PROJECT_LIMIT"):
+        doc_svc.upload_documents(
+            db_session,
+            user_id=owner.id,
+            project_id=proj.id,
+            files=[_upload("a.txt", b"aaaa"), _upload("b.txt", b"bbbb")],
+        )
+
+    assert s3_calls["put"] == []
+    db_session.expire_all()
+    assert db_session.get(Project, proj.id).total_size_bytes == 0
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+from sqlalchemy.orm import sessionmaker
+
+from app.core import security
+from app.core.config import settings
+from app.core.idempotency import register_idempotency
+from app.db.models import IdempotencyKey
+from app.services import idempotency as idem_svc
+
+
+@pytest.fixture
+def factory(engine):
+    return sessionmaker(bind=engine, expire_on_commit=False)
+
+
+@pytest.fixture
+def client(factory, user_factory, monkeypatch):
+    monkeypatch.setattr(settings, "JWT_SECRET", security.JWT_SECRET)
+    app = FastAPI()
+    register_idempotency(app, session_factory=factory)
+    calls = []
+
+    @app.post("/things", status_code=201)
+    async def create_thing(request: dict, response: Response):
+        calls.append(request)
+        if request.get("fail"):
+            raise HTTPException(status_code=503)
+        response.headers["Location"] = f"/things/{len(calls)}"
+        response.headers["ETag"] = f'"{len(calls)}"'
+        return {"n": len(calls)}
+
+    user = user_factory("idem")
+    token = security.create_access_token(str(user.id))
+    c = TestClient(app)
+    c.headers["Authorization"] = f"Bearer {token}"
+    return c, calls
+
+
+def test_retry_replays_the_stored_response(client):
+    c, calls = client
+    first = c.post("/things", json={"a": 1}, headers={"Idempotency-Key": "k1"})
+    again = c.post("/things", json={"a": 2}, headers={"Idempotency-Key": "k1"})
+    other = c.post("/things", json={"a": 3}, headers={"Idempotency-Key": "k2"})
+
+    assert first.json() == again.json() == {"n": 1}
+    assert again.status_code == 201 and again.headers["Idempotent-Replayed"] == "true"
+    assert (again.headers["Location"], again.headers["ETag"]) == ("/things/1", '"1"')
+    assert again.headers["content-type"] == "application/json"
+    assert other.json() == {"n": 2}
+    assert len(calls) == 2
+    assert c.post("/things", json={}).json() == {"n": 3}  # no key, no bookkeeping
+
+
+def test_lock_is_extended_while_the_request_runs(factory, user_factory, monkeypatch):
+    monkeypatch.setattr(settings, "JWT_SECRET", security.JWT_SECRET)
+    monkeypatch.setattr(settings, "IDEMPOTENCY_LOCK_SECONDS", 0.3)
+    user = user_factory("idem_slow")
+    app = FastAPI()
+    register_idempotency(app, session_factory=factory)
+    seen = []
+
+    @app.post("/slow")
+    async def slow():
+        await asyncio.sleep(0.6)  # twice the lock
+        with factory() as db, pytest.raises(ValueError) as exc:
+            idem_svc.claim_key(
+                db, user_id=user.id, key="k", method="POST", path="/slow", owner="retry"
+            )
+        seen.append(str(exc.value))
+        return {}
+
+    c = TestClient(app)
+    token = security.create_access_token(str(user.id))
+    headers = {"Authorization": f"Bearer {token}", "Idempotency-Key": "k"}
+    assert c.post("/slow", headers=headers).status_code == 200
+    assert seen == ["IDEMPOTENCY_IN_PROGRESS"]
+
+
+def test_server_errors_release_the_key(client):
+    c, calls = client
+    assert c.post("/things", json={"fail": 1}, headers={"Idempotency-Key": "k"}).status_code == 503
+    assert c.post("/things", json={}, headers={"Idempotency-Key": "k"}).status_code == 201
+    assert len(calls) == 2
+    assert c.post("/things", json={}, headers={"Idempotency-Key": " "}).status_code == 400
+
+
+def _expire(db, uid):
+    db.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.user_id == uid)
+        .values(expires_at=datetime.now(timezone.utc) - timedelta(seconds=1))
+    )
+    db.commit()
+
+
+def test_claim_locks_rejects_reuse_and_takes_over_expired_keys(db_session, user_factory):
+    uid = user_factory("idem_svc").id
+    claim = lambda path="/a", owner="a": idem_svc.claim_key(  # noqa: E731
+        db_session, user_id=uid, key="k", method="POST", path=path, owner=owner
+    )
+    save = lambda owner, body: idem_svc.save_response(  # noqa: E731
+        db_session,
+        user_id=uid,
+        key="k",
+        owner=owner,
+        status_code=201,
+        content_type="text/plain",
+        headers=[("location", "/things/1")],
+        body=body,
+    )
+
+    assert claim() is None
+    with pytest.raises(ValueError, match="IDEMPOTENCY_IN_PROGRESS"):
+        claim(owner="b")
+    assert save("a", b"ok")
+    stored = claim(owner="b")
+    assert (stored.response_body, stored.response_headers) == (b"ok", [["location", "/things/1"]])
+    with pytest.raises(ValueError, match="IDEMPOTENCY_KEY_REUSED"):
+        claim("/b", owner="b")
+
+    _expire(db_session, uid)
+    assert claim("/b", owner="b") is None  # expired: the key is free again
+    idem_svc.release_key(db_session, user_id=uid, key="k", owner="b")
+    assert idem_svc.purge_expired_keys(db_session) == 0
+    db_session.expire_all()
+    assert db_session.get(IdempotencyKey, (uid, "k")) is None
+
+
+def test_a_request_that_lost_its_lock_cannot_save_or_release(db_session, user_factory):
+    uid = user_factory("idem_owner").id
+    kwargs = dict(user_id=uid, key="k", method="POST", path="/a")
+
+    assert idem_svc.claim_key(db_session, owner="slow", **kwargs) is None
+    assert idem_svc.extend_lock(db_session, user_id=uid, key="k", owner="slow")
+    _expire(db_session, uid)  # e.g. the slow request's process stalled
+    assert idem_svc.claim_key(db_session, owner="retry", **kwargs) is None
+
+    assert not idem_svc.extend_lock(db_session, user_id=uid, key="k", owner="slow")
+    idem_svc.release_key(db_session, user_id=uid, key="k", owner="slow")
+    saved = idem_svc.save_response(
+        db_session,
+        user_id=uid,
+        key="k",
+        owner="slow",
+        status_code=201,
+        content_type=None,
+        headers=[],
+        body=b"slow",
+    )
+    assert not saved
+    db_session.expire_all()
+    row = db_session.get(IdempotencyKey, (uid, "k"))
+    assert (row.owner, row.status_code) == ("retry", None)
@@ -0,0 +1,73 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select, text
+from sqlalchemy.exc import OperationalError
+
+from app.core import instrumentation
+from app.core.config import settings
+from app.db.models import User
+
+
+def test_statement_shape_collapses_in_lists_and_literals():
+    a = instrumentation.statement_shape("SELECT * FROM t WHERE id IN (?, ?, ?) LIMIT 5")
+    b = instrumentation.statement_shape("SELECT *  FROM t\nWHERE id IN (?) LIMIT 10")
+    assert a == b
+
+
+def test_db_statements_are_counted(db_session, user_factory):
+    user_factory("instr")
+    with instrumentation.track_request() as stats:
+        db_session.execute(select(User)).all()
+        db_session.execute(select(User)).all()
+    assert stats.db_count == 2
+    assert stats.db_ms >= 0
+
+
+def test_failed_statement_leaves_no_timing_state(db_session):
+    with instrumentation.track_request() as stats:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                db_session.execute(text("SELECT * FROM no_such_table"))
+            db_session.rollback()
+        db_session.execute(select(User)).all()
+    assert stats.db_count == 1
+    assert "query_start" not in db_session.connection().info
+
+
+def test_repeated_statement_raises_under_tests(db_session, monkeypatch):
+    monkeypatch.setattr(settings, "SQL_REPEAT_THRESHOLD", 3)
+    with instrumentation.track_request():
+        for i in range(2):
+            db_session.get(User, 10_000 + i)
+        with pytest.raises(instrumentation.RepeatedQueryError):
+            db_session.get(User, 20_000)
+
+
+def test_repeated_statement_only_warns_when_not_raising(db_session, monkeypatch, caplog):
+    monkeypatch.setattr(settings, "SQL_REPEAT_THRESHOLD", 2)
+    monkeypatch.setattr(settings, "SQL_REPEAT_RAISE", False)
+    with instrumentation.track_request() as stats:
+        for i in range(3):
+            db_session.get(User, 30_000 + i)
+    assert len(stats.repeated) == 1
+    assert "Possible N+1" in caplog.text
+
+
+def test_server_timing_header_and_log_line(caplog):
+    app = FastAPI()
+    instrumentation.register_request_instrumentation(app)
+
+    @app.get("/items/{item_id}")
+    def read_item(item_id: int):
+        with instrumentation.record_s3("presigned_download_url"):
+            pass
+        return {"id": item_id}
+
+    with caplog.at_level("INFO", logger="app.core.instrumentation"):
+        resp = TestClient(app).get("/items/7")
+
+    assert resp.status_code == 200
+    timing = resp.headers["Server-Timing"]
+    assert "db;dur=" in timing and "s3;dur=" in timing and 'desc="1 calls"' in timing
+    assert '"route": "/items/{item_id}"' in caplog.text
@@ -0,0 +1,47 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.core import metrics
+from app.core.instrumentation import record_s3, register_request_instrumentation
+
+
+def _sample(name: str, labels: dict) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_request_latency_is_labelled_by_route_template():
+    app = FastAPI()
+    register_request_instrumentation(app)
+
+    @app.get("/things/{thing_id}")
+    def read_thing(thing_id: int):
+        return {"id": thing_id}
+
+    labels = {"method": "GET", "route": "/things/{thing_id}", "status": "200"}
+    before = _sample("projectboard_http_request_duration_seconds_count", labels)
+    client = TestClient(app)
+    client.get("/things/1")
+    client.get("/things/2")
+    client.get("/nope")
+
+    assert _sample("projectboard_http_request_duration_seconds_count", labels) == before + 2
+    unmatched = {"method": "GET", "route": metrics.UNMATCHED_ROUTE, "status": "404"}
+    assert _sample("projectboard_http_request_duration_seconds_count", unmatched) >= 1
+
+
+def test_s3_errors_are_counted_per_operation():
+    before = _sample("projectboard_s3_operation_errors_total", {"operation": "delete_file"})
+    try:
+        with record_s3("delete_file"):
+            raise ValueError("DOC_S3_ERROR")
+    except ValueError:
+        pass
+    after = _sample("projectboard_s3_operation_errors_total", {"operation": "delete_file"})
+    assert after == before + 1
+
+
+def test_render_latest_is_prometheus_text():
+    body, content_type = metrics.render_latest()
+    assert content_type.startswith("text/plain")
+    assert b"# TYPE projectboard_http_requests_in_flight gauge" in body
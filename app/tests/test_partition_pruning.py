@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateTable
+
+from app.core.config import settings
+from app.core.storage_local import LocalS3Client
+from app.db.models import Base, Document, DocumentVersion
+from app.db.models.base import compared_on
+from app.schemas import ProjectIn
+from app.services import document as doc_svc
+from app.services import project as project_svc
+from app.tools import check_partition_pruning as tool
+
+
+def test_service_statements_filter_on_the_partition_key(
+    db_session, user_factory, monkeypatch, tmp_path
+):
+    monkeypatch.setattr(doc_svc, "get_s3_client", lambda: LocalS3Client(tmp_path))
+    owner = user_factory("pruning")
+    proj = project_svc.create_project(db_session, owner, ProjectIn(name="P"))
+
+    captured = tool.statements(db_session, proj.id)
+    assert set(captured) == {
+        "list_documents",
+        "export_documents",
+        "sync_manifest_since",
+        "sync_manifest_known",
+        "delete_project",
+    }
+    for name, sent in captured.items():
+        assert sent, name
+        for sql, params in sent:
+            assert "documents.project_id = ?" in sql, (name, sql)
+            assert proj.id in params, (name, sql)
+
+
+def test_partitions_are_collected_from_nested_plans():
+    plan = [
+        {
+            "Plan": {
+                "Node Type": "Append",
+                "Plans": [
+                    {"Node Type": "Index Scan", "Relation Name": "documents_p03"},
+                    {"Node Type": "Seq Scan", "Relation Name": "documents_p11"},
+                    {"Node Type": "Seq Scan", "Relation Name": "projects"},
+                ],
+            }
+        }
+    ]
+    assert tool.partitions(plan) == {"documents_p03", "documents_p11"}
+
+
+def test_models_declare_the_constraints_of_each_dialect(engine, monkeypatch):
+    pg = postgresql.dialect()
+    documents = str(CreateTable(Document.__table__).compile(dialect=pg))
+    assert "documents_project_id_s3_key_key UNIQUE (project_id, s3_key)" in documents
+    assert "ck_documents_s3_key_in_project" in documents
+    assert "documents_s3_key_key" not in documents
+    versions = str(CreateTable(DocumentVersion.__table__).compile(dialect=pg))
+    assert "REFERENCES documents" not in versions  # the migration adds (document_id, project_id)
+
+    def include_object(obj, name, type_, reflected, compare_to):  # as in migrations/env.py
+        return reflected or compared_on(obj, "sqlite")
+
+    monkeypatch.setattr(settings, "SQL_REPEAT_RAISE", False)  # reflection repeats per table
+    with engine.connect() as conn:
+        documents = str(CreateTable(Document.__table__).compile(conn))
+        assert "documents_s3_key_key UNIQUE (s3_key)" in documents
+        assert "ck_documents_s3_key_in_project" not in documents
+        ctx = MigrationContext.configure(conn, opts={"include_object": include_object})
+        assert compare_metadata(ctx, Base.metadata) == []
@@ -0,0 +1,104 @@
+"""Differential tests: the local presigner must reproduce botocore's URLs byte for byte."""
+
+from __future__ import annotations
+
+import datetime as dt
+from unittest import mock
+
+import boto3
+import pytest
+from botocore.config import Config
+
+from app.core import presign, storage_s3
+from app.core.presign import S3Presigner
+
+NOW = dt.datetime(2026, 10, 19, 9, 30, 5, tzinfo=dt.timezone.utc)
+
+KEYS = [
+    "projects/1/report.pdf",
+    "projects/1/ab c+d~é/x?.txt",
+    "a//b",
+    "/leading-slash",
+    "trailing/",
+    "hash#percent%20plus+",
+    "!*'()=&$,;:@[]",
+    "emoji-😀-ünïcödé",
+    "./../dots",
+    "tab\tnewline\n",
+    "~tilde",
+]
+
+CLIENTS = {
+    "us-east-1": dict(region_name="us-east-1"),
+    "eu-session-token": dict(region_name="eu-central-1", aws_session_token="tok/en+=="),
+    "custom-endpoint": dict(region_name="us-west-2", endpoint_url="http://localhost:9000"),
+    "default-port": dict(region_name="us-west-2", endpoint_url="https://minio.example.com:443"),
+    "path-style": dict(region_name="ap-south-1", s3={"addressing_style": "path"}),
+}
+
+
+def _client(opts: dict):
+    opts = dict(opts)
+    config = Config(signature_version="s3v4", s3=opts.pop("s3", None))
+    return boto3.client(
+        "s3",
+        aws_access_key_id="AKIDEXAMPLE",
+        aws_secret_access_key="wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY",
+        config=config,
+        **opts,
+    )
+
+
+def _botocore_url(client, bucket: str, key: str, ttl: int) -> str:
+    with mock.patch("botocore.auth.get_current_datetime", return_value=NOW.replace(tzinfo=None)):
+        return client.generate_presigned_url(
+            "get_object", Params={"Bucket": bucket, "Key": key}, ExpiresIn=ttl
+        )
+
+
+@pytest.mark.parametrize("bucket", ["my-bucket", "my.dotted.bucket"])
+@pytest.mark.parametrize("setup", list(CLIENTS))
+def test_matches_botocore(setup, bucket):
+    client = _client(CLIENTS[setup])
+    signer = S3Presigner.from_client(client, bucket)
+    assert signer is not None
+    for key in KEYS:
+        for ttl in (1, 600, 3600):
+            assert signer.presign_get(key, ttl, now=NOW) == _botocore_url(client, bucket, key, ttl)
+
+
+def test_signing_key_is_derived_once_per_day():
+    signer = S3Presigner.from_client(_client(CLIENTS["us-east-1"]), "my-bucket")
+    presign.signing_key.cache_clear()
+    for i in range(50):
+        signer.presign_get(f"k{i}", 600, now=NOW + dt.timedelta(seconds=i))
+    signer.presign_get("k", 600, now=NOW + dt.timedelta(days=1))
+    info = presign.signing_key.cache_info()
+    assert (info.misses, info.hits) == (2, 49)
+
+
+def test_unsupported_client_falls_back():
+    assert S3Presigner.from_client(object(), "my-bucket") is None
+    no_creds = mock.Mock(**{"_get_credentials.return_value": None})
+    assert S3Presigner.from_client(no_creds, "my-bucket") is None
+
+
+def test_storage_uses_cached_presigner(monkeypatch):
+    client = _client(CLIENTS["us-east-1"])
+    calls = []
+
+    def get_client():
+        calls.append(1)
+        return client
+
+    monkeypatch.setattr(storage_s3, "get_s3_client", get_client)
+    monkeypatch.setattr(storage_s3, "_presigners", {})
+    monkeypatch.setattr(storage_s3.settings, "S3_BACKEND", "aws")
+
+    urls = storage_s3.presigned_download_urls(["a.txt", "b c.txt"], ttl=5000)
+    assert storage_s3.presigned_download_url(key="a.txt") != urls[0]  # other ttl
+    assert len(calls) == 1  # only to set the presigner up
+    assert all("X-Amz-Expires=3600&" in u for u in urls)
+    assert urls[1].startswith(
+        f"https://{storage_s3.settings.S3_BUCKET}.s3.amazonaws.com/b%20c.txt?"
+    )
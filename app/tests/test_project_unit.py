@@ -43,3 +43,23 @@ def test_invite_user_adds_participant(db_session, user_factory):
     links = db_session.query(ProjectAccess).filter_by(user_id=invited.id, project_id=p.id).all()
     assert len(links) == 1
     assert links[0].role == ProjectRole.participant
+
+
+def test_invite_users_reports_added_existing_and_unknown(db_session, user_factory):
+    owner = user_factory("bulk_own", "pw")
+    member = user_factory("bulk_mem", "pw")
+    fresh = [user_factory(f"bulk_{i}", "pw") for i in range(3)]
+    p = svc.create_project(db_session, owner, ProjectIn(name="Team"))
+    svc.invite_user(db_session, owner, p.id, member.login)
+
+    logins = [u.login for u in fresh] + [member.login, owner.login, "nobody_here"]
+    out = svc.invite_users(db_session, owner, p.id, logins + [f" {fresh[0].login.upper()} "])
+
+    assert out["added"] == [u.login for u in fresh]
+    assert out["already_member"] == [member.login, owner.login]
+    assert out["unknown"] == ["nobody_here"]
+    roles = dict(
+        db_session.query(ProjectAccess.user_id, ProjectAccess.role).filter_by(project_id=p.id)
+    )
+    assert roles[owner.id] == ProjectRole.owner
+    assert all(roles[u.id] == ProjectRole.participant for u in fresh)
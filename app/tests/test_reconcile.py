@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.storage_local import LocalS3Client
+from app.db.models import Document, Project
+from app.schemas import ProjectIn
+from app.services import project as project_svc
+from app.tools import reconcile as rec
+
+
+@pytest.fixture
+def s3(tmp_path):
+    return LocalS3Client(tmp_path)
+
+
+@pytest.fixture
+def factory(engine):
+    return sessionmaker(bind=engine, expire_on_commit=False)
+
+
+def _project_with_docs(db_session, s3, owner, docs: dict[str, int], total: int) -> Project:
+    proj = project_svc.create_project(db_session, owner, ProjectIn(name="R"))
+    for name, size in docs.items():
+        key = f"projects/{proj.id}/{name}"
+        db_session.add(Document(project_id=proj.id, filename=name, s3_key=key, size_bytes=size))
+    proj.total_size_bytes = total
+    db_session.commit()
+    return proj
+
+
+def test_reconcile_reports_drift_orphans_and_dangling_rows(db_session, user_factory, s3, factory):
+    owner = user_factory("recon")
+    clean = _project_with_docs(db_session, s3, owner, {"a": 3}, total=3)
+    messy = _project_with_docs(db_session, s3, owner, {"b": 4, "gone": 5, "c": 2}, total=100)
+    s3.put_object(Bucket=settings.S3_BUCKET, Key=f"projects/{clean.id}/a", Body=b"xxx")
+    s3.put_object(Bucket=settings.S3_BUCKET, Key=f"projects/{messy.id}/b", Body=b"xxxx")
+    s3.put_object(Bucket=settings.S3_BUCKET, Key=f"projects/{messy.id}/c", Body=b"xxx")
+    s3.put_object(Bucket=settings.S3_BUCKET, Key=f"projects/{messy.id}/stray", Body=b"x")
+
+    results = {
+        r["project_id"]: r
+        for r in rec.reconcile(factory, s3, workers=2, project_ids=[clean.id, messy.id])
+    }
+
+    assert not rec.has_problem(results[clean.id])
+    m = results[messy.id]
+    assert (m["recorded_total"], m["documents_total"], m["s3_total"]) == (100, 11, 8)
+    assert m["total_drift"] and m["expected_total"] == 8
+    assert m["orphaned_sample"] == [f"projects/{messy.id}/stray"]
+    assert m["dangling_rows"] == 1 and m["size_mismatches"] == 1
+
+
+def test_apply_fixes_skips_totals_that_moved(db_session, user_factory, factory):
+    owner = user_factory("recon_fix")
+    a = project_svc.create_project(db_session, owner, ProjectIn(name="A"))
+    b = project_svc.create_project(db_session, owner, ProjectIn(name="B"))
+
+    # b's total moved (a concurrent upload) after the sweep read it as 0
+    b.total_size_bytes = 7
+    db_session.commit()
+    fixed = rec.apply_fixes(factory, [(a.id, 0, 10), (b.id, 0, 20)])
+
+    assert fixed == 1
+    db_session.expire_all()
+    assert db_session.get(Project, a.id).total_size_bytes == 10
+    assert db_session.get(Project, b.id).total_size_bytes == 7
+
+
+def test_scan_deleted_finds_prefixes_without_projects(db_session, user_factory, s3, factory):
+    owner = user_factory("recon_del")
+    live = project_svc.create_project(db_session, owner, ProjectIn(name="L"))
+    s3.put_object(Bucket=settings.S3_BUCKET, Key=f"projects/{live.id}/x", Body=b"x")
+    s3.put_object(Bucket=settings.S3_BUCKET, Key="projects/999999/old", Body=b"xyz")
+
+    found = list(rec.scan_deleted_prefixes(factory, s3))
+
+    assert found == [
+        {"type": "orphaned_prefix", "prefix": "projects/999999/", "objects": 1, "bytes": 3}
+    ]
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import delete, select, update
+
+from app.core import storage_s3
+from app.core.config import settings
+from app.core.instrumentation import track_request
+from app.core.storage_local import LocalS3Client
+from app.db.models import Project, UploadSession
+from app.schemas import ProjectIn
+from app.services import document as doc_svc
+from app.services import project as project_svc
+
+CHUNK = 5 * 1024 * 1024
+
+
+@pytest.fixture
+def s3(tmp_path, monkeypatch):
+    client = LocalS3Client(tmp_path)
+    monkeypatch.setattr(storage_s3, "get_s3_client", lambda: client)
+    monkeypatch.setattr(settings, "UPLOAD_CHUNK_BYTES", CHUNK)
+    monkeypatch.setattr(settings, "PROJECT_SIZE_LIMIT_BYTES", 10 * CHUNK)
+    return client
+
+
+@pytest.fixture
+def project(db_session, user_factory):
+    owner = user_factory("resumable")
+    return owner, project_svc.create_project(db_session, owner, ProjectIn(name="P"))
+
+
+def _start(db, owner, proj, size):
+    return doc_svc.create_upload_session(
+        db,
+        user_id=owner.id,
+        project_id=proj.id,
+        filename="big file.pdf",
+        size_bytes=size,
+        content_type="application/pdf",
+    )
+
+
+def test_chunks_can_be_resent_and_complete_creates_document(db_session, project, s3):
+    owner, proj = project
+    data = bytes(range(256)) * (11 * 1024 * 1024 // 256)  # 11 MiB: chunks of 5, 5 and 1
+    sess = _start(db_session, owner, proj, len(data))
+    assert sess["missing_offsets"] == [0, CHUNK, 2 * CHUNK]
+
+    def put(off):
+        with track_request():  # each chunk is its own HTTP request
+            return doc_svc.put_upload_chunk(
+                db_session,
+                user_id=owner.id,
+                upload_id=sess["id"],
+                offset=off,
+                data=data[off : off + CHUNK],
+            )
+
+    put(2 * CHUNK)
+    put(0)
+    put(0)  # a retried chunk just replaces the stored part
+    progress = doc_svc.get_upload_progress(db_session, user_id=owner.id, upload_id=sess["id"])
+    assert progress["missing_offsets"] == [CHUNK]
+    assert progress["received_bytes"] == CHUNK + len(data) - 2 * CHUNK
+
+    with pytest.raises(ValueError, match="UPLOAD_INCOMPLETE"):
+        doc_svc.complete_upload(db_session, user_id=owner.id, upload_id=sess["id"])
+    with pytest.raises(ValueError, match="UPLOAD_BAD_OFFSET"):
+        put(CHUNK + 1)
+    with pytest.raises(ValueError, match="UPLOAD_BAD_CHUNK"):
+        doc_svc.put_upload_chunk(
+            db_session, user_id=owner.id, upload_id=sess["id"], offset=CHUNK, data=b"short"
+        )
+
+    assert put(CHUNK)["complete"]
+    doc = doc_svc.complete_upload(db_session, user_id=owner.id, upload_id=sess["id"])
+
+    body = s3.get_object(Bucket=settings.S3_BUCKET, Key=doc.s3_key)["Body"].read()
+    assert body == data
+    assert (doc.filename, doc.size_bytes) == ("big file.pdf", len(data))
+    total = db_session.scalar(select(Project.total_size_bytes).where(Project.id == proj.id))
+    assert total == len(data)
+    with pytest.raises(ValueError, match="UPLOAD_NOT_FOUND"):
+        doc_svc.get_upload_progress(db_session, user_id=owner.id, upload_id=sess["id"])
+
+
+def test_expired_sessions_are_rejected_and_cleaned_up(db_session, project, s3, user_factory):
+    owner, proj = project
+    sess = _start(db_session, owner, proj, 100)
+    with pytest.raises(ValueError, match="UPLOAD_NOT_FOUND"):
+        doc_svc.get_upload_progress(
+            db_session, user_id=user_factory("other").id, upload_id=sess["id"]
+        )
+    doc_svc.put_upload_chunk(
+        db_session, user_id=owner.id, upload_id=sess["id"], offset=0, data=b"x" * 100
+    )
+
+    db_session.execute(
+        update(UploadSession)
+        .where(UploadSession.id == sess["id"])
+        .values(expires_at=datetime.now(timezone.utc) - timedelta(seconds=1))
+    )
+    db_session.commit()
+    db_session.expire_all()
+    with pytest.raises(ValueError, match="UPLOAD_EXPIRED"):
+        doc_svc.complete_upload(db_session, user_id=owner.id, upload_id=sess["id"])
+
+    assert doc_svc.expire_upload_sessions(db_session) == 1
+    assert db_session.get(UploadSession, sess["id"]) is None
+    assert not any((s3.root / ".multipart").rglob("*.part"))
+
+
+def test_failed_commit_after_assembly_drops_the_session(db_session, project, s3, monkeypatch):
+    owner, proj = project
+    sess = _start(db_session, owner, proj, 100)
+    doc_svc.put_upload_chunk(
+        db_session, user_id=owner.id, upload_id=sess["id"], offset=0, data=b"x" * 100
+    )
+
+    commit = db_session.commit
+    calls = []
+
+    def failing_commit():
+        calls.append(1)
+        if len(calls) == 2:  # the first commit is the quota reservation
+            raise RuntimeError("connection lost")
+        commit()
+
+    monkeypatch.setattr(db_session, "commit", failing_commit)
+    with pytest.raises(ValueError, match="UPLOAD_LOST"):
+        doc_svc.complete_upload(db_session, user_id=owner.id, upload_id=sess["id"])
+    monkeypatch.setattr(db_session, "commit", commit)
+
+    # the multipart upload is gone, so a retry must not find a session to complete
+    with pytest.raises(ValueError, match="UPLOAD_NOT_FOUND"):
+        doc_svc.complete_upload(db_session, user_id=owner.id, upload_id=sess["id"])
+    assert s3.list_objects_v2(Bucket=settings.S3_BUCKET).get("KeyCount", 0) == 0
+    total = db_session.scalar(select(Project.total_size_bytes).where(Project.id == proj.id))
+    assert total == 0
+
+
+def test_quota_is_reserved_outside_the_transaction_that_assembles(
+    db_session, project, s3, monkeypatch
+):
+    owner, proj = project
+    sess = _start(db_session, owner, proj, 100)
+    doc_svc.put_upload_chunk(
+        db_session, user_id=owner.id, upload_id=sess["id"], offset=0, data=b"x" * 100
+    )
+
+    def total():
+        return db_session.scalar(select(Project.total_size_bytes).where(Project.id == proj.id))
+
+    complete = doc_svc.complete_multipart_upload
+    seen = []
+
+    def failing_complete(*args, **kwargs):
+        # the reservation is committed, so the project row is not locked during the S3 call
+        seen.append((db_session.in_transaction(), total()))
+        raise RuntimeError("S3 unavailable")
+
+    monkeypatch.setattr(doc_svc, "complete_multipart_upload", failing_complete)
+    with pytest.raises(RuntimeError):
+        doc_svc.complete_upload(db_session, user_id=owner.id, upload_id=sess["id"])
+    assert seen == [(False, 100)]
+    assert total() == 0  # released; the session stays so the client can retry
+
+    monkeypatch.setattr(doc_svc, "complete_multipart_upload", complete)
+    doc = doc_svc.complete_upload(db_session, user_id=owner.id, upload_id=sess["id"])
+    assert doc.etag and total() == 100
+
+
+def test_complete_that_loses_the_race_releases_its_reservation(
+    db_session, project, s3, monkeypatch
+):
+    owner, proj = project
+    sess = _start(db_session, owner, proj, 100)
+    doc_svc.put_upload_chunk(
+        db_session, user_id=owner.id, upload_id=sess["id"], offset=0, data=b"x" * 100
+    )
+    complete = doc_svc.complete_multipart_upload
+
+    def concurrent_complete(*args, **kwargs):
+        etag = complete(*args, **kwargs)
+        # another request claims the session in the meantime
+        db_session.execute(delete(UploadSession).where(UploadSession.id == sess["id"]))
+        db_session.commit()
+        return etag
+
+    monkeypatch.setattr(doc_svc, "complete_multipart_upload", concurrent_complete)
+    with pytest.raises(ValueError, match="UPLOAD_NOT_FOUND"):
+        doc_svc.complete_upload(db_session, user_id=owner.id, upload_id=sess["id"])
+    total = db_session.scalar(select(Project.total_size_bytes).where(Project.id == proj.id))
+    assert total == 0
+    assert s3.list_objects_v2(Bucket=settings.S3_BUCKET)["KeyCount"] == 1  # the winner's object
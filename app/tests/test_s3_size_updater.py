@@ -0,0 +1,197 @@
+"""Unit tests for the pure parts of the S3 size-updater Lambda (no database or AWS calls)."""
+
+from __future__ import annotations
+
+import json
+import os
+
+import pytest
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")  # boto3 clients are built at import
+
+from lambdas.s3_size_updater import handler  # noqa: E402
+
+
+def _rec(event: str, key: str, size: int | None = None, seq: str | None = None) -> dict:
+    obj = {"key": key, "sequencer": seq}
+    if size is not None:
+        obj["size"] = size
+    return {"eventName": event, "s3": {"object": obj}}
+
+
+def _fold(*records):
+    return handler._fold([handler._parse_record(r) for r in records])
+
+
+def test_sequencer_pads_so_string_order_is_event_order():
+    short, long = handler._sequencer("ff"), handler._sequencer("0100")
+    assert len(short) == len(long) == handler._SEQUENCER_WIDTH
+    assert short.endswith("FF") and short < long
+    assert handler._sequencer("00A") == handler._sequencer("a")
+    assert handler._sequencer(None) is None and handler._sequencer("") is None
+    assert handler._sequencer("1" * (handler._SEQUENCER_WIDTH + 1)) is None
+
+
+def test_fold_keeps_latest_record_per_key():
+    latest, stats = _fold(
+        _rec("ObjectCreated:Put", "projects/1/a", 5, seq="0B"),
+        _rec("ObjectCreated:Put", "projects/1/a", 9, seq="0A"),  # older, delivered late
+        _rec("ObjectCreated:Put", "projects/1/b", 1),
+        _rec("ObjectCreated:Put", "projects/1/b", 2),  # no sequencer: batch position wins
+    )
+    assert latest["projects/1/a"]["size"] == 5
+    assert latest["projects/1/b"]["size"] == 2
+    assert stats["created_events"] == 4 and stats["duplicates"] == 0
+
+
+def test_fold_counts_redelivered_records_once():
+    put = _rec("ObjectCreated:Put", "projects/1/a", 5, seq="0A")
+    latest, stats = _fold(put, put, put)
+    assert list(latest) == ["projects/1/a"]
+    assert stats["duplicates"] == 2
+
+
+def test_fold_create_then_remove_in_one_batch_is_a_removal():
+    latest, stats = _fold(
+        _rec("ObjectRemoved:Delete", "projects/2/x%20y", seq="02"),
+        _rec("ObjectCreated:Put", "projects/2/x%20y", 7, seq="01"),
+    )
+    created, removed = handler._split(latest)
+    assert created == {} and removed == {"projects/2/x y": 2}
+    assert (stats["created_events"], stats["removed_events"]) == (1, 1)
+
+
+def test_fold_skips_foreign_keys_renditions_and_other_events():
+    latest, stats = _fold(
+        _rec("ObjectCreated:Put", "uploads/a", 1),
+        _rec("ObjectCreated:Put", "projects/1/a.png@thumb.jpg", 1),
+        _rec("ObjectRestore:Completed", "projects/1/a", 1),
+    )
+    assert latest == {} and stats["skipped"] == 3
+
+
+S3_BODY = {"Records": [_rec("ObjectCreated:Put", "projects/1/a", 1)]}
+
+
+@pytest.mark.parametrize(
+    "body, expected",
+    [
+        (S3_BODY, S3_BODY["Records"]),
+        ({"Type": "Notification", "Message": json.dumps(S3_BODY)}, S3_BODY["Records"]),
+        ({"Service": "Amazon S3", "Event": "s3:TestEvent", "Bucket": "b"}, []),
+    ],
+    ids=["direct", "sns", "test-event"],
+)
+def test_s3_records_unwraps_message_bodies(body, expected):
+    assert handler._s3_records(json.dumps(body)) == expected
+
+
+def _message(message_id: str, key: str) -> dict:
+    body = {"Records": [_rec("ObjectCreated:Put", key, 1)]}
+    return {"messageId": message_id, "eventSource": "aws:sqs", "body": json.dumps(body)}
+
+
+def test_handle_sqs_reports_only_failed_messages(monkeypatch):
+    calls = []
+
+    def process(records):
+        calls.append(len(records))
+        if any("poison" in r["s3"]["object"]["key"] for r in records):
+            raise RuntimeError("boom")
+        return {"ok": True, "created_events": len(records)}
+
+    monkeypatch.setattr(handler, "_process_records", process)
+    messages = [
+        _message("m1", "projects/1/a"),
+        _message("m2", "projects/1/poison"),
+        _message("m3", "projects/1/c"),
+        {"messageId": "m4", "body": "not json"},
+    ]
+
+    out = handler._handle_sqs(messages)
+    assert calls == [3, 1, 1, 1]  # whole batch once, then message by message
+    assert out["batchItemFailures"] == [{"itemIdentifier": "m4"}, {"itemIdentifier": "m2"}]
+    assert (out["messages"], out["failed_messages"], out["created_events"]) == (4, 2, 2)
+
+
+def test_handle_sqs_applies_a_healthy_batch_once(monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        handler, "_process_records", lambda records: calls.append(records) or {"ok": True}
+    )
+    out = handler._handle_sqs([_message("m1", "projects/1/a"), _message("m2", "projects/1/b")])
+    assert len(calls) == 1 and len(calls[0]) == 2
+    assert out["batchItemFailures"] == [] and out["failed_messages"] == 0
+
+
+class _Cursor:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _Conn:
+    def cursor(self):
+        return _Cursor()
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.mark.parametrize("retry, attempts", [(True, 2), (False, 1)])
+def test_run_retries_a_dropped_reused_connection_only_when_allowed(monkeypatch, retry, attempts):
+    conns = iter([(_Conn(), True), (_Conn(), False)])
+    monkeypatch.setattr(handler, "_get_conn", lambda: next(conns))
+    calls = []
+
+    def work(conn):
+        calls.append(conn)
+        if len(calls) == 1:
+            raise handler.pg8000.InterfaceError("connection closed")
+        return "done"
+
+    if retry:
+        assert handler._run(work) == ("done", False)
+    else:
+        with pytest.raises(handler.pg8000.InterfaceError):
+            handler._run(work, retry=False)
+    assert len(calls) == attempts
+
+
+def test_apply_batch_counts_only_keys_the_api_does_not_track(monkeypatch):
+    latest, _ = _fold(
+        _rec("ObjectCreated:Put", "projects/1/doc", 5),  # has a documents row
+        _rec("ObjectCreated:Put", "projects/2/stray", 7),
+        _rec("ObjectRemoved:Delete", "projects/1/gone"),  # never counted: no ledger row
+        _rec("ObjectRemoved:Delete", "projects/3/old-stray"),
+    )
+    calls = {}
+    monkeypatch.setattr(handler, "_claim_sequencers", lambda cur, records: (records, 0, 0))
+    monkeypatch.setattr(handler, "_managed", lambda cur, keys: {"projects/1/doc"} & set(keys))
+
+    def record_created(cur, created):
+        calls["created"] = created
+        return [(pid, size) for pid, size in created.values()]
+
+    monkeypatch.setattr(handler, "_record_created", record_created)
+    monkeypatch.setattr(handler, "_record_removed", lambda cur, removed: [(3, 4)])
+    monkeypatch.setattr(
+        handler, "_apply_deltas", lambda cur, deltas: calls.setdefault("deltas", dict(deltas))
+    )
+    monkeypatch.setattr(
+        handler, "_mark_dirty", lambda cur, pids: len(calls.setdefault("dirty", pids))
+    )
+
+    out = handler._apply_batch(_Conn(), latest)
+    assert calls["created"] == {"projects/2/stray": (2, 7)}
+    assert calls["deltas"] == {2: 7, 3: -4}
+    assert calls["dirty"] == {2}  # the API may still commit a row for the counted key
+    assert (out["managed_skipped"], out["removed_untracked"]) == (1, 1)
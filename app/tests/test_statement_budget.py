@@ -0,0 +1,140 @@
+"""Upper bounds on the number of SQL statements each write path may issue.
+
+A failing test here means an endpoint picked up an extra round trip
+(a refresh, a lazy load after commit, a redundant lookup, ...).
+"""
+
+from __future__ import annotations
+
+import io
+from uuid import uuid4
+
+import pytest
+from fastapi import UploadFile
+from sqlalchemy import func, insert, select
+from starlette.datastructures import Headers
+
+from app.db.models import Document, DocumentVersion, User
+from app.schemas import ProjectIn, ProjectUpdate
+from app.services import document as doc_svc
+from app.services import project as project_svc
+
+
+def _upload(name: str = "a.txt", data: bytes = b"hello", ctype: str = "text/plain"):
+    return UploadFile(
+        file=io.BytesIO(data), filename=name, headers=Headers({"content-type": ctype})
+    )
+
+
+@pytest.fixture
+def fake_s3(monkeypatch):
+    monkeypatch.setattr(doc_svc, "put_file", lambda *a, **kw: None)
+    monkeypatch.setattr(doc_svc, "delete_file", lambda *a, **kw: None)
+
+
+def test_create_project_budget(db_session, user_factory, statement_counter):
+    owner = user_factory("budget_cp")
+    with statement_counter() as stmts:
+        proj = project_svc.create_project(db_session, owner, ProjectIn(name="P"))
+        out = (proj.id, proj.created_at, proj.updated_at, proj.total_size_bytes)
+    # INSERT projects ... RETURNING, INSERT project_access
+    assert len(stmts) <= 2, stmts
+    assert all(v is not None for v in out)
+
+
+def test_update_project_budget(db_session, user_factory, statement_counter):
+    owner = user_factory("budget_up")
+    proj = project_svc.create_project(db_session, owner, ProjectIn(name="P"))
+    with statement_counter() as stmts:
+        upd = project_svc.update_project(
+            db_session, owner, proj.id, ProjectUpdate(description="new")
+        )
+        assert upd.updated_at is not None
+    # membership check, UPDATE ... RETURNING updated_at
+    assert len(stmts) <= 2, stmts
+
+
+def test_upload_document_budget(db_session, user_factory, statement_counter, fake_s3):
+    owner = user_factory("budget_ul")
+    proj = project_svc.create_project(db_session, owner, ProjectIn(name="P"))
+    with statement_counter() as stmts:
+        doc = doc_svc.upload_document(
+            db_session, user_id=owner.id, project_id=proj.id, file=_upload()
+        )
+        assert doc.id is not None and doc.uploaded_at is not None
+    # project lookup, UPDATE projects ... RETURNING, INSERT documents ... RETURNING,
+    # INSERT project_changes
+    assert len(stmts) <= 4, stmts
+
+
+def test_replace_document_budget(db_session, user_factory, statement_counter, fake_s3):
+    owner = user_factory("budget_rp")
+    proj = project_svc.create_project(db_session, owner, ProjectIn(name="P"))
+    doc = doc_svc.upload_document(db_session, user_id=owner.id, project_id=proj.id, file=_upload())
+    db_session.expunge_all()
+    with statement_counter() as stmts:
+        out = doc_svc.replace_document(
+            db_session, user_id=owner.id, doc_id=doc.id, file=_upload("b.txt", b"hello world")
+        )
+        assert out.size_bytes == len(b"hello world")
+    # document, project, UPDATE projects ... RETURNING, INSERT document_versions,
+    # UPDATE documents, INSERT project_changes
+    assert len(stmts) <= 6, stmts
+
+
+def test_delete_document_budget(db_session, user_factory, statement_counter, fake_s3):
+    owner = user_factory("budget_dl")
+    proj = project_svc.create_project(db_session, owner, ProjectIn(name="P"))
+    doc = doc_svc.upload_document(db_session, user_id=owner.id, project_id=proj.id, file=_upload())
+    db_session.expunge_all()
+    with statement_counter() as stmts:
+        doc_svc.delete_document_by_id(db_session, user_id=owner.id, doc_id=doc.id)
+    # document, project, UPDATE projects ... RETURNING, INSERT project_changes, DELETE documents
+    assert len(stmts) <= 5, stmts
+
+
+def test_invite_users_budget(db_session, user_factory, statement_counter):
+    owner = user_factory("budget_inv")
+    logins = [f"budget_inv_{uuid4().hex[:8]}" for _ in range(25)]
+    db_session.execute(insert(User), [{"login": login, "password_hash": "x"} for login in logins])
+    db_session.commit()
+    proj = project_svc.create_project(db_session, owner, ProjectIn(name="P"))
+    db_session.expunge_all()
+    with statement_counter() as stmts:
+        out = project_svc.invite_users(db_session, owner, proj.id, logins + ["ghost"])
+        assert len(out["added"]) == 25 and out["unknown"] == ["ghost"]
+    # project, users WHERE login IN (...), INSERT ... ON CONFLICT DO NOTHING RETURNING,
+    # UPDATE projects ... RETURNING, INSERT project_changes
+    assert len(stmts) <= 5, stmts
+
+
+def test_upload_documents_budget(db_session, user_factory, statement_counter, fake_s3):
+    owner = user_factory("budget_bu")
+    proj = project_svc.create_project(db_session, owner, ProjectIn(name="P"))
+    db_session.expunge_all()
+    files = [_upload(f"f{i}.txt") for i in range(30)]
+    with statement_counter() as stmts:
+        out = doc_svc.upload_documents(
+            db_session, user_id=owner.id, project_id=proj.id, files=files
+        )
+        assert out["uploaded"] == 30
+    # project, UPDATE projects (reserve), UPDATE projects (settle, sync version),
+    # one multi-row INSERT documents ... RETURNING, INSERT project_changes
+    assert len(stmts) <= 5, stmts
+
+
+def test_delete_project_budget(db_session, user_factory, statement_counter, fake_s3):
+    owner = user_factory("budget_dp")
+    proj = project_svc.create_project(db_session, owner, ProjectIn(name="P"))
+    files = [_upload(f"{i}.txt") for i in range(15)]
+    out = doc_svc.upload_documents(db_session, user_id=owner.id, project_id=proj.id, files=files)
+    doc = out["items"][0]["document"]
+    doc_svc.replace_document(db_session, user_id=owner.id, doc_id=doc.id, file=_upload())
+    db_session.expunge_all()
+    with statement_counter() as stmts:
+        project_svc.delete_project(db_session, owner, proj.id)
+    # project, DELETE document_versions / documents by project_id, project_access (load,
+    # delete), DELETE projects; documents are never loaded one by one
+    assert len(stmts) <= 6, stmts
+    assert db_session.scalar(select(func.count()).where(Document.project_id == proj.id)) == 0
+    assert db_session.scalar(select(func.count()).where(DocumentVersion.document_id == doc.id)) == 0
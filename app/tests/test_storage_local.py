@@ -0,0 +1,87 @@
+import io
+
+import pytest
+from botocore.exceptions import ClientError
+
+from app.core.storage_local import LocalS3Client
+
+
+@pytest.fixture
+def s3(tmp_path):
+    return LocalS3Client(tmp_path)
+
+
+def test_put_get_head_delete_roundtrip(s3):
+    etag = s3.put_object(Bucket="b", Key="projects/1/a.txt", Body=b"hello")["ETag"]
+    assert etag == '"5d41402abc4b2a76b9719d911017c592"'
+
+    body = s3.get_object(Bucket="b", Key="projects/1/a.txt")["Body"].read()
+    assert body == b"hello"
+    assert s3.head_object(Bucket="b", Key="projects/1/a.txt")["ContentLength"] == 5
+
+    s3.delete_object(Bucket="b", Key="projects/1/a.txt")
+    with pytest.raises(ClientError) as e:
+        s3.get_object(Bucket="b", Key="projects/1/a.txt")
+    assert e.value.response["Error"]["Code"] == "NoSuchKey"
+
+
+def test_list_objects_v2_paginates_in_key_order(s3):
+    for i in range(5):
+        s3.upload_fileobj(io.BytesIO(b"x" * i), "b", f"projects/2/{i}.bin")
+    s3.upload_fileobj(io.BytesIO(b"other"), "b", "projects/20/other.bin")
+
+    keys, sizes, token = [], 0, None
+    while True:
+        kwargs = {"Bucket": "b", "Prefix": "projects/2/", "MaxKeys": 2}
+        if token:
+            kwargs["ContinuationToken"] = token
+        resp = LocalS3Client(s3.root).list_objects_v2(**kwargs)
+        keys += [o["Key"] for o in resp["Contents"]]
+        sizes += sum(o["Size"] for o in resp["Contents"])
+        token = resp.get("NextContinuationToken")
+        if not token:
+            break
+
+    assert keys == [f"projects/2/{i}.bin" for i in range(5)]
+    assert sizes == 0 + 1 + 2 + 3 + 4
+
+
+def test_keys_cannot_escape_the_bucket(s3):
+    with pytest.raises(ClientError):
+        s3.put_object(Bucket="b", Key="../../etc/passwd", Body=b"x")
+
+
+def test_list_objects_v2_rolls_up_common_prefixes(s3):
+    for key in ["projects/1/a", "projects/1/b", "projects/3/c", "projects/top.txt"]:
+        s3.put_object(Bucket="b", Key=key, Body=b"x")
+
+    resp = s3.list_objects_v2(Bucket="b", Prefix="projects/", Delimiter="/")
+
+    assert [p["Prefix"] for p in resp["CommonPrefixes"]] == ["projects/1/", "projects/3/"]
+    assert [o["Key"] for o in resp["Contents"]] == ["projects/top.txt"]
+
+
+def test_multipart_upload_checks_parts_and_assembles_in_order(s3):
+    big = b"a" * (5 * 1024 * 1024)
+    uid = s3.create_multipart_upload(Bucket="b", Key="projects/3/big.bin")["UploadId"]
+    e2 = s3.upload_part(Bucket="b", Key="projects/3/big.bin", UploadId=uid, PartNumber=2, Body=b"z")
+    e1 = s3.upload_part(Bucket="b", Key="projects/3/big.bin", UploadId=uid, PartNumber=1, Body=big)
+    parts = [{"PartNumber": 1, "ETag": e1["ETag"]}, {"PartNumber": 2, "ETag": e2["ETag"]}]
+
+    with pytest.raises(ClientError) as e:
+        s3.complete_multipart_upload(
+            Bucket="b",
+            Key="projects/3/big.bin",
+            UploadId=uid,
+            MultipartUpload={"Parts": parts[::-1]},
+        )
+    assert e.value.response["Error"]["Code"] == "InvalidPartOrder"
+
+    resp = s3.complete_multipart_upload(
+        Bucket="b", Key="projects/3/big.bin", UploadId=uid, MultipartUpload={"Parts": parts}
+    )
+    assert resp["ETag"].endswith('-2"')
+    assert s3.head_object(Bucket="b", Key="projects/3/big.bin")["ContentLength"] == len(big) + 1
+    with pytest.raises(ClientError) as e:
+        s3.abort_multipart_upload(Bucket="b", Key="projects/3/big.bin", UploadId=uid)
+    assert e.value.response["Error"]["Code"] == "NoSuchUpload"
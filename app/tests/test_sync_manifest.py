@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import hashlib
+import io
+
+import pytest
+from fastapi import UploadFile
+from sqlalchemy import update
+from sqlalchemy.orm import sessionmaker
+from starlette.datastructures import Headers
+
+from app.core import storage_s3
+from app.core.storage_local import LocalS3Client
+from app.db.models import Document
+from app.schemas import ProjectIn
+from app.services import document as doc_svc
+from app.services import project as project_svc
+
+
+def _upload(data: bytes, name: str = "a.txt"):
+    return UploadFile(
+        file=io.BytesIO(data), filename=name, headers=Headers({"content-type": "text/plain"})
+    )
+
+
+def _sha(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+@pytest.fixture
+def s3(tmp_path, monkeypatch):
+    client = LocalS3Client(tmp_path)
+    monkeypatch.setattr(storage_s3, "get_s3_client", lambda: client)
+    monkeypatch.setattr(doc_svc, "get_s3_client", lambda: client)
+    return client
+
+
+@pytest.fixture
+def project(db_session, user_factory, s3):
+    owner = user_factory("sync")
+    proj = project_svc.create_project(db_session, owner, ProjectIn(name="P"))
+    a = doc_svc.upload_document(
+        db_session, user_id=owner.id, project_id=proj.id, file=_upload(b"aaa", "a.txt")
+    )
+    b = doc_svc.upload_document(
+        db_session, user_id=owner.id, project_id=proj.id, file=_upload(b"bbb", "b.txt")
+    )
+    return owner, proj, a, b
+
+
+def _ids(docs):
+    return [d.id for d in docs]
+
+
+def test_upload_records_checksum_type_and_etag(project):
+    owner, proj, a, b = project
+    assert a.sha256 == _sha(b"aaa")
+    assert a.content_type == "text/plain"
+    assert a.etag == f'"{hashlib.md5(b"aaa").hexdigest()}"'
+
+
+def test_known_set_diff(db_session, project):
+    owner, proj, a, b = project
+    b = doc_svc.replace_document(
+        db_session, user_id=owner.id, doc_id=b.id, file=_upload(b"b2", "b.txt")
+    )
+    c = doc_svc.upload_document(
+        db_session, user_id=owner.id, project_id=proj.id, file=_upload(b"ccc", "c.txt")
+    )
+
+    out = doc_svc.sync_manifest(
+        db_session,
+        user_id=owner.id,
+        project_id=proj.id,
+        known={a.id: _sha(b"aaa"), b.id: _sha(b"bbb"), 999_999: _sha(b"gone")},
+    )
+
+    assert _ids(out["added"]) == [c.id]
+    assert _ids(out["changed"]) == [b.id]
+    assert out["deleted"] == [999_999]
+
+
+def test_since_version_reports_adds_changes_and_deletes(db_session, project, user_factory):
+    owner, proj, a, b = project
+    first = doc_svc.sync_manifest(db_session, user_id=owner.id, project_id=proj.id)
+    assert sorted(_ids(first["added"])) == sorted([a.id, b.id])
+    since = first["version"]
+
+    other = project_svc.create_project(db_session, owner, ProjectIn(name="Other"))
+    c = doc_svc.upload_document(
+        db_session, user_id=owner.id, project_id=other.id, file=_upload(b"ccc", "c.txt")
+    )
+    doc_svc.replace_document(db_session, user_id=owner.id, doc_id=a.id, file=_upload(b"a2"))
+    doc_svc.delete_document_by_id(db_session, user_id=owner.id, doc_id=b.id)
+    doc_svc.move_documents(db_session, user_id=owner.id, target_project_id=proj.id, doc_ids=[c.id])
+
+    out = doc_svc.sync_manifest(db_session, user_id=owner.id, project_id=proj.id, since=since)
+
+    assert _ids(out["added"]) == [c.id]
+    assert _ids(out["changed"]) == [a.id]
+    assert out["deleted"] == [b.id]
+    assert out["version"] > since
+    left = doc_svc.sync_manifest(db_session, user_id=owner.id, project_id=other.id, since=0)
+    assert left["deleted"] == [c.id] and left["added"] == []
+
+    again = doc_svc.sync_manifest(
+        db_session, user_id=owner.id, project_id=proj.id, since=out["version"]
+    )
+    assert again["added"] == again["changed"] == again["deleted"] == []
+    with pytest.raises(ValueError, match="SYNC_BAD_VERSION"):
+        doc_svc.sync_manifest(
+            db_session, user_id=owner.id, project_id=proj.id, since=out["version"] + 1
+        )
+
+
+def test_backfill_fills_missing_checksums(db_session, project, s3, engine):
+    owner, proj, a, b = project
+    db_session.execute(update(Document).where(Document.project_id == proj.id).values(sha256=None))
+    db_session.commit()
+    known = {a.id: _sha(b"aaa"), b.id: _sha(b"bbb")}
+    out = doc_svc.sync_manifest(db_session, user_id=owner.id, project_id=proj.id, known=known)
+    assert sorted(_ids(out["changed"])) == sorted([a.id, b.id])  # unknown checksums count
+    since = out["version"]
+
+    start = min(a.id, b.id) - 1  # the shared test database holds other unhashed rows
+    last_id, filled = doc_svc.backfill_checksums(db_session, after_id=start, client=s3)
+    assert filled == 2 and last_id == max(a.id, b.id)
+    assert doc_svc.backfill_checksums(db_session, after_id=last_id, client=s3) == (0, 0)
+    out = doc_svc.sync_manifest(db_session, user_id=owner.id, project_id=proj.id, known=known)
+    assert out["changed"] == []
+    # a client syncing by version is told the checksums too
+    db_session.expire_all()  # the backfill's bulk UPDATE bypassed this session's identity map
+    out = doc_svc.sync_manifest(db_session, user_id=owner.id, project_id=proj.id, since=since)
+    assert sorted((d.id, d.sha256) for d in out["changed"]) == sorted(known.items())
+
+    # the background job leaves a document alone once it points at another object
+    factory = sessionmaker(bind=engine, expire_on_commit=False)
+    assert not doc_svc.fill_checksum(a.id, "projects/x/old.txt", session_factory=factory)
+    since = out["version"]
+    assert doc_svc.fill_checksum(a.id, a.s3_key, session_factory=factory, client=s3)
+    db_session.expire_all()
+    out = doc_svc.sync_manifest(db_session, user_id=owner.id, project_id=proj.id, since=since)
+    assert _ids(out["changed"]) == [a.id]
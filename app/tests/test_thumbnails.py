@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import io
+
+import pytest
+from fastapi import BackgroundTasks, UploadFile
+from PIL import Image
+from sqlalchemy.orm import sessionmaker
+from starlette.datastructures import Headers
+
+from app.core.config import settings
+from app.core.images import render_renditions
+from app.core.storage_local import LocalS3Client
+from app.db.models import Document
+from app.schemas import ProjectIn
+from app.schemas.document import DocumentOut
+from app.services import document as doc_svc
+from app.services import project as project_svc
+from app.services import thumbnails as thumb_svc
+
+
+def _png(size=(2000, 1000), color=(200, 10, 10, 0)) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGBA", size, color).save(buf, "PNG")
+    return buf.getvalue()
+
+
+@pytest.fixture
+def s3(tmp_path, monkeypatch):
+    client = LocalS3Client(tmp_path)
+    monkeypatch.setattr(thumb_svc, "get_s3_client", lambda: client)
+    monkeypatch.setattr(doc_svc, "put_file", lambda *a, **kw: None)
+    monkeypatch.setattr(doc_svc, "delete_file", lambda *a, **kw: None)
+    return client
+
+
+@pytest.fixture
+def factory(engine):
+    return sessionmaker(bind=engine, expire_on_commit=False)
+
+
+def test_render_renditions_fit_their_boxes_and_drop_alpha():
+    out = render_renditions(_png(), {"thumb": 256, "preview": 1280})
+
+    thumb = Image.open(io.BytesIO(out["thumb"]))
+    preview = Image.open(io.BytesIO(out["preview"]))
+    assert (thumb.format, thumb.mode, thumb.size) == ("JPEG", "RGB", (256, 128))
+    assert preview.size == (1280, 640)
+    # fully transparent pixels become white, not black
+    assert min(thumb.getpixel((10, 10))) > 240
+
+
+def test_upload_schedules_and_job_records_renditions(
+    db_session, user_factory, s3, factory, monkeypatch
+):
+    monkeypatch.setattr(settings, "THUMBNAIL_WORKERS", 1)  # exercise the process pool
+    owner = user_factory("thumbs")
+    proj = project_svc.create_project(db_session, owner, ProjectIn(name="P"))
+    data = _png()
+    background = BackgroundTasks()
+    doc = doc_svc.upload_document(
+        db_session,
+        user_id=owner.id,
+        project_id=proj.id,
+        file=UploadFile(
+            file=io.BytesIO(data),
+            filename="pic.png",
+            headers=Headers({"content-type": "image/png"}),
+        ),
+        background=background,
+    )
+    [task] = background.tasks
+    assert (task.func, task.args) == (thumb_svc.generate_thumbnails, (doc.id, doc.s3_key))
+    s3.put_object(Bucket=settings.S3_BUCKET, Key=doc.s3_key, Body=data)
+
+    try:
+        assert thumb_svc.generate_thumbnails(doc.id, doc.s3_key, session_factory=factory)
+    finally:
+        thumb_svc.shutdown_pool()
+
+    db_session.expire_all()
+    doc = db_session.get(Document, doc.id)
+    assert doc.thumbnail_key == f"{doc.s3_key}@thumb.jpg"
+    assert thumb_svc.is_rendition_key(doc.preview_key)
+    assert s3.head_object(Bucket=settings.S3_BUCKET, Key=doc.thumbnail_key)["ContentLength"] > 0
+    out = DocumentOut.model_validate(doc).model_dump()
+    assert out["thumbnail_url"] == f"/document/{doc.id}/thumbnail"
+    assert "thumbnail_key" not in out
+
+
+def test_job_for_a_replaced_document_cleans_up(db_session, user_factory, s3, factory):
+    owner = user_factory("thumbs_stale")
+    proj = project_svc.create_project(db_session, owner, ProjectIn(name="P"))
+    doc = Document(project_id=proj.id, filename="a.png", s3_key="projects/x/new.png", size_bytes=1)
+    db_session.add(doc)
+    db_session.commit()
+    s3.put_object(Bucket=settings.S3_BUCKET, Key="projects/x/old.png", Body=_png((50, 50)))
+
+    assert not thumb_svc.generate_thumbnails(doc.id, "projects/x/old.png", session_factory=factory)
+
+    listed = s3.list_objects_v2(Bucket=settings.S3_BUCKET, Prefix="projects/x/")["Contents"]
+    assert [o["Key"] for o in listed] == ["projects/x/old.png"]
@@ -0,0 +1,79 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from sqlalchemy import event
+
+from app.core import tracing
+from app.schemas import ProjectIn
+from app.services import project as project_svc
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+
+
+@pytest.fixture
+def spans(monkeypatch):
+    """Spans of this test only: a local provider, not the process-global one."""
+    exporter = InMemorySpanExporter()
+    provider = tracing.build_provider(SimpleSpanProcessor(exporter))
+    monkeypatch.setattr(tracing, "tracer", provider.get_tracer("projectboard"))
+    yield exporter
+    provider.shutdown()
+
+
+def test_root_span_continues_incoming_traceparent(spans):
+    app = FastAPI()
+    tracing.register_tracing(app)
+
+    @tracing.traced(name="svc.work")
+    def work():
+        return 1
+
+    @app.get("/things/{thing_id}")
+    def read_thing(thing_id: int):
+        work()
+        return {"id": thing_id}
+
+    resp = TestClient(app).get(
+        "/things/3", headers={"traceparent": f"00-{TRACE_ID}-00f067aa0ba902b7-01"}
+    )
+
+    assert resp.status_code == 200
+    assert resp.headers["traceparent"].split("-")[1] == TRACE_ID
+    by_name = {s.name: s for s in spans.get_finished_spans()}
+    root = by_name["GET /things/{thing_id}"]
+    assert format(root.context.trace_id, "032x") == TRACE_ID
+    assert by_name["svc.work"].parent.span_id == root.context.span_id
+
+
+def test_sql_statements_are_children_of_service_spans(spans, engine, db_session, user_factory):
+    owner = user_factory("traced")
+    tracing.install_sql_tracing(engine)
+    try:
+        project_svc.create_project(db_session, owner, ProjectIn(name="T"))
+    finally:
+        event.remove(engine, "before_cursor_execute", tracing._sql_before)
+        event.remove(engine, "after_cursor_execute", tracing._sql_after)
+        event.remove(engine, "handle_error", tracing._sql_error)
+
+    finished = spans.get_finished_spans()
+    svc_span = next(s for s in finished if s.name == "project.create_project")
+    queries = [s for s in finished if s.name == "db.query"]
+    assert len(queries) == 2
+    assert all(q.parent.span_id == svc_span.context.span_id for q in queries)
+    assert queries[0].attributes["db.statement"].startswith("INSERT INTO projects")
+
+
+def test_file_exporter_is_closed_on_provider_shutdown(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracing.settings, "TRACING_EXPORTER", "file")
+    monkeypatch.setattr(tracing.settings, "TRACING_FILE", str(tmp_path / "spans.jsonl"))
+    exporter = tracing._build_exporter()
+    provider = TracerProvider(shutdown_on_exit=False)
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    provider.get_tracer("t").start_span("one").end()
+    provider.shutdown()
+
+    assert exporter.out.closed
+    assert '"name": "one"' in (tmp_path / "spans.jsonl").read_text()
@@ -0,0 +1,43 @@
+"""Compute the SHA-256 of documents stored before checksums were recorded.
+
+Uploads record ``documents.sha256`` themselves (resumable uploads shortly after completing);
+run this once after upgrading so the sync manifest can tell unchanged documents apart.
+Objects that cannot be read keep a NULL checksum and are reported as changed to clients.
+
+    python -m app.tools.backfill_checksums --batch 100
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+
+from app.core.storage_s3 import get_s3_client
+from app.services.document import backfill_checksums
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    p.add_argument("--batch", type=int, default=100, help="documents hashed per transaction")
+    return p.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    from app.db.session import SessionLocal
+
+    client = get_s3_client()
+    last_id, filled = 0, 0
+    while True:
+        with SessionLocal() as db:
+            last_id, n = backfill_checksums(db, after_id=last_id, batch=args.batch, client=client)
+        filled += n
+        if not last_id:
+            break
+    print(json.dumps({"type": "summary", "filled": filled}), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
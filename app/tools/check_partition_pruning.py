@@ -0,0 +1,113 @@
+"""Check that the per-project document queries touch a single partition (PostgreSQL).
+
+Calls the listing, export, sync manifest and project deletion services for one project,
+captures the SQL they send, and reports which ``documents_pNN`` partitions the plan of each
+statement reads. Everything runs in one transaction that is rolled back, so the project
+and its documents are left as they were.
+
+    python -m app.tools.check_partition_pruning --project-id 42
+
+Exits with 1 if a statement reads more than one partition.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.db.models import Project, User
+from app.services import document as doc_svc
+from app.services import project as project_svc
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    p.add_argument("--project-id", type=int, required=True)
+    return p.parse_args(argv)
+
+
+@contextmanager
+def _capture(db: Session):
+    sent: list[tuple[str, object]] = []
+
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        sent.append((statement, parameters))
+
+    bind = db.get_bind()
+    event.listen(bind, "before_cursor_execute", _before)
+    try:
+        yield sent
+    finally:
+        event.remove(bind, "before_cursor_execute", _before)
+
+
+def statements(db: Session, project_id: int) -> dict[str, list[tuple[str, object]]]:
+    """``{service call: [(sql, parameters), ...]}`` for the statements that touch ``documents``.
+
+    The calls run as the project's owner and commit; ``delete_project`` deletes the project.
+    """
+    proj = db.get(Project, project_id)
+    if proj is None:
+        raise ValueError("NOT_FOUND")
+    owner = db.get(User, proj.owner_id)
+    scope = {"user_id": owner.id, "project_id": project_id}
+    calls = {
+        "list_documents": lambda: doc_svc.list_documents(db, **scope),
+        "export_documents": lambda: doc_svc.export_documents(db, **scope),
+        "sync_manifest_since": lambda: doc_svc.sync_manifest(db, **scope, since=0),
+        "sync_manifest_known": lambda: doc_svc.sync_manifest(db, **scope, known={}),
+        "delete_project": lambda: project_svc.delete_project(db, owner, project_id),
+    }
+    out = {}
+    for name, call in calls.items():
+        with _capture(db) as sent:
+            call()
+        out[name] = [(sql, params) for sql, params in sent if " documents" in sql]
+    return out
+
+
+def partitions(plan) -> set[str]:
+    found: set[str] = set()
+    if isinstance(plan, dict):
+        name = plan.get("Relation Name")
+        if name and name.startswith("documents_p"):
+            found.add(name)
+        for value in plan.values():
+            found |= partitions(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            found |= partitions(value)
+    return found
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    from app.db.session import engine
+
+    failed = False
+    with engine.connect() as conn:
+        outer = conn.begin()
+        # service commits only release savepoints; the outer rollback undoes the deletion
+        db = Session(bind=conn, join_transaction_mode="create_savepoint")
+        try:
+            for name, sent in statements(db, args.project_id).items():
+                for sql, params in sent:
+                    plan = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + sql, params).scalar()
+                    read = sorted(partitions(plan))
+                    ok = len(read) <= 1
+                    failed |= not ok
+                    print(json.dumps({"call": name, "sql": sql, "partitions": read, "ok": ok}))
+        finally:
+            db.close()
+            outer.rollback()
+    print(json.dumps({"type": "summary", "ok": not failed}), file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
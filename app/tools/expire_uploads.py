@@ -0,0 +1,44 @@
+"""Abort the S3 multipart uploads of expired upload sessions and delete the sessions.
+
+Meant to run periodically (cron, scheduled task). Works in batches until nothing expired is left.
+
+    python -m app.tools.expire_uploads --batch 500
+
+Keep an ``AbortIncompleteMultipartUpload`` lifecycle rule on the bucket as a backstop for
+uploads whose session row is already gone.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+
+from app.core.storage_s3 import get_s3_client
+from app.services.document import expire_upload_sessions
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    p.add_argument("--batch", type=int, default=500, help="sessions aborted per round")
+    return p.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    from app.db.session import SessionLocal
+
+    client = get_s3_client()
+    expired = 0
+    while True:
+        with SessionLocal() as db:
+            n = expire_upload_sessions(db, batch=args.batch, client=client)
+        expired += n
+        if n < args.batch:  # a short round means the rest failed to abort or nothing is left
+            break
+    print(json.dumps({"type": "summary", "expired": expired}), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
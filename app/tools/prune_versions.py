@@ -0,0 +1,43 @@
+"""Apply the document version retention policy to every document.
+
+Replacing or restoring a document already prunes that document's history in the background;
+run this periodically so ``DOCUMENT_VERSION_MAX_AGE_DAYS`` is enforced on documents nobody
+touches, and after lowering ``DOCUMENT_VERSIONS_KEEP``.
+
+    python -m app.tools.prune_versions --batch 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+
+from app.core.storage_s3 import get_s3_client
+from app.services.document import prune_versions
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    p.add_argument("--batch", type=int, default=500, help="versions pruned per transaction")
+    return p.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    from app.db.session import SessionLocal
+
+    client = get_s3_client()
+    pruned = 0
+    while True:
+        with SessionLocal() as db:
+            n = prune_versions(db, batch=args.batch, client=client)
+        pruned += n
+        if n < args.batch:
+            break
+    print(json.dumps({"type": "summary", "pruned": pruned}), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+"""Delete expired ``Idempotency-Key`` records.
+
+Expired keys are already ignored and reused on demand; this only keeps the table small.
+
+    python -m app.tools.purge_idempotency_keys --batch 1000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+
+from app.services.idempotency import purge_expired_keys
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    p.add_argument("--batch", type=int, default=1000, help="keys deleted per transaction")
+    return p.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    from app.db.session import SessionLocal
+
+    purged = 0
+    while True:
+        with SessionLocal() as db:
+            n = purge_expired_keys(db, batch=args.batch)
+        purged += n
+        if n < args.batch:
+            break
+    print(json.dumps({"type": "summary", "purged": purged}), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,264 @@
+"""Reconcile ``projects.total_size_bytes`` against documents rows and S3.
+
+For every project, compares the recorded total, the size of its documents (earlier versions
+included) and the size of the ``projects/{id}/`` prefix in S3, thumbnail renditions excluded.
+It also reports orphaned objects (no documents row), dangling rows (no object) and size
+mismatches. Projects are checked in parallel. Results are written as one JSON line per project
+as they complete, so memory stays flat however many projects there are.
+
+    python -m app.tools.reconcile --workers 16 --only-drift
+    python -m app.tools.reconcile --fix --truth s3       # rewrite drifted totals
+    python -m app.tools.reconcile --scan-deleted         # prefixes of deleted projects
+
+Exits with status 1 when any drift, orphan or dangling row was found.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.storage_s3 import get_s3_client, list_common_prefixes, list_prefix
+from app.db.models import Document, DocumentVersion, Project
+from app.services.thumbnails import is_rendition_key
+
+PROJECT_PREFIX = "projects/"
+
+
+def iter_projects(db: Session, page_size: int, project_ids: list[int] | None = None):
+    """Yield ``(id, total_size_bytes)`` in id order using keyset pagination."""
+    after = 0
+    while True:
+        stmt = (
+            select(Project.id, Project.total_size_bytes)
+            .where(Project.id > after)
+            .order_by(Project.id)
+            .limit(page_size)
+        )
+        if project_ids:
+            stmt = stmt.where(Project.id.in_(project_ids))
+        rows = db.execute(stmt).all()
+        if not rows:
+            return
+        yield from rows
+        after = rows[-1].id
+
+
+def check_project(
+    session_factory: sessionmaker,
+    client,
+    project_id: int,
+    recorded: int,
+    truth: str = "s3",
+    sample: int = 20,
+) -> dict:
+    with session_factory() as db:
+        # earlier versions keep their objects and count towards the total too
+        docs = db.execute(
+            select(Document.id, Document.s3_key, Document.size_bytes)
+            .where(Document.project_id == project_id)
+            .union_all(
+                select(
+                    DocumentVersion.document_id, DocumentVersion.s3_key, DocumentVersion.size_bytes
+                ).where(DocumentVersion.project_id == project_id)
+            )
+        ).all()
+    objects = {
+        key: size
+        for key, size in list_prefix(f"{PROJECT_PREFIX}{project_id}/", client=client)
+        if not is_rendition_key(key)
+    }
+
+    keys = {d.s3_key for d in docs}
+    orphaned = sorted(k for k in objects if k not in keys)
+    dangling = sorted(d.id for d in docs if d.s3_key not in objects)
+    mismatched = sorted(
+        d.id for d in docs if d.s3_key in objects and objects[d.s3_key] != d.size_bytes
+    )
+    documents_total = sum(d.size_bytes for d in docs)
+    s3_total = sum(objects.values())
+    expected = s3_total if truth == "s3" else documents_total
+
+    return {
+        "type": "project",
+        "project_id": project_id,
+        "recorded_total": recorded,
+        "documents_total": documents_total,
+        "s3_total": s3_total,
+        "expected_total": expected,
+        "documents": len(docs),
+        "objects": len(objects),
+        "total_drift": recorded != expected,
+        "orphaned_objects": len(orphaned),
+        "orphaned_sample": orphaned[:sample],
+        "dangling_rows": len(dangling),
+        "dangling_sample": dangling[:sample],
+        "size_mismatches": len(mismatched),
+        "size_mismatch_sample": mismatched[:sample],
+    }
+
+
+def has_problem(result: dict) -> bool:
+    return bool(
+        result.get("error")
+        or result.get("total_drift")
+        or result.get("orphaned_objects")
+        or result.get("dangling_rows")
+        or result.get("size_mismatches")
+    )
+
+
+def reconcile(
+    session_factory: sessionmaker,
+    client,
+    *,
+    workers: int = 8,
+    page_size: int = 500,
+    truth: str = "s3",
+    project_ids: list[int] | None = None,
+    sample: int = 20,
+):
+    """Yield one result dict per project, in completion order.
+
+    At most ``workers * 4`` projects are in flight, so neither results nor pending work pile up.
+    """
+
+    def run(pid: int, recorded: int) -> dict:
+        try:
+            return check_project(session_factory, client, pid, recorded, truth, sample)
+        except Exception as exc:  # keep going; one bad prefix must not stop the sweep
+            return {"type": "project", "project_id": pid, "error": repr(exc)}
+
+    with ThreadPoolExecutor(max_workers=workers) as pool, session_factory() as db:
+        pending = set()
+        for pid, recorded in iter_projects(db, page_size, project_ids):
+            pending.add(pool.submit(run, pid, recorded))
+            if len(pending) >= workers * 4:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    yield fut.result()
+        for fut in wait(pending).done:
+            yield fut.result()
+
+
+def apply_fixes(session_factory: sessionmaker, fixes: list[tuple[int, int, int]]) -> int:
+    """Set totals in one executemany; skip rows whose total moved since they were read.
+
+    ``fixes`` holds ``(project_id, recorded_total, new_total)``.
+    """
+    if not fixes:
+        return 0
+    table = Project.__table__
+    stmt = (
+        update(table)
+        .where(table.c.id == bindparam("b_id"))
+        .where(table.c.total_size_bytes == bindparam("b_recorded"))
+        .values(total_size_bytes=bindparam("b_total"))
+    )
+    with session_factory() as db:
+        result = db.connection().execute(
+            stmt,
+            [{"b_id": pid, "b_recorded": rec, "b_total": total} for pid, rec, total in fixes],
+        )
+        db.commit()
+    return result.rowcount
+
+
+def scan_deleted_prefixes(session_factory: sessionmaker, client, batch: int = 500):
+    """Yield a result for every ``projects/{id}/`` prefix whose project row no longer exists."""
+
+    def flush(ids: list[int]):
+        with session_factory() as db:
+            existing = set(db.scalars(select(Project.id).where(Project.id.in_(ids))))
+        for pid in ids:
+            if pid in existing:
+                continue
+            prefix = f"{PROJECT_PREFIX}{pid}/"
+            objects = bytes_ = 0
+            for _, size in list_prefix(prefix, client=client):
+                objects += 1
+                bytes_ += size
+            yield {"type": "orphaned_prefix", "prefix": prefix, "objects": objects, "bytes": bytes_}
+
+    ids: list[int] = []
+    for prefix in list_common_prefixes(PROJECT_PREFIX, client=client):
+        segment = prefix[len(PROJECT_PREFIX) :].rstrip("/")
+        if not segment.isdigit():
+            yield {"type": "orphaned_prefix", "prefix": prefix, "note": "not a project id"}
+            continue
+        ids.append(int(segment))
+        if len(ids) >= batch:
+            yield from flush(ids)
+            ids = []
+    if ids:
+        yield from flush(ids)
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    p.add_argument("--workers", type=int, default=8)
+    p.add_argument("--page-size", type=int, default=500, help="projects read per DB page")
+    p.add_argument("--project", type=int, action="append", dest="project_ids", help="repeatable")
+    p.add_argument(
+        "--truth",
+        choices=["s3", "documents"],
+        default="s3",
+        help="which size the recorded total should match",
+    )
+    p.add_argument("--fix", action="store_true", help="rewrite drifted totals")
+    p.add_argument("--fix-batch", type=int, default=500, help="totals per UPDATE batch")
+    p.add_argument("--sample", type=int, default=20, help="keys/ids listed per finding")
+    p.add_argument("--only-drift", action="store_true", help="print only projects with findings")
+    p.add_argument("--scan-deleted", action="store_true", help="also report deleted projects")
+    return p.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    from app.db.session import SessionLocal
+
+    client = get_s3_client()  # boto3 clients are thread-safe; share one across workers
+    summary = {"projects": 0, "with_findings": 0, "errors": 0, "fixed": 0, "orphaned_prefixes": 0}
+    fixes: list[tuple[int, int, int]] = []
+
+    def emit(result: dict) -> None:
+        print(json.dumps(result), flush=True)
+
+    for result in reconcile(
+        SessionLocal,
+        client,
+        workers=args.workers,
+        page_size=args.page_size,
+        truth=args.truth,
+        project_ids=args.project_ids,
+        sample=args.sample,
+    ):
+        summary["projects"] += 1
+        problem = has_problem(result)
+        summary["with_findings"] += problem
+        summary["errors"] += "error" in result
+        if problem or not args.only_drift:
+            emit(result)
+        if args.fix and result.get("total_drift"):
+            fixes.append((result["project_id"], result["recorded_total"], result["expected_total"]))
+            if len(fixes) >= args.fix_batch:
+                summary["fixed"] += apply_fixes(SessionLocal, fixes)
+                fixes = []
+    summary["fixed"] += apply_fixes(SessionLocal, fixes)
+
+    if args.scan_deleted:
+        for result in scan_deleted_prefixes(SessionLocal, client):
+            summary["orphaned_prefixes"] += 1
+            emit(result)
+
+    print(json.dumps({"type": "summary", **summary}), file=sys.stderr)
+    return 1 if summary["with_findings"] or summary["orphaned_prefixes"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
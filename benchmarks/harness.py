@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import json
+import math
+import platform
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from itertools import count
+from pathlib import Path
+from typing import Callable
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def run_scenario(
+    request: Callable[[object, int], bool],
+    clients: list,
+    requests: int,
+    warmup: int = 0,
+) -> dict:
+    """Fire ``requests`` calls of ``request(client, i)`` from one thread per client.
+
+    ``request`` returns True on the expected outcome; anything else counts as an error.
+    """
+    for i in range(warmup):
+        request(clients[i % len(clients)], -(i + 1))
+
+    ticket = count()
+    latencies: list[list[float]] = [[] for _ in clients]
+    errors = [0] * len(clients)
+    start_gate = threading.Barrier(len(clients))
+
+    def worker(slot: int) -> None:
+        client = clients[slot]
+        start_gate.wait()
+        while True:
+            i = next(ticket)
+            if i >= requests:
+                return
+            t0 = time.perf_counter()
+            try:
+                ok = request(client, i)
+            except Exception:
+                ok = False
+            latencies[slot].append((time.perf_counter() - t0) * 1000)
+            if not ok:
+                errors[slot] += 1
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(clients)) as pool:
+        list(pool.map(worker, range(len(clients))))
+    wall = time.perf_counter() - wall_start
+
+    samples = sorted(x for per_worker in latencies for x in per_worker)
+    return {
+        "requests": len(samples),
+        "errors": sum(errors),
+        "concurrency": len(clients),
+        "throughput_rps": round(len(samples) / wall, 2) if wall else 0.0,
+        "p50_ms": round(percentile(samples, 50), 3),
+        "p95_ms": round(percentile(samples, 95), 3),
+        "p99_ms": round(percentile(samples, 99), 3),
+        "max_ms": round(samples[-1], 3) if samples else 0.0,
+    }
+
+
+def build_report(results: dict[str, dict], meta: dict) -> dict:
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            **meta,
+        },
+        "results": results,
+    }
+
+
+def save_report(report: dict, path: str | Path) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n")
+
+
+def load_report(path: str | Path) -> dict:
+    return json.loads(Path(path).read_text())
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Return one line per scenario that regressed by more than ``threshold`` (0.2 = 20%)."""
+    regressions = []
+    for name, base in baseline.get("results", {}).items():
+        cur = current["results"].get(name)
+        if cur is None:
+            continue
+        if base["p95_ms"] and cur["p95_ms"] > base["p95_ms"] * (1 + threshold):
+            regressions.append(
+                f"{name}: p95 {cur['p95_ms']:.2f}ms vs baseline {base['p95_ms']:.2f}ms"
+            )
+        if base["throughput_rps"] and cur["throughput_rps"] < base["throughput_rps"] * (
+            1 - threshold
+        ):
+            regressions.append(
+                f"{name}: throughput {cur['throughput_rps']:.1f} rps "
+                f"vs baseline {base['throughput_rps']:.1f} rps"
+            )
+        if cur["errors"] > base.get("errors", 0):
+            regressions.append(f"{name}: {cur['errors']} errors vs baseline {base['errors']}")
+    return regressions
+
+
+def format_table(results: dict[str, dict]) -> str:
+    header = f"{'scenario':<16}{'req':>7}{'err':>5}{'rps':>10}{'p50':>10}{'p95':>10}{'p99':>10}"
+    lines = [header, "-" * len(header)]
+    for name, r in results.items():
+        lines.append(
+            f"{name:<16}{r['requests']:>7}{r['errors']:>5}{r['throughput_rps']:>10.1f}"
+            f"{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,253 @@
+"""Benchmark the API hot paths in-process.
+
+The app runs in this process against ``--db-url`` (a local Postgres, or a throwaway SQLite
+file by default) and the filesystem S3 stand-in, driven by one TestClient per worker thread.
+
+    python -m benchmarks.run --concurrency 8 --requests 500 --save benchmarks/baselines/local.json
+    python -m benchmarks.run --baseline benchmarks/baselines/local.json --threshold 0.2
+
+Exits with status 1 when a scenario regresses against the baseline by more than the threshold.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+from uuid import uuid4
+
+from benchmarks.harness import (
+    build_report,
+    compare,
+    format_table,
+    load_report,
+    run_scenario,
+    save_report,
+)
+
+SCENARIOS = [
+    "login",
+    "projects",
+    "upload",
+    "list_shallow",
+    "list_deep",
+    "list_q",
+    "list_deep_q",
+    "download_link",
+    "replace",
+    "delete",
+]
+
+PAGE_SIZE = 50
+SEARCH_TERM = "report"
+_VOCAB = ["report", "invoice", "notes", "draft", "scan", "summary", "contract", "photo"]
+
+
+def _configure_env(args) -> None:
+    # must happen before anything under app/ is imported: settings are read at import time
+    workdir = args.workdir or tempfile.mkdtemp(prefix="pb-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    os.environ["DATABASE_URL"] = args.db_url or f"sqlite:///{workdir}/bench.sqlite"
+    os.environ["S3_BACKEND"] = "local"
+    os.environ["S3_LOCAL_ROOT"] = os.path.join(workdir, "s3")
+    os.environ["PROJECT_SIZE_LIMIT_BYTES"] = str(1 << 50)
+    os.environ.setdefault("SQL_REPEAT_THRESHOLD", "0")
+    os.environ.setdefault("JWT_SECRET", "bench-secret")
+
+
+class Fixture:
+    """Users, projects and documents the scenarios run against."""
+
+    def __init__(self, client, args):
+        from sqlalchemy import insert
+
+        from app.db.models import Document
+        from app.db.session import SessionLocal
+
+        self.payload = os.urandom(args.payload_bytes)
+        self.login = f"bench_{uuid4().hex[:8]}"
+        self.password = "bench-password"
+
+        client.post(
+            "/auth",
+            json={"login": self.login, "password": self.password, "repeat_password": self.password},
+        ).raise_for_status()
+        token = client.post(
+            "/auth/login", json={"login": self.login, "password": self.password}
+        ).json()["access_token"]
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+        projects = [self._create_project(client, f"bench-{i}") for i in range(args.projects)]
+        self.list_project, self.upload_project, self.churn_project = projects[:3]
+
+        # listing project: bulk-inserted rows (no S3 objects needed for list / presign)
+        rng = random.Random(42)
+        rows = [
+            {
+                "project_id": self.list_project,
+                "filename": f"{rng.choice(_VOCAB)}-{i}.pdf",
+                "s3_key": f"projects/{self.list_project}/{uuid4()}-seed-{i}.pdf",
+                "size_bytes": args.payload_bytes,
+            }
+            for i in range(args.seed_docs)
+        ]
+        with SessionLocal() as db:
+            doc_ids = []
+            for start in range(0, len(rows), 5000):
+                doc_ids += db.scalars(
+                    insert(Document).returning(Document.id), rows[start : start + 5000]
+                ).all()
+            db.commit()
+        self.doc_ids = doc_ids
+        self.q_total = sum(1 for r in rows if SEARCH_TERM in r["filename"])
+
+        # replace / delete need real objects; create them through the API
+        self.replace_ids = [self._upload(client, self.churn_project) for _ in range(args.pool)]
+        self.delete_ids = [
+            self._upload(client, self.churn_project) for _ in range(args.requests + args.warmup)
+        ]
+
+    def _create_project(self, client, name: str) -> int:
+        resp = client.post("/projects", json={"name": name}, headers=self.headers)
+        resp.raise_for_status()
+        return resp.json()["id"]
+
+    def _upload(self, client, project_id: int) -> int:
+        resp = client.post(
+            f"/projects/{project_id}/documents",
+            files={"file": ("bench.txt", self.payload, "text/plain")},
+            headers=self.headers,
+        )
+        resp.raise_for_status()
+        return resp.json()["id"]
+
+
+def _scenarios(fx: Fixture) -> dict:
+    last_page = max(1, -(-len(fx.doc_ids) // PAGE_SIZE))
+    last_q_page = max(1, -(-fx.q_total // PAGE_SIZE))
+    h = fx.headers
+    docs_url = f"/projects/{fx.list_project}/documents"
+
+    def ok(resp, status=200):
+        return resp.status_code == status
+
+    return {
+        "login": lambda c, i: ok(
+            c.post("/auth/login", json={"login": fx.login, "password": fx.password})
+        ),
+        "projects": lambda c, i: ok(c.get("/projects", headers=h)),
+        "upload": lambda c, i: ok(
+            c.post(
+                f"/projects/{fx.upload_project}/documents",
+                files={"file": (f"up-{i}.txt", fx.payload, "text/plain")},
+                headers=h,
+            ),
+            201,
+        ),
+        "list_shallow": lambda c, i: ok(
+            c.get(docs_url, params={"page": 1, "page_size": PAGE_SIZE}, headers=h)
+        ),
+        "list_deep": lambda c, i: ok(
+            c.get(docs_url, params={"page": last_page, "page_size": PAGE_SIZE}, headers=h)
+        ),
+        "list_q": lambda c, i: ok(
+            c.get(docs_url, params={"page": 1, "page_size": PAGE_SIZE, "q": SEARCH_TERM}, headers=h)
+        ),
+        "list_deep_q": lambda c, i: ok(
+            c.get(
+                docs_url,
+                params={"page": last_q_page, "page_size": PAGE_SIZE, "q": SEARCH_TERM},
+                headers=h,
+            )
+        ),
+        "download_link": lambda c, i: ok(
+            c.get(f"/document/{fx.doc_ids[i % len(fx.doc_ids)]}", headers=h)
+        ),
+        "replace": lambda c, i: ok(
+            c.put(
+                f"/document/{fx.replace_ids[i % len(fx.replace_ids)]}",
+                files={"file": (f"re-{i}.txt", fx.payload, "text/plain")},
+                headers=h,
+            )
+        ),
+        "delete": lambda c, i: ok(c.delete(f"/document/{fx.delete_ids[i]}", headers=h), 204),
+    }
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    p.add_argument("--db-url", help="SQLAlchemy URL (default: SQLite file in --workdir)")
+    p.add_argument("--workdir", help="where SQLite and the S3 stand-in live (default: temp dir)")
+    p.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma separated subset")
+    p.add_argument("--concurrency", type=int, default=4)
+    p.add_argument("--requests", type=int, default=200, help="measured requests per scenario")
+    p.add_argument("--warmup", type=int, default=10, help="unmeasured requests per scenario")
+    p.add_argument("--seed-docs", type=int, default=5000, help="documents in the listing project")
+    p.add_argument("--projects", type=int, default=20, help="projects owned by the bench user")
+    p.add_argument("--pool", type=int, default=50, help="documents cycled by the replace scenario")
+    p.add_argument("--payload-bytes", type=int, default=4096)
+    p.add_argument("--save", help="write the JSON report here (e.g. a new baseline)")
+    p.add_argument("--baseline", help="JSON report to compare against")
+    p.add_argument("--threshold", type=float, default=0.2, help="allowed regression (0.2 = 20%%)")
+    return p.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    args.projects = max(args.projects, 3)
+    names = [n.strip() for n in args.scenarios.split(",") if n.strip()]
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        print(f"unknown scenarios: {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+
+    _configure_env(args)
+    from fastapi.testclient import TestClient
+
+    from app.db.models import Base
+    from app.db.session import engine
+    from app.main import app
+
+    Base.metadata.create_all(bind=engine)
+
+    clients = [TestClient(app) for _ in range(args.concurrency)]
+    for c in clients:
+        c.__enter__()
+    try:
+        fx = Fixture(clients[0], args)
+        scenarios = _scenarios(fx)
+        results = {}
+        for name in names:
+            results[name] = run_scenario(scenarios[name], clients, args.requests, args.warmup)
+            print(f"{name}: done", file=sys.stderr)
+    finally:
+        for c in clients:
+            c.__exit__(None, None, None)
+
+    report = build_report(
+        results,
+        {
+            "db": engine.dialect.name,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "seed_docs": args.seed_docs,
+            "payload_bytes": args.payload_bytes,
+        },
+    )
+    print(format_table(results))
+    if args.save:
+        save_report(report, args.save)
+
+    if args.baseline:
+        regressions = compare(report, load_report(args.baseline), args.threshold)
+        if regressions:
+            print("\nREGRESSIONS:", *regressions, sep="\n  ")
+            return 1
+        print(f"\nno regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
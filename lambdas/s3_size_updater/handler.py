@@ -1,7 +1,10 @@
 import os
 import json
 import re
+import time
 import logging
+from collections import Counter
+from contextlib import contextmanager
 from urllib.parse import unquote_plus, urlparse
 
 import boto3
@@ -12,23 +15,42 @@ logger.setLevel(logging.INFO)
 
 # Expect keys like: projects/{project_id}/...
 PROJECT_RE = re.compile(r"^projects/(\d+)/")
+# thumbnail/preview renditions stored next to originals; they do not count towards totals
+RENDITION_SUFFIXES = ("@thumb.jpg", "@preview.jpg")
+
+RECONCILE_MAX_PROJECTS = int(os.environ.get("RECONCILE_MAX_PROJECTS", "20"))
+RECONCILE_MIN_INTERVAL_SECONDS = int(os.environ.get("RECONCILE_MIN_INTERVAL_SECONDS", "3600"))
+SECRET_TTL_SECONDS = int(os.environ.get("SECRET_TTL_SECONDS", "300"))
+DB_IDLE_CHECK_SECONDS = int(os.environ.get("DB_IDLE_CHECK_SECONDS", "30"))
+DB_CONNECT_TIMEOUT_SECONDS = int(os.environ.get("DB_CONNECT_TIMEOUT_SECONDS", "10"))
+DEDUP_TTL_SECONDS = int(os.environ.get("DEDUP_TTL_SECONDS", str(7 * 24 * 3600)))
+_LEDGER_CHUNK = 1000
+_SEQUENCER_WIDTH = 32
 
 s3 = boto3.client("s3")
 secrets = boto3.client("secretsmanager")
 
 
-def _db_url():
-    name = os.environ["DB_SECRET_NAME"]
-    sec = secrets.get_secret_value(SecretId=name)["SecretString"]
-    try:
-        obj = json.loads(sec)  # if secret is key/value JSON
-        return obj.get("PB_DATABASE_URL") or obj.get("url")
-    except json.JSONDecodeError:
-        return sec  # plaintext
+# Cached across warm invocations of the same container
+_secret = {"url": None, "expires_at": 0.0}
+_conn = {"conn": None, "used_at": 0.0}
 
 
-def _connect():
-    url = _db_url()
+def _db_url(refresh=False):
+    now = time.monotonic()
+    if refresh or _secret["url"] is None or now >= _secret["expires_at"]:
+        name = os.environ["DB_SECRET_NAME"]
+        sec = secrets.get_secret_value(SecretId=name)["SecretString"]
+        try:
+            obj = json.loads(sec)  # if secret is key/value JSON
+            url = obj.get("PB_DATABASE_URL") or obj.get("url")
+        except json.JSONDecodeError:
+            url = sec  # plaintext
+        _secret.update(url=url, expires_at=now + SECRET_TTL_SECONDS)
+    return _secret["url"]
+
+
+def _open(url):
     u = urlparse(url)
     return pg8000.connect(
         user=u.username,
@@ -37,11 +59,98 @@ def _connect():
         port=u.port or 5432,
         database=u.path.lstrip("/"),
         ssl_context=True,  # TLS to RDS
+        timeout=DB_CONNECT_TIMEOUT_SECONDS,
     )
 
 
-def _sum_prefix(bucket, prefix):
-    total = 0
+def _connect():
+    try:
+        return _open(_db_url())
+    except pg8000.DatabaseError as exc:
+        # 28P01 / 28000: credentials rotated since the secret was cached
+        code = exc.args[0].get("C") if exc.args and isinstance(exc.args[0], dict) else None
+        if code not in ("28P01", "28000"):
+            raise
+        return _open(_db_url(refresh=True))
+
+
+def _discard():
+    conn, _conn["conn"] = _conn["conn"], None
+    if conn is not None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+def _healthy(conn):
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+            cur.fetchone()
+        conn.commit()
+        return True
+    except Exception:
+        return False
+
+
+def _get_conn():
+    """Return the container's connection, re-checking it after ``DB_IDLE_CHECK_SECONDS`` idle.
+
+    Returns ``(conn, reused)``.
+    """
+    conn = _conn["conn"]
+    if conn is not None:
+        idle = time.monotonic() - _conn["used_at"]
+        if idle < DB_IDLE_CHECK_SECONDS or _healthy(conn):
+            return conn, True
+        logger.info("Reconnecting: cached connection failed health check after %.0fs idle", idle)
+        _discard()
+    _conn["conn"] = _connect()
+    return _conn["conn"], False
+
+
+@contextmanager
+def _db():
+    """Yield the reusable connection; commit on success, roll back (or drop it) on error."""
+    conn, reused = _get_conn()
+    try:
+        yield conn, reused
+        conn.commit()
+    except Exception as exc:
+        if isinstance(exc, pg8000.InterfaceError):
+            _discard()  # broken socket
+        else:
+            try:
+                conn.rollback()
+            except Exception:
+                _discard()
+        raise
+    finally:
+        _conn["used_at"] = time.monotonic()
+
+
+def _run(work, *, retry=True):
+    """Run ``work(conn)`` on the reusable connection and return ``(result, reused)``.
+
+    A reused connection that died since the last health check (failover, idle timeout) is
+    replaced and the work retried once. Only pass ``retry=True`` for work that runs in one
+    transaction, so the failed attempt committed nothing; ``_reconcile`` commits per project.
+    """
+    try:
+        with _db() as (conn, reused):
+            return work(conn), reused
+    except pg8000.InterfaceError:
+        if not reused or not retry:
+            raise
+        logger.warning("Cached DB connection dropped; retrying on a new connection")
+    with _db() as (conn, reused):
+        return work(conn), reused
+
+
+def _list_prefix(bucket, prefix):
+    """Return ``{key: size}`` for every object under ``prefix``."""
+    sizes = {}
     token = None
     while True:
         kwargs = {"Bucket": bucket, "Prefix": prefix}
@@ -49,11 +158,18 @@ def _sum_prefix(bucket, prefix):
             kwargs["ContinuationToken"] = token
         resp = s3.list_objects_v2(**kwargs)
         for obj in resp.get("Contents", []) or []:
-            total += int(obj.get("Size", 0))
+            sizes[obj["Key"]] = int(obj.get("Size", 0))
         token = resp.get("NextContinuationToken")
         if not token:
             break
-    return total
+    return sizes
+
+
+def _sequencer(value):
+    """Left-pad to a fixed width so string order matches S3 event order for one key."""
+    if not value or len(value) > _SEQUENCER_WIDTH:
+        return None
+    return value.upper().rjust(_SEQUENCER_WIDTH, "0")
 
 
 def _parse_record(rec):
@@ -69,70 +185,438 @@ def _parse_record(rec):
         delta = None
     else:
         delta = 0
-    return {"event": ev, "project_id": pid, "key": key, "size": size, "delta": delta}
-
-
-def lambda_handler(event, context):
-    # Diagnostic: DB ping
-    if event.get("ping_db"):
-        conn = _connect()
-        try:
-            with conn.cursor() as cur:
-                cur.execute("SELECT 1")
-                one = cur.fetchone()[0]
-            conn.commit()
-            return {"ok": True, "db": "up", "select1": one}
-        finally:
-            conn.close()
-
-    bucket = os.environ["BUCKET"]
-    recalc_on_delete = str(os.environ.get("RECALC_ON_DELETE", "true")).lower() == "true"
+    return {
+        "event": ev,
+        "project_id": pid,
+        "key": key,
+        "size": size,
+        "delta": delta,
+        "sequencer": _sequencer(obj.get("sequencer")),
+    }
 
-    records = event.get("Records", []) or []
-    parsed = [_parse_record(r) for r in records]
-    logger.info("S3 Event Parsed: %s", json.dumps(parsed))
 
-    # Nothing relevant
-    pids_to_recalc = set()
-    increments = []
-    for p in parsed:
+def _fold(parsed):
+    """Keep the latest record per key (by sequencer, then batch position)."""
+    latest = {}
+    order = {}
+    stats = {
+        "records": len(parsed),
+        "created_events": 0,
+        "removed_events": 0,
+        "skipped": 0,
+        "duplicates": 0,
+        "stale": 0,
+    }
+    for i, p in enumerate(parsed):
         if not p["project_id"]:
             logger.warning("Skip key without project_id: %s", p["key"])
+            stats["skipped"] += 1
+            continue
+        if p["key"].endswith(RENDITION_SUFFIXES):
+            stats["skipped"] += 1
             continue
-        if p["event"].startswith("ObjectCreated:") and p["delta"]:
-            increments.append((p["project_id"], p["delta"]))
+        if p["event"].startswith("ObjectCreated:"):
+            stats["created_events"] += 1
         elif p["event"].startswith("ObjectRemoved:"):
-            pids_to_recalc.add(p["project_id"])
+            stats["removed_events"] += 1
+        else:
+            stats["skipped"] += 1
+            continue
+        key = p["key"]
+        rank = (p["sequencer"] or "", i)
+        if key in latest and p["sequencer"] and p["sequencer"] == latest[key]["sequencer"]:
+            stats["duplicates"] += 1
+            continue
+        if key not in latest or rank > order[key]:
+            latest[key], order[key] = p, rank
+    return latest, stats
 
-    if not increments and not pids_to_recalc:
-        return {"ok": True, "note": "no actionable records"}
 
-    conn = _connect()
-    try:
+def _split(records):
+    created = {}  # key -> (project_id, size)
+    removed = {}  # key -> project_id
+    for key, p in records.items():
+        if p["event"].startswith("ObjectCreated:"):
+            created[key] = (p["project_id"], p["delta"])
+        else:
+            removed[key] = p["project_id"]
+    return created, removed
+
+
+def _values(rows, template):
+    """``VALUES`` body for ``rows`` with one ``template`` per row, plus flat parameters."""
+    return ", ".join([template] * len(rows)), [x for row in rows for x in row]
+
+
+def _chunks(rows, size=_LEDGER_CHUNK):
+    for i in range(0, len(rows), size):
+        yield rows[i : i + size]
+
+
+def _claim_sequencers(cur, records):
+    """Advance the stored sequencer for each key; return keys that should be applied.
+
+    A key whose stored sequencer is equal (redelivery) or higher (an older event arriving
+    late) is dropped. Records without a sequencer are always applied.
+    """
+    fresh = {k for k, p in records.items() if not p["sequencer"]}
+    duplicates = stale = 0
+    rows = sorted((k, p["sequencer"]) for k, p in records.items() if p["sequencer"])
+    for chunk in _chunks(rows):
+        values, params = _values(chunk, "(%s, %s)")
+        cur.execute(
+            f"WITH v(key, seq) AS (VALUES {values}), "
+            "old AS ("
+            "  SELECT s.key, s.sequencer FROM s3_event_sequencers s JOIN v ON v.key = s.key"
+            "), "
+            "up AS ("
+            "  INSERT INTO s3_event_sequencers (key, sequencer) "
+            "  SELECT key, seq FROM v ORDER BY key "
+            "  ON CONFLICT (key) DO UPDATE "
+            "  SET sequencer = EXCLUDED.sequencer, processed_at = now() "
+            "  WHERE s3_event_sequencers.sequencer < EXCLUDED.sequencer "
+            "  RETURNING key"
+            ") "
+            "SELECT v.key, up.key IS NOT NULL, old.sequencer = v.seq "
+            "FROM v LEFT JOIN up ON up.key = v.key LEFT JOIN old ON old.key = v.key",
+            params,
+        )
+        for key, applied, duplicate in cur.fetchall():
+            if applied:
+                fresh.add(key)
+            elif duplicate:
+                duplicates += 1
+            else:
+                stale += 1
+    return {k: p for k, p in records.items() if k in fresh}, duplicates, stale
+
+
+def _expire_sequencers(cur):
+    cur.execute(
+        "DELETE FROM s3_event_sequencers WHERE processed_at < now() - %s * interval '1 second'",
+        (DEDUP_TTL_SECONDS,),
+    )
+    return cur.rowcount
+
+
+def _managed(cur, keys):
+    """The keys the API accounts for: they have a ``documents`` or ``document_versions`` row.
+
+    ``keys`` maps key -> project id. The API adds and subtracts their sizes itself, so the
+    Lambda leaves them out of the ledger and the totals.
+    """
+    rows = sorted((key, int(pid)) for key, pid in keys.items())
+    out = set()
+    for chunk in _chunks(rows):
+        values, params = _values(chunk, "(%s, %s::int)")
+        cur.execute(
+            f"SELECT v.key FROM (VALUES {values}) AS v(key, project_id) "
+            "WHERE EXISTS ("
+            "  SELECT 1 FROM documents d WHERE d.project_id = v.project_id AND d.s3_key = v.key"
+            ") OR EXISTS (SELECT 1 FROM document_versions dv WHERE dv.s3_key = v.key)",
+            params,
+        )
+        out.update(key for (key,) in cur.fetchall())
+    return out
+
+
+def _record_created(cur, created):
+    """Upsert ledger rows and return ``(project_id, size - previous size)`` per key.
+
+    An overwritten key only contributes the size difference.
+    """
+    rows = sorted((key, int(pid), int(size)) for key, (pid, size) in created.items())
+    out = []
+    for chunk in _chunks(rows):
+        values, params = _values(chunk, "(%s, %s::int, %s::bigint)")
+        cur.execute(
+            f"WITH v(key, project_id, size_bytes) AS (VALUES {values}), "
+            "old AS (SELECT o.key, o.size_bytes FROM s3_objects o JOIN v ON v.key = o.key), "
+            "up AS ("
+            "  INSERT INTO s3_objects (key, project_id, size_bytes) "
+            "  SELECT v.key, v.project_id, v.size_bytes FROM v "
+            "  JOIN projects p ON p.id = v.project_id ORDER BY v.key "
+            "  ON CONFLICT (key) DO UPDATE "
+            "  SET size_bytes = EXCLUDED.size_bytes, recorded_at = now() "
+            "  RETURNING key, project_id, size_bytes"
+            ") "
+            "SELECT up.project_id, up.size_bytes - COALESCE(old.size_bytes, 0) "
+            "FROM up LEFT JOIN old ON old.key = up.key",
+            params,
+        )
+        out.extend(cur.fetchall())
+    return out
+
+
+def _record_removed(cur, removed):
+    """Drop ledger rows and return ``(project_id, size)`` for the keys that had one.
+
+    Only keys this Lambda counted have a row; the API already subtracted the others.
+    """
+    found = []
+    for chunk in _chunks(sorted(removed)):
+        values, params = _values([(k,) for k in chunk], "(%s)")
+        cur.execute(
+            f"DELETE FROM s3_objects o USING (VALUES {values}) AS v(key) "
+            "WHERE o.key = v.key RETURNING o.project_id, o.size_bytes",
+            params,
+        )
+        found.extend(cur.fetchall())
+    return found
+
+
+def _mark_dirty(cur, pids):
+    """Queue projects for the next reconcile run (keeps the earliest ``dirty_since``)."""
+    rows = sorted((int(pid),) for pid in pids)
+    if not rows:
+        return 0
+    values, params = _values(rows, "(%s::int)")
+    cur.execute(
+        "INSERT INTO project_size_state (project_id, dirty_since) "
+        f"SELECT p.id, now() FROM (VALUES {values}) AS v(id) "
+        "JOIN projects p ON p.id = v.id ORDER BY p.id "
+        "ON CONFLICT (project_id) DO UPDATE "
+        "SET dirty_since = COALESCE(project_size_state.dirty_since, EXCLUDED.dirty_since)",
+        params,
+    )
+    return cur.rowcount
+
+
+def _apply_deltas(cur, deltas):
+    """Apply all increments in one statement.
+
+    Rows are locked in id order first so concurrent invocations touching the same projects
+    queue up instead of deadlocking. The lock is ``FOR NO KEY UPDATE``: the ledger and state
+    upserts earlier in the transaction already hold ``FOR KEY SHARE`` on the same rows through
+    their foreign keys, and ``FOR UPDATE`` would conflict with another invocation's.
+    """
+    rows = sorted((int(pid), int(delta)) for pid, delta in deltas.items() if delta)
+    if not rows:
+        return 0
+    values, params = _values(rows, "(%s::int, %s::bigint)")
+    cur.execute(
+        f"WITH v(id, delta) AS (VALUES {values}), "
+        "locked AS ("
+        "  SELECT p.id FROM projects p JOIN v ON v.id = p.id ORDER BY p.id FOR NO KEY UPDATE OF p"
+        ") "
+        "UPDATE projects p "
+        "SET total_size_bytes = GREATEST(COALESCE(p.total_size_bytes, 0) + v.delta, 0) "
+        "FROM v WHERE p.id = v.id AND p.id IN (SELECT id FROM locked)",
+        params,
+    )
+    return cur.rowcount
+
+
+def _claim_for_reconcile(cur, project_ids=None):
+    """Stamp ``reconciled_at`` on the projects this run will re-list and return them.
+
+    Without explicit ids, takes the oldest dirty projects not reconciled within
+    ``RECONCILE_MIN_INTERVAL_SECONDS``, skipping rows another run holds.
+    """
+    if project_ids:
+        values, params = _values(sorted((int(p),) for p in project_ids), "(%s::int)")
+        cur.execute(
+            "INSERT INTO project_size_state (project_id, reconciled_at) "
+            f"SELECT p.id, now() FROM (VALUES {values}) AS v(id) "
+            "JOIN projects p ON p.id = v.id ORDER BY p.id "
+            "ON CONFLICT (project_id) DO UPDATE SET reconciled_at = EXCLUDED.reconciled_at "
+            "RETURNING project_id, reconciled_at",
+            params,
+        )
+    else:
+        cur.execute(
+            "UPDATE project_size_state s SET reconciled_at = now() "
+            "WHERE s.project_id IN ("
+            "  SELECT project_id FROM project_size_state "
+            "  WHERE dirty_since IS NOT NULL "
+            "    AND (reconciled_at IS NULL "
+            "         OR reconciled_at < now() - %s * interval '1 second') "
+            "  ORDER BY dirty_since LIMIT %s FOR UPDATE SKIP LOCKED"
+            ") RETURNING s.project_id, s.reconciled_at",
+            (RECONCILE_MIN_INTERVAL_SECONDS, RECONCILE_MAX_PROJECTS),
+        )
+    return sorted(cur.fetchall())
+
+
+def _reconcile(conn, bucket, project_ids=None):
+    """Re-list claimed prefixes; rebuild their ledger rows and totals.
+
+    The total becomes the size of the prefix; the ledger gets the keys the API does not track.
+    """
+    with conn.cursor() as cur:
+        claimed = _claim_for_reconcile(cur, project_ids)
+    conn.commit()
+
+    objects = total_bytes = 0
+    for pid, claimed_at in claimed:
+        sizes = {
+            k: size
+            for k, size in _list_prefix(bucket, f"projects/{pid}/").items()
+            if not k.endswith(RENDITION_SUFFIXES)
+        }
+        total = sum(sizes.values())
         with conn.cursor() as cur:
-            # Increment on create events
-            for pid, delta in increments:
+            cur.execute("DELETE FROM s3_objects WHERE project_id = %s", (pid,))
+            managed = _managed(cur, dict.fromkeys(sizes, pid))
+            untracked = sorted((k, size) for k, size in sizes.items() if k not in managed)
+            for chunk in _chunks(untracked):
+                values, params = _values(
+                    [(k, pid, size) for k, size in chunk], "(%s, %s::int, %s::bigint)"
+                )
                 cur.execute(
-                    "UPDATE projects "
-                    "SET total_size_bytes = GREATEST(COALESCE(total_size_bytes, 0) + %s, 0) "
-                    "WHERE id = %s",
-                    (int(delta), int(pid)),
+                    f"INSERT INTO s3_objects (key, project_id, size_bytes) VALUES {values} "
+                    "ON CONFLICT (key) DO UPDATE SET size_bytes = EXCLUDED.size_bytes",
+                    params,
                 )
-
-            if recalc_on_delete:
-                for pid in sorted(pids_to_recalc):
-                    prefix = f"projects/{pid}/"
-                    new_total = _sum_prefix(bucket, prefix)
-                    cur.execute(
-                        "UPDATE projects SET total_size_bytes = %s WHERE id = %s",
-                        (int(new_total), int(pid)),
-                    )
+            cur.execute("UPDATE projects SET total_size_bytes = %s WHERE id = %s", (total, pid))
+            # a removal missed after the claim keeps the project dirty for the next run
+            cur.execute(
+                "UPDATE project_size_state SET dirty_since = NULL "
+                "WHERE project_id = %s AND dirty_since <= %s",
+                (pid, claimed_at),
+            )
         conn.commit()
-    finally:
-        conn.close()
+        objects += len(untracked)
+        total_bytes += total
+
+    with conn.cursor() as cur:
+        expired = _expire_sequencers(cur)
+    conn.commit()
 
     return {
         "ok": True,
-        "created_events": len(increments),
-        "recalculated_projects": len(pids_to_recalc),
+        "reconciled_projects": len(claimed),
+        "sequencers_expired": expired,
+        "objects": objects,
+        "bytes": total_bytes,
+    }
+
+
+def _select_one(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT 1")
+        return cur.fetchone()[0]
+
+
+def _apply_batch(conn, records):
+    deltas = Counter()
+    with conn.cursor() as cur:
+        records, duplicates, stale = _claim_sequencers(cur, records)
+        created, removed = _split(records)
+        managed = _managed(cur, {key: pid for key, (pid, _) in created.items()})
+        upserted = _record_created(cur, {k: v for k, v in created.items() if k not in managed})
+        for pid, delta in upserted:
+            deltas[pid] += delta
+        found = _record_removed(cur, removed)
+        for pid, size in found:
+            deltas[pid] -= size
+        incremented = _apply_deltas(cur, deltas)
+        # the API may not have committed the key's row yet (uploads, copies); if it does, the
+        # reconcile run drops the key from the ledger and resets the total to the prefix size
+        dirty = _mark_dirty(cur, {pid for pid, _ in upserted})
+    return {
+        "duplicates": duplicates,
+        "stale": stale,
+        "projects_incremented": incremented,
+        "bytes_added": sum(delta for _, delta in upserted),
+        "bytes_removed": sum(size for _, size in found),
+        "managed_skipped": len(managed),
+        "removed_untracked": len(removed) - len(found),
+        "projects_marked_dirty": dirty,
+    }
+
+
+def _process_records(records):
+    """Apply one list of S3 notification records in a single transaction."""
+    parsed = [_parse_record(r) for r in records]
+    logger.info("S3 Event Parsed: %s", json.dumps(parsed))
+
+    latest, stats = _fold(parsed)
+    if not latest:
+        return {"ok": True, "note": "no actionable records", **stats}
+
+    applied, reused = _run(lambda conn: _apply_batch(conn, latest))
+    stats["duplicates"] += applied.pop("duplicates")
+    stats["stale"] += applied.pop("stale")
+    return {"ok": True, **stats, **applied, "reused_connection": reused}
+
+
+def _s3_records(body):
+    """S3 records carried by one SQS message body (direct or SNS-wrapped notification)."""
+    doc = json.loads(body)
+    if doc.get("Type") == "Notification" and "Message" in doc:
+        doc = json.loads(doc["Message"])
+    return doc.get("Records", []) or []  # s3:TestEvent carries none
+
+
+def _merge(total, result):
+    for k, v in result.items():
+        if isinstance(v, (int, float)) and not isinstance(v, bool):
+            total[k] = total.get(k, 0) + v
+    return total
+
+
+def _handle_sqs(messages):
+    """Process an SQS batch, reporting only the messages that failed.
+
+    All messages are applied in one transaction first. If that fails, each message is retried
+    in its own transaction so one poison message does not hold back the rest. Requires
+    ``ReportBatchItemFailures`` on the event source mapping.
+    """
+    batches, failed = [], []
+    for msg in messages:
+        try:
+            batches.append((msg["messageId"], _s3_records(msg["body"])))
+        except (KeyError, TypeError, AttributeError, ValueError):
+            logger.exception("Unreadable SQS message %s", msg.get("messageId"))
+            failed.append(msg.get("messageId"))
+
+    try:
+        result = _process_records([r for _, recs in batches for r in recs])
+    except Exception:
+        logger.exception("SQS batch failed; retrying message by message")
+        result = {"ok": True}
+        for message_id, recs in batches:
+            try:
+                _merge(result, _process_records(recs))
+            except Exception:
+                logger.exception("SQS message %s failed", message_id)
+                failed.append(message_id)
+
+    result.pop("note", None)
+    result.pop("reused_connection", None)
+    return {
+        **result,
+        "messages": len(messages),
+        "failed_messages": len(failed),
+        "batchItemFailures": [{"itemIdentifier": m} for m in failed if m],
     }
+
+
+def lambda_handler(event, context):
+    # Diagnostic: DB ping
+    if event.get("ping_db"):
+        one, reused = _run(_select_one)
+        return {"ok": True, "db": "up", "select1": one, "reused_connection": reused}
+
+    started = time.perf_counter()
+    bucket = os.environ["BUCKET"]
+
+    # Scheduled run: {"reconcile": true} or {"reconcile": true, "project_ids": [...]}
+    if event.get("reconcile"):
+        # no retry: all claimed projects are stamped up front, so a rerun would skip the ones
+        # not reached yet; they stay dirty and are claimed again after the minimum interval
+        result, reused = _run(
+            lambda conn: _reconcile(conn, bucket, event.get("project_ids")), retry=False
+        )
+        result["reused_connection"] = reused
+        result["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
+    records = event.get("Records", []) or []
+    if records and records[0].get("eventSource") == "aws:sqs":
+        result = _handle_sqs(records)
+    else:
+        result = _process_records(records)
+    result["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return result